@@ -38,7 +38,7 @@ class TestPost:
         model_fields = Post._meta.fields
         text_field = search_field(model_fields, 'text')
         assert text_field is not None, 'Добавьте название события `text` модели `Post`'
-        assert type(text_field) == fields.TextField, (
+        assert isinstance(text_field, fields.TextField), (
             'Свойство `text` модели `Post` должно быть текстовым `TextField`'
         )
 
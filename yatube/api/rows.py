@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.http import JsonResponse
+from posts.paginators import AFTER_PARAM, BEFORE_PARAM, CursorPaginator
+
+FIELDS_PARAM = 'fields'
+LIMIT_PARAM = 'limit'
+JSON_PARAMS = {'ensure_ascii': False}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class Resource:
+    """Описание ресурса API: поля ответа и пути к ним в ORM.
+
+    Строки читаются через values() только из нужных столбцов
+    и сразу превращаются в словари ответа, без создания экземпляров
+    моделей.
+    """
+
+    def __init__(self, fields, ordering=('id',)):
+        self.fields = dict(fields)
+        self.ordering = tuple(ordering)
+
+    def requested_fields(self, request):
+        """Поля из ?fields= (по умолчанию — все поля ресурса)."""
+        value = request.GET.get(FIELDS_PARAM)
+        if not value:
+            return tuple(self.fields)
+        names = tuple(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise InvalidFields(
+                'Неизвестные поля: ' + ', '.join(unknown or [value])
+            )
+        return names
+
+    def values(self, queryset, names):
+        """Запрос values() с полями names и полями ключа сортировки."""
+        paths = [self.fields[name] for name in names]
+        paths += [
+            name.lstrip('-') for name in self.ordering
+            if name.lstrip('-') not in paths
+        ]
+        return queryset.order_by(*self.ordering).values(*paths)
+
+    def serialize(self, row, names):
+        return {name: row[self.fields[name]] for name in names}
+
+
+def page_limit(request):
+    """Размер страницы: ?limit=, ограниченный API_MAX_PAGE_SIZE."""
+    try:
+        limit = int(request.GET.get(LIMIT_PARAM, settings.API_PAGE_SIZE))
+    except ValueError:
+        limit = settings.API_PAGE_SIZE
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def error_response(message, status=400):
+    return JsonResponse(
+        {'detail': message}, status=status, json_dumps_params=JSON_PARAMS
+    )
+
+
+def list_response(request, resource, queryset):
+    """Страница ресурса с курсорами соседних страниц."""
+    try:
+        names = resource.requested_fields(request)
+    except InvalidFields as error:
+        return error_response(str(error))
+    paginator = CursorPaginator(
+        resource.values(queryset, names),
+        page_limit(request),
+        ordering=resource.ordering,
+        query=request.GET,
+    )
+    page = paginator.get_page(
+        after=request.GET.get(AFTER_PARAM),
+        before=request.GET.get(BEFORE_PARAM),
+    )
+
+    def page_url(query):
+        return request.build_absolute_uri(f'{request.path}?{query}')
+
+    return JsonResponse({
+        'results': [resource.serialize(row, names) for row in page],
+        'next': page_url(page.next_query) if page.has_next() else None,
+        'previous': (
+            page_url(page.previous_query) if page.has_previous() else None
+        ),
+    }, json_dumps_params=JSON_PARAMS)
+
+
+def detail_response(request, resource, queryset, **lookup):
+    """Объект ресурса, найденный по lookup, или ответ 404."""
+    try:
+        names = resource.requested_fields(request)
+    except InvalidFields as error:
+        return error_response(str(error))
+    row = resource.values(queryset, names).filter(**lookup).first()
+    if row is None:
+        return error_response('Не найдено', status=404)
+    return JsonResponse(
+        resource.serialize(row, names), json_dumps_params=JSON_PARAMS
+    )
@@ -0,0 +1,219 @@
+import json
+from unittest import mock
+
+from core.query_budget import QueryBudgetTestMixin
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import AuthorStats, Group, Post
+
+User = get_user_model()
+
+# Больше, чем строк в одном INSERT на SQLite.
+API_BATCH = 400
+
+
+class ReadApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for num in range(5):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {num}',
+                group=cls.group if num % 2 else None,
+            )
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        self.client = Client()
+
+    def get_json(self, url, status_code=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status_code)
+        return response.json()
+
+    def test_post_list_follows_cursors(self):
+        """Список записей листается курсорами в порядке ленты."""
+        url = reverse('api:post_list')
+        texts = []
+        data = self.get_json(url, limit=2)
+        while True:
+            texts += [post['text'] for post in data['results']]
+            if data['next'] is None:
+                break
+            data = self.get_json(data['next'])
+        self.assertEqual(
+            texts, list(Post.objects.values_list('text', flat=True))
+        )
+
+    def test_post_list_is_one_query_without_models(self):
+        """Страница записей — один запрос без создания
+        экземпляров моделей."""
+        with self.assertNumQueries(1), mock.patch.object(
+            Post, 'from_db'
+        ) as from_db:
+            data = self.get_json(reverse('api:post_list'))
+        from_db.assert_not_called()
+        self.assertEqual(data['results'][0], {
+            'id': self.post.id,
+            'text': self.post.text,
+            'pub_date': data['results'][0]['pub_date'],
+            'updated_at': data['results'][0]['updated_at'],
+            'author': 'auth',
+            'group': None,
+        })
+
+    def test_sparse_fieldsets(self):
+        """?fields= ограничивает поля ответа и столбцы запроса."""
+        with self.assertNumQueries(1) as queries:
+            data = self.get_json(
+                reverse('api:post_list'), fields='id,author'
+            )
+        self.assertEqual(set(data['results'][0]), {'id', 'author'})
+        self.assertNotIn('"text"', queries.captured_queries[0]['sql'])
+        self.get_json(reverse('api:post_list'), 400, fields='id,password')
+
+    def test_post_list_filters(self):
+        """Записи фильтруются по сообществу, автору и тексту."""
+        url = reverse('api:post_list')
+        cases = (
+            ({'group': 'test-slug'}, 2),
+            ({'author': 'auth'}, 5),
+            ({'author': 'nobody'}, 0),
+            ({'q': 'пост 3'}, 1),
+        )
+        for params, count in cases:
+            with self.subTest(params=params):
+                data = self.get_json(url, **params)
+                self.assertEqual(len(data['results']), count)
+
+    def test_detail_views(self):
+        """Запись, сообщество и профайл доступны по своим адресам."""
+        cases = (
+            (reverse('api:post_detail', args=(self.post.id,)),
+             'text', self.post.text),
+            (reverse('api:group_detail', args=('test-slug',)),
+             'posts_count', 2),
+            (reverse('api:profile_detail', args=('auth',)),
+             'posts_count', 5),
+        )
+        for url, field, value in cases:
+            with self.subTest(url=url):
+                self.assertEqual(self.get_json(url)[field], value)
+        self.get_json(reverse('api:profile_detail', args=('nobody',)), 404)
+
+    def test_group_and_profile_lists(self):
+        """Списки сообществ и профайлов."""
+        groups = self.get_json(reverse('api:group_list'), fields='slug')
+        self.assertEqual(groups['results'], [{'slug': 'test-slug'}])
+        profiles = self.get_json(reverse('api:profile_list'))
+        self.assertEqual(profiles['results'][0]['first_name'], 'Имя')
+
+
+class BatchApiTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.url = reverse('api:post_batch')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def post_batch(self, items, client=None):
+        return (client or self.author_client).post(
+            self.url, json.dumps(items), content_type='application/json'
+        )
+
+    def test_batch_requires_login(self):
+        """Анонимный пользователь не может создавать записи."""
+        response = self.post_batch([{'text': 'Пост'}], Client())
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Post.objects.exists())
+
+    def test_batch_requires_csrf_token(self):
+        """Запрос без CSRF-токена отклоняется; токен из cookie
+        передаётся в заголовке X-CSRFToken."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        client.get(reverse('posts:post_create'))
+        response = self.post_batch([{'text': 'Пост'}], client)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Post.objects.exists())
+        response = client.post(
+            self.url,
+            json.dumps([{'text': 'Пост'}]),
+            content_type='application/json',
+            HTTP_X_CSRFTOKEN=client.cookies[settings.CSRF_COOKIE_NAME].value,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_batch_creates_posts_within_budget(self):
+        """Пачка записей сохраняется за фиксированное число запросов,
+        счётчики обновляются, ответ содержит id записей по порядку."""
+        items = [
+            {'text': f'Пост {num}', 'group': self.group.id if num % 2 else ''}
+            for num in range(API_BATCH)
+        ]
+        response = self.assertWithinQueryBudget(
+            self.author_client,
+            self.url,
+            method='post',
+            data=json.dumps(items),
+            content_type='application/json',
+        )
+        data = response.json()
+        self.assertEqual(data['created'], API_BATCH)
+        texts = dict(Post.objects.values_list('id', 'text'))
+        self.assertEqual(
+            [texts[result['id']] for result in data['results']],
+            [item['text'] for item in items],
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count, API_BATCH
+        )
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count, API_BATCH // 2
+        )
+
+    def test_batch_reports_invalid_items(self):
+        """Ошибки проверки возвращаются для каждой записи отдельно,
+        корректные записи сохраняются."""
+        response = self.post_batch([
+            {'text': 'Пост', 'group': self.group.id},
+            {'text': ''},
+            {'text': 'Пост', 'group': 0},
+        ])
+        results = response.json()['results']
+        self.assertIn('id', results[0])
+        self.assertEqual(results[1]['errors']['text'][0]['code'], 'required')
+        self.assertEqual(
+            results[2]['errors']['group'][0]['code'], 'invalid_choice'
+        )
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_batch_rejects_malformed_body(self):
+        """Тело запроса должно быть JSON-списком записей."""
+        for body in ('{', '{"text": "Пост"}', '["Пост"]'):
+            with self.subTest(body=body):
+                response = self.author_client.post(
+                    self.url, body, content_type='application/json'
+                )
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,157 @@
+import json
+
+from core.query_budget import query_budget
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from posts.bulk import bulk_create_posts
+from posts.forms import BatchPostForm
+from posts.models import Group, Post
+from posts.paginators import FEED_ORDERING
+from posts.search import SEARCH_ORDERING, search_posts
+from posts.sharding import across_shards, for_post
+
+from .rows import (JSON_PARAMS, Resource, detail_response, error_response,
+                   list_response)
+
+User = get_user_model()
+
+POSTS = Resource(
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated_at': 'updated_at',
+        'author': 'author__username',
+        'group': 'group__slug',
+    },
+    ordering=FEED_ORDERING,
+)
+SEARCH_RESULTS = Resource(
+    dict(POSTS.fields, rank='rank'), ordering=SEARCH_ORDERING
+)
+GROUPS = Resource({
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+    'posts_count': 'posts_count',
+})
+PROFILES = Resource({
+    'id': 'id',
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'post_stats__posts_count',
+})
+
+
+@query_budget(1, per_shard=1)
+def post_list(request):
+    """Записи: лента целиком, сообщества (?group=), автора (?author=)
+    или результаты поиска (?q=)."""
+    posts = across_shards(Post.objects.all())
+    if 'group' in request.GET:
+        posts = posts.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        posts = posts.filter(author__username=request.GET['author'])
+    if 'q' in request.GET:
+        return list_response(
+            request, SEARCH_RESULTS, search_posts(posts, request.GET['q'])
+        )
+    return list_response(request, POSTS, posts)
+
+
+def _group_ids(items):
+    ids = set()
+    for item in items:
+        try:
+            ids.add(int(item.get('group')))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+@require_POST
+@query_budget(15, per_shard=2)
+def post_batch(request):
+    """Создание пачки записей текущего пользователя.
+
+    Тело запроса — JSON-список записей с полями PostForm (text, group).
+    Каждая запись проверяется по правилам PostForm; корректные
+    сохраняются одной транзакцией, для каждой записи возвращается
+    её id или ошибки.
+
+    Пользователь авторизуется сессией сайта, поэтому запрос, как
+    и формы сайта, проверяется на CSRF: клиент передаёт значение
+    cookie csrftoken в заголовке X-CSRFToken. Cookie ставит любая
+    страница сайта с формой; после входа она меняется.
+    """
+    if not request.user.is_authenticated:
+        return error_response('Требуется авторизация', status=401)
+    try:
+        items = json.loads(request.body)
+    except ValueError:
+        return error_response('Некорректный JSON')
+    if (not isinstance(items, list)
+            or not all(isinstance(item, dict) for item in items)):
+        return error_response('Ожидается список записей')
+    if len(items) > settings.API_MAX_BATCH_SIZE:
+        return error_response(
+            f'Не больше {settings.API_MAX_BATCH_SIZE} записей за запрос'
+        )
+    groups = Group.objects.in_bulk(_group_ids(items))
+    results = []
+    posts = []
+    for item in items:
+        form = BatchPostForm(item, groups=groups)
+        if form.is_valid():
+            post = form.save(commit=False)
+            post.author = request.user
+            posts.append(post)
+            results.append(post)
+        else:
+            results.append({'errors': form.errors.get_json_data()})
+    bulk_create_posts(posts)
+    return JsonResponse({
+        'created': len(posts),
+        'results': [
+            {'id': result.pk} if isinstance(result, Post) else result
+            for result in results
+        ],
+    }, json_dumps_params=JSON_PARAMS)
+
+
+@query_budget(1, per_shard=1)
+def post_detail(request, post_id):
+    """Запись."""
+    return detail_response(
+        request, POSTS, for_post(Post.objects.all(), post_id), pk=post_id
+    )
+
+
+@query_budget(1)
+def group_list(request):
+    """Сообщества."""
+    return list_response(request, GROUPS, Group.objects.all())
+
+
+@query_budget(1)
+def group_detail(request, slug):
+    """Сообщество."""
+    return detail_response(request, GROUPS, Group.objects.all(), slug=slug)
+
+
+@query_budget(1)
+def profile_list(request):
+    """Профайлы авторов."""
+    return list_response(request, PROFILES, User.objects.all())
+
+
+@query_budget(1)
+def profile_detail(request, username):
+    """Профайл автора."""
+    return detail_response(
+        request, PROFILES, User.objects.all(), username=username
+    )
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import checks, slow_queries, sqlite, timing  # noqa: F401
+        timing.install()
+        connection_created.connect(sqlite.configure_connection)
+        connection_created.connect(slow_queries.install)
@@ -0,0 +1,107 @@
+import math
+import time
+import tracemalloc
+
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from .query_budget import count_queries
+
+
+class Case:
+    """Запрос, время выполнения которого измеряется."""
+
+    def __init__(self, name, url, method='get', login=False, **kwargs):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.login = login
+        self.kwargs = kwargs
+
+    def request(self, client):
+        return getattr(client, self.method)(self.url, **self.kwargs)
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу."""
+    values = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def measure(client, case, repeat, warmup=1):
+    """Время, число SQL-запросов и память на запрос case.
+
+    Память измеряется отдельным запросом: tracemalloc замедляет
+    выполнение в разы и исказил бы время.
+    """
+    for _ in range(warmup):
+        response = case.request(client)
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = case.request(client)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(counter.queries))
+    tracemalloc.start()
+    try:
+        case.request(client)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'name': case.name,
+        'method': case.method.upper(),
+        'url': case.url,
+        'status': response.status_code,
+        'repeat': repeat,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': max(queries),
+        'alloc_peak_kb': round(peak / 1024, 1),
+        'alloc_retained_kb': round(retained / 1024, 1),
+    }
+
+
+def iter_routes(resolver=None, namespace=None):
+    """Именованные маршруты URLconf: пары (полное имя, имена параметров)."""
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            inner = namespace
+            if pattern.namespace:
+                inner = (
+                    f'{namespace}:{pattern.namespace}' if namespace
+                    else pattern.namespace
+                )
+            yield from iter_routes(pattern, inner)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+            yield name, set(pattern.pattern.regex.groupindex)
+
+
+def compare(previous, current):
+    """Строки сравнения двух прогонов по p95 и числу запросов."""
+    old = {
+        (result['method'], result['name']): result
+        for result in previous['results']
+    }
+    lines = []
+    for result in current['results']:
+        before = old.get((result['method'], result['name']))
+        if before is None:
+            continue
+        change = (
+            (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+            if before['p95_ms'] else 0
+        )
+        lines.append(
+            f'{result["method"]:4} {result["name"]:40} '
+            f'p95 {before["p95_ms"]:8.2f} → {result["p95_ms"]:8.2f} мс '
+            f'({change:+.0f}%), '
+            f'запросов {before["queries"]} → {result["queries"]}'
+        )
+    return lines
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+# Кэши, не общие для рабочих процессов: сброс поколений страниц
+# в одном процессе не виден остальным.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _uses_cached_loader(engine):
+    loaders = engine.engine.loaders
+    return bool(loaders) and all(
+        isinstance(loader, (tuple, list)) and loader[0] == CACHED_LOADER
+        for loader in loaders
+    )
+
+
+@checks.register('performance', deploy=True)
+def performance_settings(app_configs, **kwargs):
+    """Настройки, без которых сайт в production заметно медленнее."""
+    errors = []
+    if settings.DEBUG:
+        errors.append(checks.Error(
+            'DEBUG включён: Django сохраняет каждый SQL-запрос в памяти.',
+            hint='Используйте профиль yatube.settings.production.',
+            id='core.E001',
+        ))
+    for engine in engines.all():
+        if (isinstance(engine, DjangoTemplates)
+                and not _uses_cached_loader(engine)):
+            errors.append(checks.Error(
+                f'Шаблоны {engine.name} загружаются без '
+                f'{CACHED_LOADER} и разбираются при каждой отрисовке.',
+                hint='Оберните загрузчики в OPTIONS["loaders"] '
+                     'в cached.Loader.',
+                id='core.E002',
+            ))
+    for alias, database in settings.DATABASES.items():
+        if not database.get('CONN_MAX_AGE'):
+            errors.append(checks.Error(
+                f'База данных {alias}: соединение открывается '
+                'заново на каждый запрос.',
+                hint='Задайте CONN_MAX_AGE больше нуля.',
+                id='core.E003',
+            ))
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_LOCAL_CACHES:
+        errors.append(checks.Error(
+            f'Кэш default ({backend}) не общий для рабочих процессов.',
+            hint='Настройте общий кэш: memcached или файловый.',
+            id='core.E004',
+        ))
+    if settings.QUERY_BUDGET_STRICT:
+        errors.append(checks.Warning(
+            'QUERY_BUDGET_STRICT включён: превышение бюджета SQL-запросов '
+            'возвращает ошибку 500.',
+            id='core.W001',
+        ))
+    return errors
+
+
+def check_performance_settings():
+    """Прерывает запуск рабочего процесса, если проверка
+    performance_settings нашла ошибки."""
+    errors = [
+        error for error in checks.run_checks(
+            tags=['performance'], include_deployment_checks=True
+        )
+        if error.is_serious()
+    ]
+    if errors:
+        raise ImproperlyConfigured(
+            'Настройки не готовы к production:\n'
+            + '\n'.join(str(error) for error in errors)
+        )
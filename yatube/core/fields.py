@@ -0,0 +1,64 @@
+import zlib
+
+from django.db import models
+
+# Тексты короче этого числа байт (UTF-8) хранятся без сжатия: выигрыш
+# на них меньше заголовка zlib и затрат на распаковку.
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+
+
+def compress_text(value, min_bytes=COMPRESS_MIN_BYTES):
+    """Сжатый текст (bytes) или сам текст, если он короче min_bytes
+    или сжатие его не уменьшает."""
+    data = value.encode()
+    if len(data) < min_bytes:
+        return value
+    compressed = zlib.compress(data, COMPRESS_LEVEL)
+    return compressed if len(compressed) < len(data) else value
+
+
+def uncompressed_text(value):
+    """Текст из значения столбца CompressedTextField. Регистрируется
+    в SQLite функцией uncompressed_text() (см. core.sqlite)."""
+    if isinstance(value, (bytes, memoryview)):
+        return zlib.decompress(value).decode()
+    return value
+
+
+class CompressedTextField(models.TextField):
+    """TextField, длинные значения которого хранятся сжатыми zlib.
+
+    На SQLite сжатый текст записывается в тот же столбец как BLOB,
+    короткий — как обычный текст: тип значения и отличает одно
+    от другого, поэтому столбец может содержать оба вида, а перевод
+    поля на сжатие не требует изменения схемы. На других СУБД текст
+    хранится без сжатия.
+
+    Сравнение со сжатым значением в SQL (LIKE, сортировка, length)
+    работает с байтами zlib; поиск по тексту выполняется через
+    полнотекстовый индекс, который получает текст функцией
+    uncompressed_text().
+    """
+
+    def __init__(self, *args, min_bytes=COMPRESS_MIN_BYTES, **kwargs):
+        self.min_bytes = min_bytes
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.min_bytes != COMPRESS_MIN_BYTES:
+            kwargs['min_bytes'] = self.min_bytes
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return uncompressed_text(value)
+
+    def to_python(self, value):
+        return super().to_python(uncompressed_text(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None or connection.vendor != 'sqlite':
+            return value
+        return compress_text(value, self.min_bytes)
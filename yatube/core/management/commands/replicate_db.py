@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import time
+
+from core.routers import REPLICA, snapshot_path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+SQLITE = 'django.db.backends.sqlite3'
+
+
+def replicate(source, target):
+    """Копирует базу SQLite source в target и записывает время снимка.
+
+    Копирование идёт через backup API: копия согласована на момент его
+    начала, а открытые соединения с target видят новое содержимое.
+    Время снимка берётся до начала копирования, чтобы записи,
+    сделанные во время него, считались отставанием.
+    """
+    snapshot_at = time.time()
+    source_db = sqlite3.connect(source)
+    target_db = sqlite3.connect(target, timeout=30)
+    try:
+        source_db.backup(target_db)
+    finally:
+        target_db.close()
+        source_db.close()
+    path = snapshot_path(target)
+    with open(path + '.tmp', 'w') as stream:
+        stream.write(repr(snapshot_at))
+    os.replace(path + '.tmp', path)
+    return snapshot_at
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в копию для чтения '
+            f'(база {REPLICA}).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять копирование каждые N секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError(f'В DATABASES нет базы {REPLICA}')
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replica = settings.DATABASES[REPLICA]
+        if {primary['ENGINE'], replica['ENGINE']} != {SQLITE}:
+            raise CommandError('Копирование поддерживается только для SQLite')
+        source, target = primary['NAME'], replica['NAME']
+        while True:
+            started = time.monotonic()
+            replicate(source, target)
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{target}: копия за {elapsed:.3f} с')
+            if not options['interval']:
+                return
+            time.sleep(max(options['interval'] - elapsed, 0))
@@ -0,0 +1,90 @@
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class QueryShape:
+    """Медленные запросы одной формы."""
+
+    def __init__(self, entry):
+        self.shape = entry['shape']
+        self.sample = entry
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.views = Counter()
+        self.call_sites = Counter()
+
+    def add(self, entry):
+        self.count += 1
+        self.total += entry['duration_ms']
+        if entry['duration_ms'] >= self.max:
+            self.max = entry['duration_ms']
+            self.sample = entry
+        self.views[entry.get('view')] += 1
+        self.call_sites[entry.get('call_site')] += 1
+
+
+def read_shapes(stream):
+    """Группирует записи журнала по форме запроса."""
+    shapes = {}
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        shape = shapes.get(entry['shape'])
+        if shape is None:
+            shape = shapes[entry['shape']] = QueryShape(entry)
+        shape.add(entry)
+    return sorted(shapes.values(), key=lambda shape: -shape.total)
+
+
+def _top(counter):
+    return ', '.join(
+        f'{name} ×{count}' for name, count in counter.most_common(3)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала медленных запросов: формы запросов по убыванию '
+        'суммарного времени.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            help='файл журнала (по умолчанию SLOW_QUERY_LOG)',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='число выводимых форм запросов',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.SLOW_QUERY_LOG
+        try:
+            with open(path, encoding='utf-8') as stream:
+                shapes = read_shapes(stream)
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+        if not shapes:
+            self.stdout.write('Медленных запросов нет')
+            return
+        for number, shape in enumerate(shapes[:options['limit']], start=1):
+            self.stdout.write(self.style.SQL_KEYWORD(
+                f'{number}. {shape.total:.1f} мс всего, '
+                f'{shape.count} раз, в среднем '
+                f'{shape.total / shape.count:.1f} мс, '
+                f'наибольшее {shape.max:.1f} мс'
+            ))
+            self.stdout.write(f'   {shape.shape}')
+            self.stdout.write(f'   view: {_top(shape.views)}')
+            self.stdout.write(f'   вызов: {_top(shape.call_sites)}')
+            for line in shape.sample.get('plan') or ():
+                self.stdout.write(f'   план: {line}')
@@ -0,0 +1,202 @@
+import atexit
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Семейства метрик: имя → (тип, описание, границы корзин гистограммы).
+FAMILIES = {
+    'yatube_http_requests_total': (
+        'counter', 'Число запросов по имени маршрута, методу и статусу.',
+        None,
+    ),
+    'yatube_http_errors_total': (
+        'counter', 'Число ответов со статусом 5xx по имени маршрута.', None,
+    ),
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'yatube_db_queries_per_request': (
+        'histogram', 'Число SQL-запросов на запрос.',
+        (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+    ),
+    'yatube_db_duration_seconds': (
+        'histogram', 'Время SQL-запросов на запрос.',
+        (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    ),
+    'yatube_cache_hits_total': (
+        'counter', 'Число попаданий в кэш.', None,
+    ),
+    'yatube_cache_misses_total': (
+        'counter', 'Число промахов кэша.', None,
+    ),
+    'yatube_cache_hit_ratio': (
+        'gauge', 'Доля попаданий в кэш за всё время.', None,
+    ),
+}
+UNRESOLVED = '<unresolved>'
+
+_LE = re.compile(r'le="([^"]+)"')
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def format_labels(**labels):
+    return ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+
+
+def _bucket(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+class Registry:
+    """Значения метрик процесса с периодическим сбросом в общий файл.
+
+    Каждый рабочий процесс копит приращения в памяти и раз
+    в METRICS_FLUSH_INTERVAL секунд прибавляет их к значениям в файле
+    SQLite METRICS_DB одной транзакцией. Файл общий для всех процессов,
+    поэтому /metrics видит сумму по ним; значения других процессов
+    отстают не больше чем на интервал сброса.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = defaultdict(float)
+        self.flushed = time.monotonic()
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self.values[name, labels] += value
+
+    def observe(self, name, labels, value):
+        buckets = FAMILIES[name][2]
+        prefix = labels + ',' if labels else ''
+        with self.lock:
+            for bound in (*buckets, float('inf')):
+                if value <= bound:
+                    key = f'{prefix}le="{_bucket(bound)}"'
+                    self.values[f'{name}_bucket', key] += 1
+            self.values[f'{name}_sum', labels] += value
+            self.values[f'{name}_count', labels] += 1
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            values, self.values = self.values, defaultdict(float)
+            self.flushed = time.monotonic()
+        if not values:
+            return
+        with connect() as db:
+            db.executemany(
+                'INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (name, labels) '
+                'DO UPDATE SET value = value + excluded.value',
+                [(name, labels, value)
+                 for (name, labels), value in values.items()],
+            )
+
+
+@contextmanager
+def connect():
+    """Соединение с файлом метрик в транзакции."""
+    db = sqlite3.connect(settings.METRICS_DB, timeout=5)
+    try:
+        db.execute('PRAGMA journal_mode = WAL')
+        with db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS metrics ('
+                'name TEXT NOT NULL, labels TEXT NOT NULL, '
+                'value REAL NOT NULL, PRIMARY KEY (name, labels))'
+            )
+            yield db
+    finally:
+        db.close()
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def observe_request(request, response, total, timings):
+    """Учитывает запрос, измеренный core.timing, в метриках."""
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else UNRESOLVED
+    labels = format_labels(view=view)
+    registry.inc('yatube_http_requests_total', format_labels(
+        view=view, method=request.method, status=response.status_code
+    ))
+    if response.status_code >= 500:
+        registry.inc('yatube_http_errors_total', labels)
+    registry.observe('yatube_http_request_duration_seconds', labels, total)
+    registry.observe(
+        'yatube_db_queries_per_request', labels, timings.sql_count
+    )
+    registry.observe('yatube_db_duration_seconds', labels, timings.sql_time)
+    if timings.cache_hits:
+        registry.inc('yatube_cache_hits_total', labels, timings.cache_hits)
+    if timings.cache_misses:
+        registry.inc(
+            'yatube_cache_misses_total', labels, timings.cache_misses
+        )
+    registry.maybe_flush()
+
+
+def _family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def _sort_key(row):
+    name, labels, _ = row
+    le = _LE.search(labels)
+    return (
+        name, _LE.sub('', labels), float(le.group(1)) if le else 0.0,
+    )
+
+
+def render():
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    registry.flush()
+    with connect() as db:
+        rows = db.execute('SELECT name, labels, value FROM metrics').fetchall()
+    samples = defaultdict(list)
+    cache = defaultdict(lambda: [0.0, 0.0])
+    for name, labels, value in sorted(rows, key=_sort_key):
+        samples[_family(name)].append((name, labels, value))
+        if name == 'yatube_cache_hits_total':
+            cache[labels][0] += value
+        elif name == 'yatube_cache_misses_total':
+            cache[labels][1] += value
+    samples['yatube_cache_hit_ratio'] = [
+        ('yatube_cache_hit_ratio', labels, hits / (hits + misses))
+        for labels, (hits, misses) in sorted(cache.items())
+    ]
+    lines = []
+    for family, (kind, description, _) in FAMILIES.items():
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in samples[family]:
+            labels = f'{{{labels}}}' if labels else ''
+            lines.append(f'{name}{labels} {value!r}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,133 @@
+import logging
+from contextlib import ExitStack, contextmanager
+from functools import partial, wraps
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """Обёртка выполнения SQL, подсчитывающая запросы."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    """Подсчитывает SQL-запросы ко всем базам, включая копию для чтения
+    и базы постов."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        yield counter
+
+
+def budget_limit(limit, per_shard=0, archive=0):
+    """Бюджет с учётом баз постов (POST_SHARDS): per_shard запросов
+    на каждую базу сверх первой и archive запросов, если включён архив
+    постов (POSTS_ARCHIVE_AFTER_DAYS)."""
+    limit += per_shard * (len(settings.POST_SHARDS) - 1)
+    if settings.POSTS_ARCHIVE_AFTER_DAYS is not None:
+        limit += archive
+    return limit
+
+
+def _check_budget(view_func, counter, budget):
+    if len(counter.queries) <= budget:
+        return
+    message = (
+        f'{view_func.__module__}.{view_func.__name__}: '
+        f'{len(counter.queries)} SQL-запросов при бюджете {budget}'
+    )
+    if settings.QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(
+            message + '\n' + '\n'.join(counter.queries)
+        )
+    logger.error(message)
+
+
+def _counted_stream(content, counter, check):
+    """Содержимое потокового ответа, запросы которого добавляются
+    к запросам view-функции; бюджет проверяется после отправки."""
+    with count_queries() as streamed:
+        yield from content
+    counter.queries.extend(streamed.queries)
+    check()
+
+
+def query_budget(limit, per_shard=0, archive=0):
+    """Декоратор view-функции, ограничивающий число SQL-запросов.
+
+    per_shard — сколько запросов добавляется с каждой базой постов
+    сверх первой, если посты распределены по базам, archive — если
+    включён архив постов. Запросы потокового ответа, выполняемые
+    во время отправки, тоже учитываются. При превышении бюджета
+    в строгом режиме (QUERY_BUDGET_STRICT, включается при запуске
+    тестов) выбрасывает QueryBudgetExceeded, иначе пишет ошибку в лог.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with count_queries() as counter:
+                response = view_func(request, *args, **kwargs)
+            check = partial(
+                _check_budget,
+                view_func,
+                counter,
+                budget_limit(limit, per_shard, archive),
+            )
+            if response.streaming:
+                response.streaming_content = _counted_stream(
+                    response.streaming_content, counter, check
+                )
+            else:
+                check()
+            return response
+        wrapper.query_budget = limit
+        wrapper.query_budget_per_shard = per_shard
+        wrapper.query_budget_archive = archive
+        return wrapper
+    return decorator
+
+
+class QueryBudgetTestMixin:
+    """Проверки бюджета запросов для TestCase."""
+
+    def assertWithinQueryBudget(self, client, url, method='get', **kwargs):
+        """Выполняет запрос и проверяет, что view-функция объявила
+        бюджет и уложилась в него."""
+        view = resolve(urlsplit(url).path).func
+        limit = getattr(view, 'query_budget', None)
+        self.assertIsNotNone(
+            limit, f'Для {url} не объявлен бюджет SQL-запросов'
+        )
+        limit = budget_limit(
+            limit, view.query_budget_per_shard, view.query_budget_archive
+        )
+        with count_queries() as counter:
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                # Запросы потокового ответа выполняются при его чтении.
+                response.streaming_content = [
+                    b''.join(response.streaming_content)
+                ]
+        self.assertLessEqual(
+            len(counter.queries), limit,
+            f'{url}: {len(counter.queries)} SQL-запросов при бюджете {limit}\n'
+            + '\n'.join(counter.queries)
+        )
+        return response
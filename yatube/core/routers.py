@@ -0,0 +1,125 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA = 'replica'
+# Приложения, чтение из которых можно направить на копию. Сессии
+# и пользователи читаются с основной базы: иначе только что вошедший
+# или зарегистрированный пользователь оказался бы анонимным.
+REPLICA_APPS = {'posts'}
+# Cookie, закрепляющая пользователя за основной базой после записи.
+PIN_COOKIE = 'db_primary'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def snapshot_path(replica_path):
+    """Файл с временем снимка, с которого сделана копия базы."""
+    return replica_path + '.snapshot'
+
+
+def replica_lag():
+    """На сколько секунд копия отстаёт от основной базы; None, если
+    копии нет или отставание неизвестно.
+
+    Отставание — 0, если основная база не менялась с момента снимка,
+    иначе время с момента снимка: изменения после него копии не видны.
+    """
+    if REPLICA not in settings.DATABASES:
+        return None
+    primary = settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+    replica = settings.DATABASES[REPLICA]['NAME']
+    try:
+        with open(snapshot_path(replica)) as stream:
+            snapshot_at = float(stream.read())
+        changed_at = max(
+            os.stat(path).st_mtime
+            for path in (primary, primary + '-wal')
+            if os.path.exists(path)
+        )
+    except (OSError, ValueError):
+        return None
+    if changed_at <= snapshot_at:
+        return 0.0
+    return time.time() - snapshot_at
+
+
+def read_alias(request):
+    """База, с которой читать данные для запроса: копия, если
+    пользователь не закреплён за основной базой и копия отстаёт
+    не больше чем на REPLICA_MAX_LAG секунд."""
+    if request.COOKIES.get(PIN_COOKIE):
+        return None
+    lag = replica_lag()
+    if lag is None or lag > settings.REPLICA_MAX_LAG:
+        return None
+    return REPLICA
+
+
+def reads_from_replica(view_func):
+    """Декоратор view-функции: чтение из REPLICA_APPS идёт с копии
+    базы, если она достаточно свежая (см. read_alias)."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        token = _read_alias.set(read_alias(request))
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Внутри блока всё читается с основной базы."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pins_primary(view_func):
+    """Декоратор view-функции записи: после успешной отправки формы
+    (ответ-перенаправление на POST) пользователь REPLICA_PIN_SECONDS
+    секунд читает с основной базы и видит свои изменения."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if request.method == 'POST' and response.status_code in (302, 303):
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Направляет чтение внутри reads_from_replica на копию базы,
+    остальное — на основную.
+
+    Основная база указывается явно: иначе Django читал бы связанные
+    объекты и сохранял бы объекты, загруженные с копии, в копию.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias and model._meta.app_label in REPLICA_APPS:
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Копия содержит те же строки, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import traceback
+
+from django.conf import settings
+from django.db import NotSupportedError
+
+from .timing import current_request
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_SKIPPED_FILES = (
+    os.sep + os.path.join('core', 'slow_queries.py'),
+    os.sep + os.path.join('core', 'timing.py'),
+    os.sep + os.path.join('core', 'query_budget.py'),
+)
+
+
+def normalize_sql(sql):
+    """Форма запроса: литералы и списки параметров заменены на «?»,
+    так что запросы, различающиеся только значениями, совпадают."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql.replace('%s', '?'))
+    sql = _PLACEHOLDERS.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+def fingerprint(value):
+    return hashlib.md5(repr(value).encode()).hexdigest()[:12]
+
+
+def call_site():
+    """Ближайшая к запросу строка кода проекта вне site-packages."""
+    base_dir = settings.BASE_DIR
+    for frame in reversed(traceback.extract_stack()):
+        if (frame.filename.startswith(base_dir)
+                and not frame.filename.endswith(_SKIPPED_FILES)
+                and 'site-packages' not in frame.filename):
+            path = os.path.relpath(frame.filename, base_dir)
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(connection, sql, params):
+    """План запроса или None, если его не удалось получить."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    try:
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            # Курсор драйвера минует execute_wrappers: EXPLAIN не должен
+            # попадать ни в этот журнал, ни в счётчики запросов view.
+            cursor.cursor.execute(f'{prefix} {sql}', params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except (NotSupportedError, connection.Database.Error):
+        return None
+
+
+def _view_name():
+    request = current_request.get()
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else None
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """Обёртка выполнения SQL, записывающая медленные запросы в лог
+    core.slow_queries строкой JSON вместе с планом запроса."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = (time.perf_counter() - started) * 1000
+    if duration >= threshold:
+        connection = context['connection']
+        logger.warning(json.dumps({
+            'duration_ms': round(duration, 3),
+            'sql': sql,
+            'shape': normalize_sql(sql),
+            'params': fingerprint(params),
+            'database': connection.alias,
+            'view': _view_name(),
+            'call_site': call_site(),
+            'plan': None if many else explain(connection, sql, params),
+        }, ensure_ascii=False, default=str))
+    return result
+
+
+def install(connection, **kwargs):
+    """Подключает slow_query_wrapper к соединению (connection_created).
+
+    Обёртка ставится первой в списке: execute_wrapper() снимает
+    последнюю, и обёртка, добавленная при переподключении внутри
+    такого блока, иначе была бы снята вместо его собственной.
+    """
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
@@ -0,0 +1,27 @@
+import sys
+
+from django.conf import settings
+
+from .fields import uncompressed_text
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Выполняет SQLITE_PRAGMAS для нового соединения с SQLite
+    и регистрирует в нём функцию uncompressed_text() (обработчик
+    connection_created).
+
+    PRAGMA выполняются на соединении драйвера, минуя execute_wrappers,
+    и не попадают в бюджеты SQL-запросов и журналы.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+    # Нужна триггерам полнотекстового индекса постов: текст поста
+    # хранится сжатым (см. core.fields.CompressedTextField).
+    # deterministic (Python 3.8+) позволяет SQLite не вызывать функцию
+    # повторно с теми же аргументами.
+    options = {'deterministic': True} if sys.version_info >= (3, 8) else {}
+    connection.connection.create_function(
+        'uncompressed_text', 1, uncompressed_text, **options
+    )
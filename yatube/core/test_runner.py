@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Запуск тестов в строгом режиме бюджетов SQL-запросов
+    (QUERY_BUDGET_STRICT): превышение бюджета view-функцией роняет
+    тест, а не только пишется в лог."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_STRICT = True
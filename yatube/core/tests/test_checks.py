@@ -0,0 +1,65 @@
+import copy
+
+from core.checks import check_performance_settings, performance_settings
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+
+def production_like():
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    databases = copy.deepcopy(settings.DATABASES)
+    for database in databases.values():
+        database['CONN_MAX_AGE'] = 600
+    return override_settings(
+        DEBUG=False,
+        TEMPLATES=templates,
+        DATABASES=databases,
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/tmp/yatube-test-cache',
+        }},
+        QUERY_BUDGET_STRICT=False,
+    )
+
+
+class PerformanceChecksTests(SimpleTestCase):
+    def error_ids(self):
+        return [error.id for error in performance_settings(None)]
+
+    @override_settings(DEBUG=True, QUERY_BUDGET_STRICT=False)
+    def test_dev_settings_fail(self):
+        """Профиль разработки не проходит проверку производительности."""
+        self.assertEqual(self.error_ids(), [
+            'core.E001', 'core.E002', 'core.E003', 'core.E003', 'core.E004',
+        ])
+        with self.assertRaises(ImproperlyConfigured):
+            check_performance_settings()
+
+    def test_production_like_settings_pass(self):
+        """Кэширующий загрузчик шаблонов, постоянные соединения, общий
+        кэш и выключенная отладка проходят проверку."""
+        with production_like():
+            self.assertEqual(self.error_ids(), [])
+            check_performance_settings()
+
+    def test_each_option_is_required(self):
+        """Каждая из настроек обязательна."""
+        cases = (
+            ({'DEBUG': True}, 'core.E001'),
+            ({'CACHES': {'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            }}}, 'core.E004'),
+            ({'QUERY_BUDGET_STRICT': True}, 'core.W001'),
+        )
+        for overrides, error_id in cases:
+            with self.subTest(error_id=error_id), production_like(), \
+                    override_settings(**overrides):
+                self.assertEqual(self.error_ids(), [error_id])
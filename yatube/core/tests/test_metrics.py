@@ -0,0 +1,93 @@
+import os
+import tempfile
+
+from core import metrics
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings = override_settings(
+            METRICS_DB=os.path.join(tmpdir.name, 'metrics.sqlite3'),
+            METRICS_TOKEN='secret',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        metrics.registry.clear()
+        cache.clear()
+        self.guest_client = Client()
+
+    def scrape(self):
+        response = self.guest_client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_metrics_by_view_name(self):
+        """Запросы, время, SQL и кэш учитываются по имени маршрута."""
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get('/missing/page/')
+        text = self.scrape()
+        expected = (
+            'yatube_http_requests_total{view="posts:index",method="GET",'
+            'status="200"} 2.0',
+            'yatube_http_requests_total{view="<unresolved>",method="GET",'
+            'status="404"} 1.0',
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2.0',
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 2.0',
+            'yatube_cache_hit_ratio{view="posts:index"} 0.5',
+            '# TYPE yatube_db_queries_per_request histogram',
+        )
+        for line in expected:
+            with self.subTest(line=line):
+                self.assertIn(line, text)
+
+    def test_processes_aggregate_in_shared_file(self):
+        """Значения процессов суммируются в общем файле метрик."""
+        workers = [metrics.Registry(), metrics.Registry()]
+        for worker in workers:
+            worker.inc(
+                'yatube_http_errors_total',
+                metrics.format_labels(view='posts:index'),
+            )
+            worker.flush()
+        self.assertIn(
+            'yatube_http_errors_total{view="posts:index"} 2.0', self.scrape()
+        )
+
+    def test_metrics_protected(self):
+        """/metrics доступна сотрудникам и с токеном, остальным — нет."""
+        url = reverse('metrics')
+        author_client = Client()
+        author_client.force_login(self.user)
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        cases = (
+            (self.guest_client, {}, 403),
+            (self.guest_client, {'HTTP_AUTHORIZATION': 'Bearer wrong'}, 403),
+            (author_client, {}, 403),
+            (staff_client, {}, 200),
+        )
+        for client, headers, status_code in cases:
+            with self.subTest(headers=headers):
+                response = client.get(url, **headers)
+                self.assertEqual(response.status_code, status_code)
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from core import routers
+from core.management.commands.replicate_db import replicate
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ReplicaLagTests(SimpleTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.primary = os.path.join(tmpdir.name, 'db.sqlite3')
+        self.replica = os.path.join(tmpdir.name, 'db.replica.sqlite3')
+        with sqlite3.connect(self.primary) as db:
+            db.execute('CREATE TABLE posts (text TEXT)')
+            db.execute("INSERT INTO posts VALUES ('Тестовый пост')")
+        databases = {
+            'default': {'NAME': self.primary},
+            'replica': {'NAME': self.replica},
+        }
+        patcher = override_settings(DATABASES=databases)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def test_replicate(self):
+        """replicate_db копирует базу; пока основная база не меняется,
+        копия не отстаёт."""
+        self.assertIsNone(routers.replica_lag())
+        replicate(self.primary, self.replica)
+        with sqlite3.connect(self.replica) as db:
+            self.assertEqual(
+                db.execute('SELECT text FROM posts').fetchall(),
+                [('Тестовый пост',)],
+            )
+        self.assertEqual(routers.replica_lag(), 0)
+
+    def test_lag_after_write(self):
+        """После записи в основную базу отставание — время с момента
+        снимка."""
+        snapshot_at = replicate(self.primary, self.replica)
+        changed_at = snapshot_at + 1
+        os.utime(self.primary, (changed_at, changed_at))
+        with mock.patch('time.time', return_value=snapshot_at + 3):
+            self.assertEqual(routers.replica_lag(), 3)
+
+    @override_settings(REPLICA_MAX_LAG=5)
+    def test_read_alias(self):
+        """Копия используется, если она достаточно свежая
+        и пользователь не закреплён за основной базой."""
+        request = RequestFactory().get('/')
+        pinned = RequestFactory().get('/')
+        pinned.COOKIES[routers.PIN_COOKIE] = '1'
+        cases = (
+            (request, 0.0, routers.REPLICA),
+            (request, 5.0, routers.REPLICA),
+            (request, 6.0, None),
+            (request, None, None),
+            (pinned, 0.0, None),
+        )
+        for request, lag, alias in cases:
+            with self.subTest(lag=lag, cookies=request.COOKIES), \
+                    mock.patch.object(routers, 'replica_lag',
+                                      return_value=lag):
+                self.assertEqual(routers.read_alias(request), alias)
+
+
+class ReplicaRouterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_router(self):
+        """С копии читаются только посты внутри reads_from_replica;
+        запись всегда идёт в основную базу."""
+        router = routers.ReplicaRouter()
+
+        @routers.reads_from_replica
+        def view(request):
+            with routers.primary_reads():
+                primary = router.db_for_read(Post)
+            return {
+                'post': router.db_for_read(Post),
+                'user': router.db_for_read(User),
+                'primary': primary,
+            }
+
+        with mock.patch.object(
+            routers, 'read_alias', return_value=routers.REPLICA
+        ):
+            aliases = view(RequestFactory().get('/'))
+        self.assertEqual(aliases, {
+            'post': 'replica', 'user': 'default', 'primary': 'default',
+        })
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+    def test_write_pins_primary(self):
+        """После создания поста пользователь закреплён за основной
+        базой."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:post_create'))
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+        response = client.post(
+            reverse('posts:post_create'), {'text': 'Тестовый пост'}
+        )
+        self.assertRedirects(
+            response, reverse('posts:profile', args=('auth',))
+        )
+        self.assertEqual(
+            response.cookies[routers.PIN_COOKIE]['max-age'],
+            settings.REPLICA_PIN_SECONDS,
+        )
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+    def test_cached_page_rendered_from_primary(self):
+        """Страница для общего кэша отрисовывается по основной базе."""
+        cache.clear()
+        Post.objects.create(author=self.user, text='Тестовый пост')
+        with mock.patch.object(
+            routers, 'read_alias', return_value=routers.REPLICA
+        ):
+            # Запрос к копии завершился бы ошибкой: копии нет
+            # в databases теста.
+            response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
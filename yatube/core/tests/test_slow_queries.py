@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from core import slow_queries
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def test_normalize_sql(self):
+        """Запросы, различающиеся только значениями, имеют одну форму."""
+        self.assertEqual(
+            slow_queries.normalize_sql(
+                "SELECT * FROM t WHERE a = 'x''y' AND id IN (%s, %s, %s)"
+                "  LIMIT 21"
+            ),
+            'SELECT * FROM t WHERE a = ? AND id IN (...) LIMIT ?',
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_logged_with_plan(self):
+        """Медленный запрос пишется в лог с формой, view, местом вызова
+        и планом выполнения."""
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            Client().get(reverse('posts:profile', args=('auth',)))
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        entry = next(
+            entry for entry in entries if 'posts_post' in entry['sql']
+        )
+        self.assertEqual(entry['view'], 'posts:profile')
+        self.assertTrue(entry['call_site'].startswith('posts'))
+        self.assertIn('?', entry['shape'])
+        self.assertEqual(len(entry['params']), 12)
+        self.assertTrue(entry['plan'])
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_disabled(self):
+        """Без порога запросы не записываются."""
+        with mock.patch.object(slow_queries.logger, 'warning') as warning:
+            Client().get(reverse('posts:index'))
+        warning.assert_not_called()
+
+    def test_report_ranks_by_total_time(self):
+        """Отчёт группирует запросы по форме и сортирует по суммарному
+        времени."""
+        entries = [
+            {'shape': 'SELECT a', 'duration_ms': 150, 'view': 'posts:index'},
+            {'shape': 'SELECT b', 'duration_ms': 120, 'view': 'posts:profile'},
+            {'shape': 'SELECT b', 'duration_ms': 110, 'view': 'posts:profile'},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'slow.jsonl')
+            with open(path, 'w', encoding='utf-8') as stream:
+                for entry in entries:
+                    stream.write(json.dumps(entry) + '\n')
+            out = StringIO()
+            call_command('slow_query_report', path, stdout=out)
+        report = out.getvalue()
+        self.assertLess(report.index('SELECT b'), report.index('SELECT a'))
+        self.assertIn('230.0 мс всего, 2 раз', report)
+        self.assertIn('posts:profile ×2', report)
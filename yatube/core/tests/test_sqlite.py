@@ -0,0 +1,77 @@
+from unittest import mock
+
+from core.write_queue import WriteQueue, run_write
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SqlitePragmaTests(TestCase):
+    def test_pragmas_applied(self):
+        """Новое соединение получает PRAGMA из SQLITE_PRAGMAS."""
+        connection.ensure_connection()
+        raw = connection.connection
+        self.assertEqual(
+            raw.execute('PRAGMA busy_timeout').fetchone(), (5000,)
+        )
+        self.assertEqual(raw.execute('PRAGMA synchronous').fetchone(), (1,))
+        self.assertEqual(raw.execute('PRAGMA temp_store').fetchone(), (2,))
+        self.assertEqual(
+            raw.execute('PRAGMA cache_size').fetchone(), (-64 * 1024,)
+        )
+
+
+class WriteQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_batch_isolates_failed_write(self):
+        """Записи пачки фиксируются вместе, ошибка одной не отменяет
+        остальные."""
+        def failing_write():
+            Post.objects.create(author=self.user, text='Откат')
+            raise ValueError('Ошибка записи')
+
+        write_queue = WriteQueue(max_batch=10, max_delay=0)
+        posts = [Post(author=self.user, text=f'Пост {i}') for i in range(2)]
+        batch = [
+            (mock.Mock(), posts[0].save, (), {}),
+            (mock.Mock(), failing_write, (), {}),
+            (mock.Mock(), posts[1].save, (), {}),
+        ]
+        write_queue.execute(batch)
+        batch[0][0].set_result.assert_called_once_with(None)
+        batch[2][0].set_result.assert_called_once_with(None)
+        error = batch[1][0].set_exception.call_args[0][0]
+        self.assertIsInstance(error, ValueError)
+        self.assertEqual(
+            set(Post.objects.values_list('text', flat=True)),
+            {'Пост 0', 'Пост 1'},
+        )
+
+    @override_settings(SQLITE_WRITE_QUEUE=True)
+    def test_run_write_in_transaction_runs_directly(self):
+        """Внутри транзакции запись не ставится в очередь: поток очереди
+        ждал бы её блокировку."""
+        with mock.patch.object(WriteQueue, 'submit') as submit:
+            post = Post(author=self.user, text='Тестовый пост')
+            run_write(post.save)
+        submit.assert_not_called()
+        self.assertIsNotNone(post.pk)
+
+
+class WriteQueueThreadTests(TransactionTestCase):
+    def test_submit_returns_result(self):
+        """Поток очереди выполняет запись и возвращает её результат."""
+        user = User.objects.create_user(username='auth')
+        write_queue = WriteQueue(max_batch=10, max_delay=0)
+        future = write_queue.submit(
+            Post.objects.create, author=user, text='Тестовый пост'
+        )
+        post = future.result(timeout=5)
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
@@ -0,0 +1,59 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        for num in range(3):
+            Post.objects.create(author=cls.user, text=f'Тестовый пост {num}')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_server_timing_header(self):
+        """Заголовок Server-Timing содержит время запроса, SQL, кэш
+        и время отрисовки шаблонов, включая вложенные."""
+        response = self.guest_client.get(reverse('posts:index'))
+        metrics = {
+            metric.split(';')[0]: metric
+            for metric in response['Server-Timing'].split(', ')
+        }
+        self.assertIn('total', metrics)
+        self.assertRegex(metrics['sql'], r'desc="\d+ queries"')
+        self.assertIn('desc="hits=0 misses=3"', metrics['cache'])
+        self.assertIn('tpl-posts-index.html', metrics)
+        self.assertIn('tpl-posts-includes-paginator.html', metrics)
+        self.assertIn(
+            'desc="posts/includes/post_card.html x3"',
+            metrics['tpl-posts-includes-post_card.html'],
+        )
+
+    def test_log_record(self):
+        """Для каждого измеренного запроса пишется строка JSON в лог."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.guest_client.get(reverse('posts:index'))
+            self.guest_client.get(reverse('posts:index'))
+        records = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['status'], 200)
+        self.assertEqual(records[0]['path'], reverse('posts:index'))
+        self.assertGreater(records[0]['sql_count'], 0)
+        self.assertEqual(records[1]['cache_hits'], 3)
+        self.assertIn('posts/index.html', records[1]['templates'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        """При нулевой доле выборки запросы не измеряются."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
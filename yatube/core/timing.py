@@ -0,0 +1,199 @@
+import json
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timings', default=None)
+# Запрос, который обрабатывается в текущем потоке или задаче.
+current_request = ContextVar('current_request', default=None)
+_MISSING = object()
+# Символы, недопустимые в имени метрики Server-Timing (token по RFC 7230).
+_NOT_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+class RequestTimings:
+    """Измерения одного запроса: SQL, шаблоны и кэш."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.templates = defaultdict(lambda: [0, 0.0])
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - started
+
+    def template_rendered(self, name, duration):
+        stats = self.templates[name]
+        stats[0] += 1
+        stats[1] += duration
+
+    def header(self, total):
+        """Значение заголовка Server-Timing; длительности в мс."""
+        metrics = [
+            f'total;dur={total * 1000:.1f}',
+            f'sql;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.sql_count} queries"',
+            f'cache;desc="hits={self.cache_hits} '
+            f'misses={self.cache_misses}"',
+        ]
+        for name, (count, duration) in self.templates.items():
+            desc = name if count == 1 else f'{name} x{count}'
+            metrics.append(
+                f'tpl-{_NOT_TOKEN.sub("-", name)};'
+                f'dur={duration * 1000:.1f};desc="{desc}"'
+            )
+        return ', '.join(metrics)
+
+    def log_record(self, request, response, total):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'templates': {
+                name: {'count': count, 'ms': round(duration * 1000, 2)}
+                for name, (count, duration) in self.templates.items()
+            },
+        }
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        timings = _current.get()
+        if timings is None:
+            return render(self, context)
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.template_rendered(
+                self.name or '<string>', time.perf_counter() - started
+            )
+    wrapper.timed = True
+    return wrapper
+
+
+def _timed_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        timings = _current.get()
+        if timings is None:
+            return get(self, key, default, version)
+        value = get(self, key, _MISSING, version)
+        if value is _MISSING:
+            timings.cache_misses += 1
+            return default
+        timings.cache_hits += 1
+        return value
+    wrapper.timed = True
+    return wrapper
+
+
+def _timed_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        timings = _current.get()
+        if timings is None:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        # BaseCache.get_many вызывает get: обращения не считаются дважды.
+        token = _current.set(None)
+        try:
+            values = get_many(self, keys, version)
+        finally:
+            _current.reset(token)
+        timings.cache_hits += len(values)
+        timings.cache_misses += len(keys) - len(values)
+        return values
+    wrapper.timed = True
+    return wrapper
+
+
+def install():
+    """Подключает измерение шаблонов и кэша.
+
+    У Django нет сигналов отрисовки шаблона и обращения к кэшу вне
+    тестов, поэтому оборачиваются Template.render и методы get/get_many
+    классов настроенных кэшей. Вне измеряемого запроса обёртка стоит
+    одного обращения к ContextVar.
+    """
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if not getattr(backend.get, 'timed', False):
+            backend.get = _timed_get(backend.get)
+        if not getattr(backend.get_many, 'timed', False):
+            backend.get_many = _timed_get_many(backend.get_many)
+
+
+class ServerTimingMiddleware:
+    """Измеряет запросы: выборку отдаёт в заголовке Server-Timing
+    и строкой JSON в лог core.timing, все — в метрики core.metrics.
+
+    Доля запросов с заголовком и строкой лога задаётся
+    SERVER_TIMING_SAMPLE_RATE, метрики включаются METRICS_ENABLED.
+    Middleware ставится первым, чтобы total включал остальные;
+    обрабатываемый запрос доступен через current_request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_request.set(request)
+        try:
+            return self.measure(request)
+        finally:
+            current_request.reset(token)
+
+    def measure(self, request):
+        sampled = random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+        if not sampled and not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                started = time.perf_counter()
+                response = self.get_response(request)
+                total = time.perf_counter() - started
+        finally:
+            _current.reset(token)
+        if settings.METRICS_ENABLED:
+            metrics.observe_request(request, response, total, timings)
+        if sampled:
+            response['Server-Timing'] = timings.header(total)
+            logger.info(json.dumps(
+                timings.log_record(request, response, total),
+                ensure_ascii=False,
+            ))
+        return response
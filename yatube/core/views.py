@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from . import metrics as registry
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _authorized(request):
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(header, f'Bearer {token}'):
+        return True
+    return request.user.is_staff
+
+
+def metrics(request):
+    """Метрики Prometheus для сотрудников и сборщика с токеном."""
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
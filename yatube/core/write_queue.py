@@ -0,0 +1,114 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connections, transaction
+
+
+class WriteQueue:
+    """Очередь записи в базу из одного потока процесса.
+
+    SQLite допускает одну пишущую транзакцию за раз: конкурирующие
+    запросы ждут блокировку, а при её истечении получают «database is
+    locked». Очередь выполняет записи всех потоков процесса в одном
+    потоке, объединяя накопившиеся (не больше max_batch) в одну
+    транзакцию: одна фиксация на пачку вместо одной на запись. Каждая
+    запись выполняется в своей точке сохранения, так что ошибка одной
+    не отменяет остальные.
+    """
+
+    def __init__(self, max_batch, max_delay, using='default'):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.using = using
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def submit(self, func, *args, **kwargs):
+        """Ставит func(*args, **kwargs) в очередь; возвращает Future."""
+        self.start()
+        future = Future()
+        self.jobs.put((future, func, args, kwargs))
+        return future
+
+    def start(self):
+        # После fork потока записи в дочернем процессе нет.
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                threading.Thread(
+                    target=self.run, name='write-queue', daemon=True
+                ).start()
+
+    def next_batch(self):
+        # Пачка — всё, что накопилось за время предыдущей транзакции,
+        # плюс поступившее за max_delay секунд после первой записи.
+        batch = [self.jobs.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.jobs.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                ))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        # Соединение потока живёт, пока жив поток: CONN_MAX_AGE относится
+        # к соединениям запросов, а переподключение к SQLite с PRAGMA
+        # на каждую пачку дороже самой записи.
+        while True:
+            self.execute(self.next_batch())
+
+    def execute(self, batch):
+        results = []
+        try:
+            with transaction.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic(using=self.using):
+                            results.append((future, func(*args, **kwargs)))
+                    except Exception as error:
+                        future.set_exception(error)
+        except Exception as error:
+            # Не удалась сама фиксация: результаты записей недействительны.
+            for future, _ in results:
+                future.set_exception(error)
+            return
+        for future, result in results:
+            future.set_result(result)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteQueue(
+                settings.SQLITE_WRITE_QUEUE_MAX_BATCH,
+                settings.SQLITE_WRITE_QUEUE_MAX_DELAY,
+            )
+        return _queue
+
+
+def run_write(func, *args, **kwargs):
+    """Выполняет запись func(*args, **kwargs): через очередь записи,
+    если включена SQLITE_WRITE_QUEUE, иначе сразу в текущем потоке.
+
+    Внутри открытой транзакции запись выполняется сразу: поток очереди
+    ждал бы блокировку, которую держит эта транзакция.
+    """
+    if (not settings.SQLITE_WRITE_QUEUE
+            or connections['default'].in_atomic_block):
+        return func(*args, **kwargs)
+    return get_queue().submit(func, *args, **kwargs).result()
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .search import match_expression, matching_ids, search_available
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,16 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE по таблице."""
+        if not search_term or not search_available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        if not match_expression(search_term):
+            return queryset.none(), False
+        return queryset.filter(id__in=matching_ids(search_term)), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
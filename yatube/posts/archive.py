@@ -0,0 +1,367 @@
+"""Архив старых постов.
+
+Посты, не менявшиеся дольше POSTS_ARCHIVE_AFTER_DAYS дней, команда
+archive_posts переносит из таблицы постов в архивные базы SQLite,
+по одной на месяц публикации, в каталоге POSTS_ARCHIVE_DIR. Текст
+в них сжат zlib; в основной базе остаётся строка ArchivedPost с полями
+лент и карточки поста. Так таблица постов и её индексы содержат только
+свежие посты, которые читаются почти всегда, и остаются в кэше страниц.
+
+Страница поста, профайл и ленты сайта читают архивные посты вместе
+со свежими (with_archive, get_post_or_404); текст архивного поста
+читается при обращении. Счётчики постов архивные посты учитывают.
+Команда restore_posts возвращает посты из архива, редактирование
+архивного поста автором — тоже. Поиск, ленты Atom/RSS и API выводят
+только свежие посты.
+"""
+
+import heapq
+import itertools
+import os
+import sqlite3
+import zlib
+from contextlib import closing
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from .bulk import insert_posts
+from .models import ArchivedPost, Post, PostRoute
+from .paginators import CursorPaginator
+from .rows import ArchivedPostRow
+from .sharding import (OBJECT_ITERABLES, MergedQuerySet, _Descending,
+                       author_shard, is_sharded, post_shard, shards)
+
+ARCHIVE_TABLE = 'posts'
+# Наибольшее число id в одном запросе к архивной базе или таблице
+# постов.
+CHUNK_SIZE = 500
+ARCHIVED_FIELDS = ('id', 'pub_date', 'updated_at', 'version', 'author_id',
+                   'group_id')
+
+
+def is_enabled():
+    return settings.POSTS_ARCHIVE_AFTER_DAYS is not None
+
+
+def archive_cutoff(days=None):
+    """Время, раньше которого должно быть последнее изменение поста,
+    чтобы перенести его в архив."""
+    if days is None:
+        days = settings.POSTS_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def month_of(pub_date):
+    """Месяц публикации (по UTC) — архивная база поста."""
+    return pub_date.astimezone(timezone.utc).strftime('%Y-%m')
+
+
+def archive_path(month):
+    return os.path.join(settings.POSTS_ARCHIVE_DIR, f'posts-{month}.sqlite3')
+
+
+def _connect(month, create=False):
+    path = archive_path(month)
+    if not create:
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    os.makedirs(settings.POSTS_ARCHIVE_DIR, exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute(
+        f'CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} '
+        '(id INTEGER PRIMARY KEY, text BLOB NOT NULL)'
+    )
+    return db
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _by_month(posts):
+    months = {}
+    for post in posts:
+        months.setdefault(month_of(post.pub_date), []).append(post)
+    return months
+
+
+def read_texts(posts):
+    """Тексты архивных постов posts: {id: текст}."""
+    texts = {}
+    for month, month_posts in _by_month(posts).items():
+        with closing(_connect(month)) as db:
+            for chunk in _chunks([post.pk for post in month_posts]):
+                texts.update(
+                    (pk, zlib.decompress(data).decode())
+                    for pk, data in db.execute(
+                        f'SELECT id, text FROM {ARCHIVE_TABLE} WHERE id IN '
+                        f'({", ".join("?" * len(chunk))})',
+                        chunk,
+                    )
+                )
+    return texts
+
+
+def read_page_texts(posts):
+    """Читает тексты архивных постов среди posts (страницы ленты) одним
+    вызовом read_texts, а не по запросу к архиву на каждую карточку."""
+    archived = [
+        post for post in posts
+        if isinstance(post, (ArchivedPost, ArchivedPostRow))
+    ]
+    if archived:
+        texts = read_texts(archived)
+        for post in archived:
+            post.text = texts[post.pk]
+
+
+def _write_texts(posts):
+    """Записывает тексты постов posts в архивные базы их месяцев."""
+    for month, month_posts in _by_month(posts).items():
+        with closing(_connect(month, create=True)) as db, db:
+            db.executemany(
+                f'INSERT OR REPLACE INTO {ARCHIVE_TABLE} (id, text) '
+                'VALUES (?, ?)',
+                [
+                    (post.pk, zlib.compress(post.text.encode(), 9))
+                    for post in month_posts
+                ],
+            )
+
+
+def _delete_texts(posts):
+    for month, month_posts in _by_month(posts).items():
+        with closing(_connect(month, create=True)) as db, db:
+            for chunk in _chunks([post.pk for post in month_posts]):
+                db.execute(
+                    f'DELETE FROM {ARCHIVE_TABLE} WHERE id IN '
+                    f'({", ".join("?" * len(chunk))})',
+                    chunk,
+                )
+
+
+def _lock_posts(alias):
+    # Первый запрос транзакции — запись: SQLite сразу берёт блокировку
+    # записи, и отобранные посты не изменятся до их переноса.
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {Post._meta.db_table} WHERE 0')
+
+
+def _delete_posts(alias, pks, model=Post):
+    # Без сигналов: посты не удаляются, а переносятся между таблицей
+    # постов и архивом, счётчики, кэш и тексты в архиве менять незачем.
+    with connections[alias].cursor() as cursor:
+        for chunk in _chunks(pks):
+            cursor.execute(
+                f'DELETE FROM {model._meta.db_table} WHERE id IN '
+                f'({", ".join(["%s"] * len(chunk))})',
+                chunk,
+            )
+
+
+def archive_posts(cutoff, batch_size=1000):
+    """Переносит в архив посты, не менявшиеся с cutoff.
+
+    Посты переносятся пачками по batch_size, каждая — в транзакции
+    базы постов, заблокированной для записи. Тексты записываются
+    в архив до удаления постов: прерванный перенос оставит пост
+    на месте, а повторный перенесёт его заново. Возвращает число
+    перенесённых постов.
+    """
+    archived = 0
+    for alias in shards():
+        while True:
+            with transaction.atomic(using=alias):
+                _lock_posts(alias)
+                posts = list(
+                    Post.objects.using(alias).filter(
+                        updated_at__lt=cutoff
+                    ).order_by('pk')[:batch_size]
+                )
+                if not posts:
+                    break
+                pks = [post.pk for post in posts]
+                _write_texts(posts)
+                _delete_posts(DEFAULT_DB_ALIAS, pks, ArchivedPost)
+                ArchivedPost.objects.bulk_create([
+                    ArchivedPost(**{
+                        field: getattr(post, field)
+                        for field in ARCHIVED_FIELDS
+                    })
+                    for post in posts
+                ])
+                _delete_posts(alias, pks)
+            archived += len(posts)
+    return archived
+
+
+def restore_posts(archived, batch_size=1000):
+    """Возвращает посты из архива (archived — запрос ArchivedPost)
+    в базы постов их авторов. Возвращает число возвращённых постов."""
+    restored = 0
+    rows = list(archived.order_by('pk'))
+    for batch in _chunks(rows, batch_size):
+        texts = read_texts(batch)
+        aliases = {
+            author_id: author_shard(author_id)
+            for author_id in {row.author_id for row in batch}
+        }
+        by_alias = {}
+        for row in batch:
+            by_alias.setdefault(aliases[row.author_id], []).append(row)
+        for alias, alias_rows in by_alias.items():
+            pks = [row.pk for row in alias_rows]
+            with transaction.atomic(using=alias):
+                _lock_posts(alias)
+                existing = set(
+                    Post.objects.using(alias).filter(
+                        pk__in=pks
+                    ).values_list('pk', flat=True)
+                )
+                posts = [
+                    Post(text=texts[row.pk], **{
+                        field: getattr(row, field)
+                        for field in ARCHIVED_FIELDS
+                    })
+                    for row in alias_rows if row.pk not in existing
+                ]
+                for post in posts:
+                    post.render()
+                insert_posts(posts, alias)
+                if is_sharded() and alias != DEFAULT_DB_ALIAS:
+                    # Посты, созданные до шардирования, маршрута не имеют.
+                    PostRoute.objects.bulk_create(
+                        [
+                            PostRoute(pk=row.pk, author_id=row.author_id)
+                            for row in alias_rows
+                        ],
+                        ignore_conflicts=True,
+                    )
+                _delete_posts(DEFAULT_DB_ALIAS, pks, ArchivedPost)
+        _delete_texts(batch)
+        restored += len(batch)
+    return restored
+
+
+class ArchiveMergedQuerySet(MergedQuerySet):
+    """Лента свежих постов вместе с архивом; последний запрос — запрос
+    ArchivedPost.
+
+    Архивные посты почти все старше свежих, поэтому глубокие страницы
+    не сливают все строки до страницы, а читают со смещением свежие
+    посты, идущие раньше самого нового архивного, а за ними — архив.
+    Свежие посты, идущие позже него (возвращённые из архива), сливаются
+    с окном архива, в котором может оказаться страница.
+    """
+
+    def _fetch(self):
+        if self._result_cache is not None:
+            return self._result_cache
+        if (self.start and self.stop is not None
+                and issubclass(
+                    self.querysets[0]._iterable_class, OBJECT_ITERABLES
+                )):
+            self._result_cache = self._fetch_deep()
+        super()._fetch()
+        if self.stop is not None:
+            read_page_texts(self._result_cache)
+        return self._result_cache
+
+    def _fetch_deep(self):
+        ordering = self._ordering()
+        names = [name.lstrip('-') for name in ordering]
+        *hot, archived = self.querysets
+        hot = hot[0] if len(hot) == 1 else MergedQuerySet(hot)
+        newest = archived.values_list(*names).first()
+        if newest is None:
+            return list(hot[self.start:self.stop])
+        earlier = CursorPaginator(archived, 1, ordering)._keyset_filter(
+            newest, reverse=True
+        )
+        before = hot.filter(earlier).count()
+        rows = []
+        if self.start < before:
+            rows = list(hot[self.start:min(self.stop, before)])
+        if self.stop <= before:
+            return rows
+        offset, limit = max(self.start - before, 0), self.stop - before
+        late = [
+            (*row, 0) for row in hot.exclude(earlier).values_list(*names, 'pk')
+        ]
+        if not late:
+            return rows + list(archived[offset:limit])
+        return rows + self._merge_late(hot, archived, late, offset, limit)
+
+    def _merge_late(self, hot, archived, late, offset, limit):
+        """Посты offset:limit слияния архива со свежими постами late,
+        идущими позже самого нового архивного (кортежи полей порядка,
+        pk и 0)."""
+        ordering = self._ordering()
+        names = [name.lstrip('-') for name in ordering]
+
+        def key(row):
+            return tuple(
+                _Descending(value) if name.startswith('-') else value
+                for value, name in zip(row, ordering)
+            )
+        # Строка архива с номером n стоит в ленте не дальше n + len(late).
+        start = max(offset - len(late), 0)
+        window = [
+            (*row, 1)
+            for row in archived.values_list(*names, 'pk')[start:limit]
+        ]
+        if not window:
+            return []
+        position = start
+        if start:
+            first = key(window[0])
+            position += sum(key(row) < first for row in late)
+            late = [row for row in late if not key(row) < first]
+        page = list(itertools.islice(
+            heapq.merge(window, late, key=key),
+            offset - position,
+            limit - position,
+        ))
+        pks = ([], [])
+        for *_, pk, source in page:
+            pks[source].append(pk)
+        objects = {}
+        for source, queryset in enumerate((hot, archived)):
+            if pks[source]:
+                objects.update(
+                    ((source, obj.pk), obj)
+                    for obj in queryset.filter(pk__in=pks[source])
+                )
+        return [objects[source, pk] for *_, pk, source in page]
+
+
+def with_archive(queryset, archived):
+    """Лента queryset вместе с архивными постами archived (запрос
+    ArchivedPost с теми же условиями)."""
+    if not is_enabled():
+        return queryset
+    if isinstance(queryset, MergedQuerySet):
+        return ArchiveMergedQuerySet([*queryset.querysets, archived])
+    return ArchiveMergedQuerySet([queryset, archived])
+
+
+def get_post_or_404(queryset, archived, pk):
+    """Пост с id pk из queryset или, если его там нет, из архива
+    (archived — запрос ArchivedPost)."""
+    try:
+        return queryset.get(pk=pk)
+    except Post.DoesNotExist:
+        if not is_enabled():
+            archived = archived.none()
+        return get_object_or_404(archived, pk=pk)
+
+
+def restore_post(post):
+    """Возвращает архивный пост post из архива; возвращает его
+    экземпляр Post."""
+    restore_posts(ArchivedPost.objects.filter(pk=post.pk))
+    return Post.objects.using(post_shard(post.pk)).get(pk=post.pk)
@@ -0,0 +1,82 @@
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .cache import invalidate_bulk_pages
+from .counters import update_counts
+from .models import Post
+from .sharding import is_sharded, place_new_posts
+
+
+def insert_posts(posts, using=DEFAULT_DB_ALIAS):
+    """Сохраняет посты пачками INSERT в базу using с датами, заданными
+    в объектах, а не текущими.
+
+    В отличие от bulk_create, не применяет auto_now_add и auto_now
+    к датам поста, а поля модели не меняет: посты, которые в это время
+    сохраняются в других потоках, получают даты как обычно. Id постов
+    сохраняются, если заданы у всех постов.
+    """
+    if not posts:
+        return
+    meta = Post._meta
+    fields = [
+        field for field in meta.concrete_fields
+        if field is not meta.auto_field
+        or all(post.pk is not None for post in posts)
+    ]
+    batch_size = max(
+        connections[using].ops.bulk_batch_size(fields, posts), 1
+    )
+    queryset = Post.objects.using(using)
+    for start in range(0, len(posts), batch_size):
+        # raw: значения полей берутся из объектов без pre_save().
+        queryset._insert(
+            posts[start:start + batch_size], fields, raw=True, using=using
+        )
+    for post in posts:
+        post._state.adding = False
+        post._state.db = using
+
+
+def bulk_create_posts(posts, explicit_dates=False):
+    """Сохраняет посты пачками INSERT в одной транзакции.
+
+    bulk_create не отправляет сигналы, поэтому счётчики постов
+    обновляются одним UPDATE на таблицу, а кэш страниц сбрасывается
+    один раз для всех затронутых авторов и групп. Текст постов
+    отрисовывается, как в Post.save. Постам назначаются id;
+    при шардировании каждый пост сохраняется в базу своего автора.
+    С explicit_dates даты постов сохраняются как заданы в объектах
+    (см. insert_posts).
+    """
+    if not posts:
+        return posts
+    for post in posts:
+        post.render()
+    with transaction.atomic():
+        if is_sharded():
+            for alias, shard_posts in place_new_posts(posts):
+                _create(shard_posts, alias, explicit_dates)
+        else:
+            _create(posts, DEFAULT_DB_ALIAS, explicit_dates)
+        if posts[0].pk is None:
+            # SQLite не возвращает id вставленных строк; пока открыта
+            # транзакция, последние id таблицы принадлежат этим постам.
+            ids = Post.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(posts)]
+            for post, pk in zip(posts, reversed(list(ids))):
+                post.pk = pk
+        authors = Counter(post.author_id for post in posts)
+        groups = Counter(post.group_id for post in posts)
+        update_counts(authors, groups)
+    invalidate_bulk_pages(set(authors), set(groups) - {None})
+    return posts
+
+
+def _create(posts, alias, explicit_dates):
+    if explicit_dates:
+        insert_posts(posts, alias)
+    else:
+        Post.objects.using(alias).bulk_create(posts)
@@ -0,0 +1,228 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from core.routers import primary_reads
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.safestring import mark_safe
+
+from .models import ArchivedPost, Group, Post, User
+from .sharding import on_author_shard, shards
+
+PAGE_SCOPE_KEY = 'page-scope:{}'
+PAGE_KEY = 'page:{}:{}'
+PAGE_STATS_KEY = 'page-cache:{}'
+VALIDATOR_HEADERS = ('ETag',)
+
+
+def card_key(template_name, post):
+    """Ключ карточки поста.
+
+    Дата публикации защищает от повторного использования id после
+    удаления последнего поста, версия — от устаревшего содержимого.
+    """
+    return 'post-card:{}:{}:{}:{}'.format(
+        template_name,
+        post.pk,
+        post.version,
+        int(post.pub_date.timestamp() * 1000000),
+    )
+
+
+def post_cards(posts, template_name):
+    """Отрисованные карточки постов страницы.
+
+    Кэш опрашивается одним get_many; недостающие карточки
+    отрисовываются и сохраняются одним set_many.
+    """
+    keys = [card_key(template_name, post) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = render_to_string(template_name, {'post': post})
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
+
+
+def bump_post_versions(**filters):
+    """Делает устаревшими карточки постов, отобранных filters.
+
+    Время изменения постов обновляется: от него зависит ETag страниц,
+    на которых выводятся карточки.
+    """
+    querysets = [Post.objects.using(alias) for alias in shards()]
+    for queryset in querysets + [ArchivedPost.objects]:
+        queryset.filter(**filters).update(
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+
+
+def _count_page_request(result):
+    key = PAGE_STATS_KEY.format(result)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def page_cache_stats():
+    """Счётчики попаданий и промахов кэша страниц."""
+    results = ('hits', 'misses')
+    values = cache.get_many([PAGE_STATS_KEY.format(name) for name in results])
+    return {
+        name: values.get(PAGE_STATS_KEY.format(name), 0) for name in results
+    }
+
+
+def anonymous_page_cache(scope):
+    """Декоратор view-функции: кэширует страницы для анонимных
+    пользователей, если задан POSTS_PAGE_CACHE_TIMEOUT.
+
+    scope — шаблон области кэша, заполняемый аргументами view-функции
+    (например, 'group:{slug}'). Страницы области сбрасываются вместе
+    сменой её поколения (см. invalidate_pages); поколение и страница
+    читаются одним get_many. Вместе со страницей сохраняется её ETag,
+    так что попадание в кэш может завершиться ответом 304.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.POSTS_PAGE_CACHE_TIMEOUT
+            if (not timeout or request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view_func(request, *args, **kwargs)
+            scope_key = PAGE_SCOPE_KEY.format(scope.format(**kwargs))
+            path_hash = hashlib.md5(
+                request.get_full_path().encode()
+            ).hexdigest()
+            page_key = PAGE_KEY.format(scope.format(**kwargs), path_hash)
+            cached = cache.get_many([scope_key, page_key])
+            generation = cached.get(scope_key)
+            entry = cached.get(page_key)
+            if entry is not None and entry[0] == generation:
+                _count_page_request('hits')
+                generation, content, content_type, headers = entry
+                not_modified = get_conditional_response(
+                    request, etag=headers.get('ETag')
+                )
+                response = not_modified or HttpResponse(
+                    content, content_type=content_type
+                )
+                for header, value in headers.items():
+                    response[header] = value
+                response['X-Page-Cache'] = 'hit'
+                return response
+            _count_page_request('misses')
+            if generation is None:
+                cache.add(scope_key, uuid.uuid4().hex, None)
+                generation = cache.get(scope_key)
+            # Страница для общего кэша читается с основной базы: копия
+            # может ещё не содержать запись, сбросившую поколение.
+            with primary_reads():
+                response = view_func(request, *args, **kwargs)
+            # Страница сохраняется с поколением, прочитанным до её
+            # отрисовки: сброс во время отрисовки сделает её устаревшей.
+            if response.status_code == 200 and not response.cookies:
+                headers = {
+                    header: response[header]
+                    for header in VALIDATOR_HEADERS
+                    if response.has_header(header)
+                }
+                cache.set(
+                    page_key,
+                    (generation, response.content, response['Content-Type'],
+                     headers),
+                    timeout,
+                )
+            response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_pages(scopes):
+    """Сбрасывает закэшированные страницы областей scopes."""
+    if settings.POSTS_PAGE_CACHE_TIMEOUT:
+        cache.set_many(
+            {PAGE_SCOPE_KEY.format(scope): uuid.uuid4().hex
+             for scope in scopes},
+            None,
+        )
+
+
+def invalidate_post_pages(post, previous_author_id=None,
+                          previous_group_id=None):
+    """Сбрасывает страницы, на которых выводится (или выводился) пост:
+    главную, страницы его группы и профайл автора.
+
+    Сбрасываются области целиком, а не страницы с постом: новый или
+    удалённый пост сдвигает все страницы ленты, а страницы с изменённым
+    постом не найти без списка постов каждой закэшированной страницы.
+    Сброс — одна запись в кэш; страницы отрисовываются заново из
+    закэшированных карточек (post_cards), и в кэше они живут недолго
+    (POSTS_PAGE_CACHE_TIMEOUT).
+    """
+    if not settings.POSTS_PAGE_CACHE_TIMEOUT:
+        return
+    scopes = {'index', f'profile:{post.author.username}'}
+    if post.group_id is not None:
+        scopes.add(f'group:{post.group.slug}')
+    if previous_author_id not in (None, post.author_id):
+        scopes.update(
+            f'profile:{username}' for username in User.objects.filter(
+                pk=previous_author_id
+            ).values_list('username', flat=True)
+        )
+    if previous_group_id not in (None, post.group_id):
+        scopes.update(
+            f'group:{slug}' for slug in Group.objects.filter(
+                pk=previous_group_id
+            ).values_list('slug', flat=True)
+        )
+    invalidate_pages(scopes)
+
+
+def invalidate_author_pages(author, previous_username):
+    """Сбрасывает страницы с постами переименованного автора."""
+    if not settings.POSTS_PAGE_CACHE_TIMEOUT:
+        return
+    group_slugs = on_author_shard(
+        Group.objects.filter(posts__author=author), author
+    ).values_list('slug', flat=True).distinct()
+    archived_group_slugs = Group.objects.filter(
+        archived_posts__author=author
+    ).values_list('slug', flat=True).distinct()
+    invalidate_pages(
+        {'index', f'profile:{author.username}',
+         f'profile:{previous_username}'}
+        | {f'group:{slug}' for slug in group_slugs}
+        | {f'group:{slug}' for slug in archived_group_slugs}
+    )
+
+
+def invalidate_bulk_pages(author_ids, group_ids):
+    """Сбрасывает страницы, на которых выводятся посты авторов
+    author_ids и групп group_ids (после массовых изменений)."""
+    if not settings.POSTS_PAGE_CACHE_TIMEOUT:
+        return
+    usernames = User.objects.filter(pk__in=author_ids).values_list(
+        'username', flat=True
+    )
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    )
+    invalidate_pages(
+        {'index'}
+        | {f'profile:{username}' for username in usernames}
+        | {f'group:{slug}' for slug in slugs}
+    )
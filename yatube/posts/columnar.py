@@ -0,0 +1,106 @@
+import json
+import struct
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone
+
+MAGIC = b'YTCOL1\n'
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+INT = 'int64'
+TIMESTAMP = 'timestamp'
+STRING = 'string'
+
+_UINT32 = struct.Struct('<I')
+
+
+def _int64(values):
+    data = array('q', values)
+    if data.itemsize != 8:
+        raise RuntimeError('Нет 64-битного типа для array')
+    return data.tobytes()
+
+
+def _encode(kind, values):
+    if kind == INT:
+        return _int64(values)
+    if kind == TIMESTAMP:
+        return _int64(
+            (value - EPOCH) // timedelta(microseconds=1) for value in values
+        )
+    encoded = [None if value is None else value.encode() for value in values]
+    lengths = _int64(-1 if value is None else len(value) for value in encoded)
+    return lengths + b''.join(value for value in encoded if value)
+
+
+def _decode(kind, data, count):
+    numbers = array('q')
+    numbers.frombytes(data[:count * 8])
+    if kind == INT:
+        return numbers.tolist()
+    if kind == TIMESTAMP:
+        return [EPOCH + timedelta(microseconds=value) for value in numbers]
+    values = []
+    offset = count * 8
+    for length in numbers:
+        if length < 0:
+            values.append(None)
+            continue
+        values.append(data[offset:offset + length].decode())
+        offset += length
+    return values
+
+
+class ColumnarWriter:
+    """Запись строк в компактном колоночном формате.
+
+    Файл — сигнатура MAGIC, заголовок со списком колонок (пар
+    (имя, тип)) и последовательность групп строк. Группа строк — число
+    строк и по одному сжатому zlib блоку на колонку. Целые числа и даты
+    (микросекунды от начала эпохи, UTC) хранятся массивами int64,
+    строки — массивом длин (-1 для NULL) и следующими за ним байтами UTF-8.
+    """
+
+    def __init__(self, stream, columns):
+        self.stream = stream
+        self.columns = list(columns)
+        header = json.dumps(self.columns).encode()
+        stream.write(MAGIC + _UINT32.pack(len(header)) + header)
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        self.stream.write(_UINT32.pack(len(rows)))
+        for position, (_, kind) in enumerate(self.columns):
+            block = zlib.compress(
+                _encode(kind, [row[position] for row in rows])
+            )
+            self.stream.write(_UINT32.pack(len(block)) + block)
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError('Файл выгрузки обрезан')
+    return data
+
+
+def read_columnar(stream):
+    """Строки файла в виде словарей {колонка: значение}."""
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError('Неизвестный формат файла')
+    (size,) = _UINT32.unpack(_read_exactly(stream, _UINT32.size))
+    columns = json.loads(_read_exactly(stream, size))
+    while True:
+        head = stream.read(_UINT32.size)
+        if not head:
+            return
+        (count,) = _UINT32.unpack(head)
+        values = []
+        for _, kind in columns:
+            (size,) = _UINT32.unpack(_read_exactly(stream, _UINT32.size))
+            block = zlib.decompress(_read_exactly(stream, size))
+            values.append(_decode(kind, block, count))
+        names = [name for name, _ in columns]
+        for row in zip(*values):
+            yield dict(zip(names, row))
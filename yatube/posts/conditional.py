@@ -0,0 +1,59 @@
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+class PageValidators:
+    """ETag страницы, вычисленный без её отрисовки.
+
+    state — значения, от которых зависит содержимое страницы;
+    если per_user, страница также зависит от пользователя, которому
+    она выводится. Last-Modified не отдаётся: время изменения постов
+    не меняется при удалении поста, смене пользователя или описания
+    группы, и по If-Modified-Since клиент получил бы устаревшую
+    страницу.
+    """
+
+    def __init__(self, request, *state, per_user=True):
+        if per_user:
+            state = (request.user.pk,) + state
+        self.etag = quote_etag(
+            hashlib.md5(repr(state).encode()).hexdigest()
+        )
+
+    def not_modified(self, request):
+        """Ответ 304 (или 412), если у клиента актуальная версия
+        страницы, иначе None."""
+        return get_conditional_response(request, etag=self.etag)
+
+    def apply(self, response):
+        """Добавляет ETag к заголовкам ответа."""
+        response['ETag'] = self.etag
+        return response
+
+
+def feed_validators(request, page_queryset, *state):
+    """Валидаторы страницы ленты по агрегатам её среза.
+
+    Один запрос по индексу ленты: число постов, сумма их id и время
+    последнего изменения определяют, изменилась ли страница.
+    """
+    aggregate = page_queryset.aggregate(
+        count=Count('pk'),
+        ids=Sum('pk'),
+        last_modified=Max('updated_at'),
+    )
+    return PageValidators(
+        request,
+        aggregate['count'],
+        aggregate['ids'],
+        aggregate['last_modified'],
+        *state,
+    )
+
+
+def post_validators(request, post, *state):
+    """Валидаторы страницы поста."""
+    return PageValidators(request, post.pk, post.updated_at, *state)
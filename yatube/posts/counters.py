@@ -0,0 +1,150 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import (Case, Count, F, IntegerField, OuterRef,
+                              Subquery, Value, When)
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ArchivedPost, AuthorStats, Group, Post, User
+from .sharding import is_sharded, shards
+
+
+def _shift(queryset, key, deltas):
+    """Сдвигает счётчики строк queryset на deltas ({значение key:
+    изменение}) одним UPDATE, не опуская их ниже нуля."""
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        by_delta[delta].append(pk)
+    if len(by_delta) == 1:
+        (shift,) = by_delta
+    else:
+        shift = Case(
+            *[
+                When(**{f'{key}__in': ids}, then=Value(delta))
+                for delta, ids in by_delta.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    return queryset.filter(**{f'{key}__in': list(deltas)}).update(
+        posts_count=Greatest(F('posts_count') + shift, 0)
+    )
+
+
+def _changed(deltas):
+    return {
+        pk: delta for pk, delta in (deltas or {}).items()
+        if pk is not None and delta
+    }
+
+
+def update_counts(author_deltas=None, group_deltas=None):
+    """Применяет изменения счётчиков постов.
+
+    Принимает словари {id: изменение}; выполняет по одному UPDATE
+    на таблицу счётчиков, сколько бы строк ни менялось.
+    """
+    author_deltas = _changed(author_deltas)
+    if author_deltas:
+        updated = _shift(AuthorStats.objects, 'author_id', author_deltas)
+        # Строки заводятся только для растущих счётчиков: при удалении
+        # автора каскадом его посты могут удаляться после его счётчиков.
+        growing = [pk for pk, delta in author_deltas.items() if delta > 0]
+        if growing and updated < len(author_deltas):
+            _create_author_stats(growing)
+    group_deltas = _changed(group_deltas)
+    if group_deltas:
+        _shift(Group.objects, 'pk', group_deltas)
+
+
+def _create_author_stats(author_ids):
+    """Создаёт недостающие строки счётчиков авторов, подсчитывая их посты.
+
+    Строки создаются лениво, при первом изменении счётчика автора.
+    """
+    existing = AuthorStats.objects.filter(
+        author_id__in=author_ids
+    ).values_list('author_id', flat=True)
+    missing = set(author_ids) - set(existing)
+    counts = _post_counts('author_id', author_id__in=missing)
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(author_id=pk, posts_count=counts.get(pk, 0))
+            for pk in missing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def author_posts_count(author):
+    """Число постов автора по счётчику, без обращения к таблице постов."""
+    try:
+        return author.post_stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def _post_counts(field, **filters):
+    """Число постов по значениям field во всех базах постов
+    и в архиве."""
+    counts = Counter()
+    querysets = [Post.objects.using(alias) for alias in shards()]
+    for queryset in querysets + [ArchivedPost.objects]:
+        counts.update(dict(
+            queryset.filter(**filters).order_by().values(
+                field
+            ).annotate(n=Count('pk')).values_list(field, 'n')
+        ))
+    return counts
+
+
+def _set_counts(queryset, key, counts):
+    """Записывает счётчики строк queryset: counts ({значение key:
+    число}), остальным — ноль."""
+    updated = queryset.update(posts_count=0)
+    counts = _changed(counts)
+    if counts:
+        _shift(queryset, key, counts)
+    return updated
+
+
+def _count_subquery(field):
+    counts = [
+        Coalesce(
+            Subquery(
+                model.objects.filter(**{field: OuterRef('pk')}).order_by()
+                .values(field).annotate(n=Count('pk')).values('n')
+            ),
+            0,
+        )
+        for model in (Post, ArchivedPost)
+    ]
+    return counts[0] + counts[1]
+
+
+def recount():
+    """Пересчитывает все счётчики по таблице постов и архиву.
+
+    Возвращает число обновлённых строк счётчиков авторов и групп.
+    """
+    with transaction.atomic():
+        missing = User.objects.filter(
+            post_stats__isnull=True
+        ).values_list('pk', flat=True)
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(author_id=pk) for pk in missing],
+            ignore_conflicts=True,
+        )
+        if is_sharded():
+            # Посты лежат в разных базах: подзапрос видел бы только
+            # основную.
+            authors = _set_counts(
+                AuthorStats.objects, 'author_id', _post_counts('author_id')
+            )
+            groups = _set_counts(Group.objects, 'pk', _post_counts('group_id'))
+            return authors, groups
+        authors = AuthorStats.objects.update(
+            posts_count=_count_subquery('author')
+        )
+        groups = Group.objects.update(posts_count=_count_subquery('group'))
+    return authors, groups
@@ -0,0 +1,184 @@
+from io import StringIO
+
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.template.defaultfilters import linebreaksbr
+from django.urls import reverse
+from django.utils.feedgenerator import (Atom1Feed, Rss201rev2Feed,
+                                        SimplerXMLGenerator)
+from django.utils.text import Truncator
+
+from .conditional import PageValidators
+from .paginators import (AFTER_PARAM, FEED_ORDERING, CursorPaginator,
+                         InvalidCursor)
+
+LIMIT_PARAM = 'limit'
+
+
+class StreamingFeedMixin:
+    """Вывод ленты по частям: заголовок и каждая запись отдаются
+    отдельным фрагментом, не накапливая документ в памяти."""
+
+    item_element = None
+
+    def latest_post_date(self):
+        return self.feed.get('updated') or super().latest_post_date()
+
+    def make_item(self, **kwargs):
+        """Запись ленты в формате SyndicationFeed.add_item."""
+        self.add_item(**kwargs)
+        return self.items.pop()
+
+    def stream(self, items):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, 'utf-8')
+        handler.startDocument()
+        self.start_root(handler)
+        self.add_root_elements(handler)
+        for item in items:
+            yield self._drain(buffer)
+            handler.startElement(self.item_element, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+        self.end_root(handler)
+        yield self._drain(buffer)
+
+    @staticmethod
+    def _drain(buffer):
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+
+    def start_root(self, handler):
+        handler.startElement('feed', self.root_attributes())
+
+    def end_root(self, handler):
+        handler.endElement('feed')
+
+    def add_root_elements(self, handler):
+        super().add_root_elements(handler)
+        if self.feed.get('next_url'):
+            handler.addQuickElement(
+                'link', '', {'rel': 'next', 'href': self.feed['next_url']}
+            )
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+    def start_root(self, handler):
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+
+    def end_root(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+    def add_root_elements(self, handler):
+        super().add_root_elements(handler)
+        if self.feed.get('next_url'):
+            handler.addQuickElement(
+                'atom:link', None,
+                {'rel': 'next', 'href': self.feed['next_url']},
+            )
+
+
+FEED_TYPES = {
+    'atom': StreamingAtomFeed,
+    'rss': StreamingRssFeed,
+}
+
+
+def feed_limit(request):
+    """Число записей в ленте: ?limit=, ограниченный
+    POSTS_FEED_MAX_LIMIT."""
+    try:
+        limit = int(request.GET.get(LIMIT_PARAM, settings.POSTS_FEED_LIMIT))
+    except ValueError:
+        limit = settings.POSTS_FEED_LIMIT
+    return min(max(limit, 1), settings.POSTS_FEED_MAX_LIMIT)
+
+
+def post_item(feed, request, post):
+    link = request.build_absolute_uri(
+        reverse('posts:post_detail', args=(post.pk,))
+    )
+    return feed.make_item(
+        title=Truncator(post.excerpt).chars(30),
+        link=link,
+        description=linebreaksbr(post.excerpt),
+        author_name=post.author.get_full_name() or post.author.username,
+        pubdate=post.pub_date,
+        updateddate=post.updated_at,
+        unique_id=link,
+        categories=[post.group.title] if post.group_id else (),
+    )
+
+
+def feed_response(request, feed_type, queryset, title, link, *state):
+    """Потоковый ответ с лентой записей queryset.
+
+    Ключи записей (id, pub_date, updated_at) читаются одним запросом
+    до начала ответа: по ним вычисляются ETag, время обновления ленты
+    и курсор продолжения ?after=. Сами записи читаются через
+    iterator() уже во время отправки ответа.
+    """
+    if feed_type not in FEED_TYPES:
+        raise Http404('Неизвестный формат ленты')
+    limit = feed_limit(request)
+    paginator = CursorPaginator(queryset, limit, ordering=FEED_ORDERING)
+    try:
+        page_queryset = paginator.page_queryset(
+            after=request.GET.get(AFTER_PARAM)
+        )
+    except InvalidCursor:
+        page_queryset = paginator.page_queryset()
+    keys = list(page_queryset.values_list('pk', 'pub_date', 'updated_at'))
+    has_next = len(keys) > limit
+    keys = keys[:limit]
+    last_modified = max((key[2] for key in keys), default=None)
+    validators = PageValidators(
+        request,
+        feed_type,
+        limit,
+        [key[0] for key in keys],
+        last_modified,
+        *state,
+        # Лента одинакова для всех: сессию незачем читать.
+        per_user=False,
+    )
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    next_url = None
+    if has_next:
+        pk, pub_date, _ = keys[-1]
+        query = request.GET.copy()
+        query[AFTER_PARAM] = paginator.encode_cursor(
+            queryset.model(pk=pk, pub_date=pub_date)
+        )
+        next_url = request.build_absolute_uri(
+            f'{request.path}?{query.urlencode()}'
+        )
+    feed = FEED_TYPES[feed_type](
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=title,
+        language=settings.LANGUAGE_CODE,
+        feed_url=request.build_absolute_uri(),
+        updated=last_modified,
+        next_url=next_url,
+    )
+    items = (
+        post_item(feed, request, post)
+        for post in page_queryset[:limit].iterator()
+    )
+    response = StreamingHttpResponse(
+        feed.stream(items), content_type=feed.content_type
+    )
+    return validators.apply(response)
@@ -24,3 +24,40 @@ class PostForm(forms.ModelForm):
             }),
             'group': forms.Select(attrs={'class': 'form-control'}),
         }
+
+
+class PrefetchedModelChoiceField(forms.ModelChoiceField):
+    """Выбор объекта из заранее загруженного словаря {pk: объект},
+    без отдельного запроса на каждое значение."""
+
+    prefetched = None
+
+    def to_python(self, value):
+        if self.prefetched is None or value in self.empty_values:
+            return super().to_python(value)
+        try:
+            return self.prefetched[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice'
+            )
+
+
+class BatchPostForm(PostForm):
+    """PostForm для пакетной проверки постов.
+
+    groups — словарь {pk: группа}, загруженный одним запросом
+    для всей пачки.
+    """
+
+    class Meta(PostForm.Meta):
+        field_classes = {'group': PrefetchedModelChoiceField}
+
+    def __init__(self, *args, groups, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].prefetched = groups
+
+    def _get_validation_exclusions(self):
+        # Существование группы уже проверено по словарю groups,
+        # повторная проверка ForeignKey.validate стоила бы запроса.
+        return super()._get_validation_exclusions() + ['group']
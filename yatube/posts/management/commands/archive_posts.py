@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from posts.archive import archive_cutoff, archive_posts, is_enabled
+from posts.sharding import shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты, не менявшиеся дольше POSTS_ARCHIVE_AFTER_DAYS '
+        'дней, в помесячные архивные базы (POSTS_ARCHIVE_DIR).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='возраст постов в днях вместо POSTS_ARCHIVE_AFTER_DAYS',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='число постов, переносимых одной транзакцией',
+        )
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='сжать базы постов после переноса (VACUUM)',
+        )
+
+    def handle(self, *args, **options):
+        if not is_enabled():
+            raise CommandError(
+                'Архив отключён: POSTS_ARCHIVE_AFTER_DAYS = None'
+            )
+        days = options['days']
+        if days is None:
+            days = settings.POSTS_ARCHIVE_AFTER_DAYS
+        archived = archive_posts(archive_cutoff(days), options['batch_size'])
+        if options['vacuum']:
+            # Без VACUUM освободившиеся страницы остаются в файле базы
+            # и занимаются новыми постами.
+            for alias in shards():
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('VACUUM')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено в архив постов: {archived}'
+        ))
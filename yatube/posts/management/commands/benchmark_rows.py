@@ -0,0 +1,114 @@
+import time
+import tracemalloc
+
+from core.benchmark import Case, measure, percentile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from posts.models import Post
+from posts.sharding import across_shards
+from posts.views import feed_posts
+
+from .benchmark_urls import sample_objects
+
+MODES = {'models': False, 'rows': True}
+
+
+def measure_fetch(page_size, repeat):
+    """Время выборки страницы ленты из page_size постов и память,
+    которую занимают её объекты."""
+    def fetch():
+        queryset = across_shards(feed_posts(Post.objects.all()))
+        return list(queryset[:page_size])
+
+    fetch()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fetch()
+        timings.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    try:
+        page = fetch()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'posts': len(page),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'alloc_peak_kb': round(peak / 1024, 1),
+        'alloc_retained_kb': round(retained / 1024, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает ленты на экземплярах моделей и на строках '
+        '(POSTS_FEED_ROWS): время и память выборки страницы и ответа '
+        'главной, группы и профайла.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size', type=int, default=1000,
+            help='число постов на странице ленты',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='число измеряемых запросов на случай',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['page_size'] < 1:
+            raise CommandError(
+                '--repeat и --page-size должны быть положительными'
+            )
+        if settings.DEBUG:
+            self.stderr.write(
+                'DEBUG включён: Django сохраняет каждый SQL-запрос, '
+                'время ответа будет завышено'
+            )
+        author, group, post = sample_objects()
+        # Страницы автора не берутся из кэша анонимных страниц.
+        client = Client()
+        client.force_login(author)
+        cases = (
+            Case('posts:index', reverse('posts:index'), login=True),
+            Case(
+                'posts:group_list',
+                reverse('posts:group_list', args=(group.slug,)),
+                login=True,
+            ),
+            Case(
+                'posts:profile',
+                reverse('posts:profile', args=(author.username,)),
+                login=True,
+            ),
+        )
+        for mode, rows in MODES.items():
+            with override_settings(
+                POSTS_FEED_ROWS=rows, POSTS_PER_PAGE=options['page_size']
+            ):
+                result = measure_fetch(
+                    options['page_size'], options['repeat']
+                )
+                self.stdout.write(
+                    f'{mode:<7} {"выборка":18} '
+                    f'p50 {result["p50_ms"]:8.2f} '
+                    f'p95 {result["p95_ms"]:8.2f} мс, '
+                    f'постов {result["posts"]:5}, '
+                    f'память {result["alloc_peak_kb"]:8.1f} КБ, '
+                    f'объекты {result["alloc_retained_kb"]:8.1f} КБ'
+                )
+                for case in cases:
+                    result = measure(client, case, options['repeat'])
+                    self.stdout.write(
+                        f'{mode:<7} {case.name:18} {result["status"]} '
+                        f'p50 {result["p50_ms"]:8.2f} '
+                        f'p95 {result["p95_ms"]:8.2f} мс, '
+                        f'запросов {result["queries"]:3}, '
+                        f'память {result["alloc_peak_kb"]:8.1f} КБ'
+                    )
@@ -0,0 +1,209 @@
+import json
+import math
+import platform
+import subprocess
+from contextlib import ExitStack
+
+import django
+from core.benchmark import Case, compare, iter_routes, measure
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from posts.models import AuthorStats, Group, Post, User
+from posts.sharding import across_shards, on_author_shard, shards
+
+# Маршруты, которые измеряются от имени автора.
+LOGIN_ROUTES = {
+    'posts:post_create',
+    'posts:post_edit',
+    'users:password_change',
+    'users:password_change_done',
+    'password_change',
+    'password_change_done',
+}
+# Пространства имён, маршруты которых не измеряются.
+EXCLUDED_NAMESPACES = ('admin',)
+# Маршруты только для POST: измеряются в extra_cases.
+POST_ROUTES = {'api:post_batch'}
+# Число постов в теле запроса к api:post_batch.
+BATCH_ITEMS = 50
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def sample_objects():
+    """Самые активные автор и группа и последний пост автора:
+    их страницы — самые тяжёлые."""
+    stats = AuthorStats.objects.order_by('-posts_count').first()
+    author = stats.author if stats else User.objects.first()
+    group = Group.objects.order_by('-posts_count').first()
+    post = on_author_shard(
+        Post.objects.filter(author=author), author
+    ).order_by('-pk').first()
+    if author is None or group is None or post is None:
+        raise CommandError(
+            'Нужны автор, группа и пост; заполните базу командой seed_load'
+        )
+    return author, group, post
+
+
+def route_cases(author, group, post):
+    """По запросу на каждый именованный маршрут URLconf."""
+    samples = {
+        'slug': group.slug,
+        'username': author.username,
+        'post_id': post.pk,
+        'feed_type': 'atom',
+        'uidb64': urlsafe_base64_encode(force_bytes(author.pk)),
+        'token': default_token_generator.make_token(author),
+    }
+    urls = set()
+    for name, params in iter_routes():
+        if (name.startswith(EXCLUDED_NAMESPACES) or name in POST_ROUTES
+                or params - set(samples)):
+            continue
+        url = reverse(name, kwargs={param: samples[param] for param in params})
+        if url not in urls:
+            urls.add(url)
+            yield Case(name, url, login=name in LOGIN_ROUTES)
+
+
+def extra_cases(author, group, post):
+    """Глубокие страницы, поиск и изменяющие запросы."""
+    pages = math.ceil(
+        across_shards(Post.objects.all()).count() / settings.POSTS_PER_PAGE
+    )
+    group_pages = math.ceil(group.posts_count / settings.POSTS_PER_PAGE)
+    index = reverse('posts:index')
+    group_list = reverse('posts:group_list', args=(group.slug,))
+    word = post.text.split()[0].strip('.,')
+    yield Case('posts:index (автор)', index, login=True)
+    yield Case(f'posts:index?page={pages // 2}', f'{index}?page={pages // 2}')
+    yield Case(f'posts:index?page={pages}', f'{index}?page={pages}')
+    yield Case(
+        f'posts:group_list?page={group_pages}',
+        f'{group_list}?page={group_pages}',
+    )
+    yield Case(
+        f'posts:search?q={word}', reverse('posts:search') + f'?q={word}'
+    )
+    yield Case(
+        'posts:post_create', reverse('posts:post_create'), 'post',
+        login=True, data={'text': 'Тестовый пост', 'group': group.pk},
+    )
+    yield Case(
+        'posts:post_edit', reverse('posts:post_edit', args=(post.pk,)),
+        'post', login=True, data={'text': post.text, 'group': group.pk},
+    )
+    yield Case(
+        'api:post_batch', reverse('api:post_batch'), 'post', login=True,
+        data=json.dumps([{'text': 'Тестовый пост'}] * BATCH_ITEMS),
+        content_type='application/json',
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время ответа (p50/p95/p99), число SQL-запросов '
+        'и выделение памяти для каждого маршрута сайта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='число измеряемых запросов на маршрут',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=1,
+            help='число запросов на маршрут перед измерением',
+        )
+        parser.add_argument(
+            '--filter', default='',
+            help='измерять только маршруты, имя которых содержит строку',
+        )
+        parser.add_argument(
+            '--output', help='сохранить результаты в JSON-файл',
+        )
+        parser.add_argument(
+            '--compare', help='сравнить с результатами из JSON-файла',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть положительным')
+        if settings.DEBUG:
+            self.stderr.write(
+                'DEBUG включён: Django сохраняет каждый SQL-запрос, '
+                'время ответа будет завышено'
+            )
+        author, group, post = sample_objects()
+        anonymous = Client()
+        logged_in = Client()
+        logged_in.force_login(author)
+        cases = [
+            case for case in (
+                *route_cases(author, group, post),
+                *extra_cases(author, group, post),
+            )
+            if options['filter'] in case.name
+        ]
+        results = []
+        # Изменяющие запросы не должны менять данные между прогонами.
+        with ExitStack() as stack:
+            for alias in shards():
+                stack.enter_context(transaction.atomic(using=alias))
+            for case in cases:
+                client = logged_in if case.login else anonymous
+                result = measure(
+                    client, case, options['repeat'], options['warmup']
+                )
+                results.append(result)
+                self.stdout.write(
+                    f'{result["method"]:4} {result["name"]:40} '
+                    f'{result["status"]} '
+                    f'p50 {result["p50_ms"]:8.2f} '
+                    f'p95 {result["p95_ms"]:8.2f} '
+                    f'p99 {result["p99_ms"]:8.2f} мс, '
+                    f'запросов {result["queries"]:3}, '
+                    f'память {result["alloc_peak_kb"]:8.1f} КБ'
+                )
+            for alias in shards():
+                transaction.set_rollback(True, using=alias)
+        report = {
+            'commit': _git_commit(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': {
+                'users': User.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': across_shards(Post.objects.all()).count(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                previous = json.load(stream)
+            self.stdout.write(
+                f'Сравнение с {previous.get("commit") or options["compare"]}:'
+            )
+            for line in compare(previous, report):
+                self.stdout.write(line)
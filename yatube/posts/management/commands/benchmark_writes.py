@@ -0,0 +1,98 @@
+import threading
+import time
+
+from core.benchmark import percentile
+from core.write_queue import run_write
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+from posts.models import Post, User
+from posts.sharding import on_author_shard
+
+# Автор постов, создаваемых замером; удаляется вместе с ними.
+BENCHMARK_USERNAME = 'benchmark_writes'
+MODES = {'direct': False, 'queue': True}
+
+
+def write_posts(author, count, timings, errors):
+    """Создаёт count постов по одному, как post_create."""
+    try:
+        for number in range(count):
+            post = Post(author=author, text=f'benchmark_writes {number}')
+            started = time.perf_counter()
+            try:
+                run_write(post.save)
+            except OperationalError as error:
+                errors.append(str(error))
+            else:
+                timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connections.close_all()
+
+
+def run_mode(author, threads, writes):
+    timings, errors = [], []
+    workers = [
+        threading.Thread(
+            target=write_posts, args=(author, writes, timings, errors)
+        )
+        for _ in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'posts_per_second': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 50), 3) if timings else None,
+        'p95_ms': round(percentile(timings, 95), 3) if timings else None,
+        'errors': len(errors),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Замеряет пропускную способность записи постов из нескольких '
+            'потоков: напрямую и через очередь записи (SQLITE_WRITE_QUEUE).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--writes', type=int, default=200,
+            help='Число постов, создаваемых каждым потоком.'
+        )
+        parser.add_argument(
+            '--mode', choices=sorted(MODES), action='append',
+            help='Режим записи; по умолчанию оба.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер рассчитан на базу SQLite')
+        if connection.is_in_memory_db():
+            raise CommandError(
+                'Нужна база в файле: потоки не делят базу в памяти'
+            )
+        if User.objects.filter(username=BENCHMARK_USERNAME).exists():
+            raise CommandError(
+                f'Пользователь {BENCHMARK_USERNAME} уже существует'
+            )
+        author = User.objects.create_user(BENCHMARK_USERNAME)
+        try:
+            for mode in options['mode'] or MODES:
+                with override_settings(SQLITE_WRITE_QUEUE=MODES[mode]):
+                    result = run_mode(
+                        author, options['threads'], options['writes']
+                    )
+                self.stdout.write(
+                    f'{mode:<8} {result["posts_per_second"]:>9} постов/с  '
+                    f'p50 {result["p50_ms"]} мс  p95 {result["p95_ms"]} мс  '
+                    f'ошибок блокировки {result["errors"]}'
+                )
+        finally:
+            # Сначала посты: при каскадном удалении автора post_delete
+            # пересоздал бы уже удалённую строку его счётчиков.
+            posts = Post.objects.filter(author=author)
+            on_author_shard(posts, author).delete()
+            author.delete()
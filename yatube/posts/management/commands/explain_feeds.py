@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from posts.models import Group, Post, User
+from posts.paginators import FEED_ORDERING, CursorPaginator
+
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def feed_querysets(group, author):
+    """Запросы, которые выполняют view-функции лент и поста."""
+    feeds = (
+        ('posts:index', Post.objects.feed()),
+        ('posts:group_list', group.posts.feed()),
+        ('posts:profile', author.posts.feed()),
+    )
+    # Курсор произвольной позиции: план запроса от значений не зависит.
+    cursor = CursorPaginator(Post.objects.all(), 1).encode_cursor(
+        Post(id=0, pub_date=timezone.now())
+    )
+    per_page = settings.POSTS_PER_PAGE
+    for name, queryset in feeds:
+        queryset = queryset.order_by(*FEED_ORDERING)
+        paginator = CursorPaginator(queryset, per_page)
+        yield f'{name} (первая страница)', paginator.page_queryset()
+        yield f'{name} (?after=)', paginator.page_queryset(after=cursor)
+        yield f'{name} (?before=)', paginator.page_queryset(before=cursor)
+        yield f'{name} (?page=N)', queryset[per_page:per_page * 2]
+    yield 'posts:post_detail', Post.objects.select_related(
+        'author', 'group'
+    ).defer('text').filter(pk=0)
+    yield 'posts:post_detail (posts_qty)', Post.objects.filter(
+        author_id=author.pk
+    ).values('author_id')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит EXPLAIN QUERY PLAN для запросов лент и проверяет, '
+        'что ни один из них не сортирует строки во временном B-дереве.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group', help='slug группы для запроса posts:group_list'
+        )
+        parser.add_argument(
+            '--author', help='username автора для запроса posts:profile'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='завершиться с ошибкой, если найдена сортировка',
+        )
+
+    def get_group(self, slug):
+        if slug is None:
+            return Group.objects.first() or Group(pk=0)
+        try:
+            return Group.objects.get(slug=slug)
+        except Group.DoesNotExist:
+            raise CommandError(f'Группа {slug} не найдена')
+
+    def get_author(self, username):
+        if username is None:
+            return User.objects.first() or User(pk=0)
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден')
+
+    def handle(self, *args, **options):
+        group = self.get_group(options['group'])
+        author = self.get_author(options['author'])
+        sorted_queries = []
+        for label, queryset in feed_querysets(group, author):
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(plan)
+            if TEMP_SORT in plan:
+                sorted_queries.append(label)
+                self.stdout.write(self.style.ERROR(
+                    'Запрос сортирует строки без индекса'
+                ))
+            self.stdout.write('')
+        if sorted_queries and options['check']:
+            raise CommandError(
+                'Сортировка без индекса: ' + ', '.join(sorted_queries)
+            )
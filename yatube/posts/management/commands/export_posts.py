@@ -0,0 +1,228 @@
+import csv
+import json
+import multiprocessing
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from posts.columnar import INT, STRING, TIMESTAMP, ColumnarWriter
+from posts.models import Post
+
+# Колонки выгрузки: имя, тип в колоночном формате, путь в ORM.
+COLUMNS = (
+    ('id', INT, 'id'),
+    ('pub_date', TIMESTAMP, 'pub_date'),
+    ('author', STRING, 'author__username'),
+    ('group', STRING, 'group__slug'),
+    ('text', STRING, 'text'),
+)
+NAMES = [name for name, _, _ in COLUMNS]
+CHUNK_SIZE = 2000
+
+
+class JsonlWriter:
+    binary = False
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write_rows(self, rows):
+        for row in rows:
+            row = dict(zip(NAMES, row))
+            row['pub_date'] = row['pub_date'].isoformat()
+            self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+class CsvWriter:
+    binary = False
+
+    def __init__(self, stream):
+        self.writer = csv.writer(stream)
+        self.writer.writerow(NAMES)
+
+    def write_rows(self, rows):
+        self.writer.writerows(
+            (pk, pub_date.isoformat(), author, group or '', text)
+            for pk, pub_date, author, group, text in rows
+        )
+
+
+class PostsColumnarWriter(ColumnarWriter):
+    binary = True
+
+    def __init__(self, stream):
+        super().__init__(stream, [(name, kind) for name, kind, _ in COLUMNS])
+
+
+WRITERS = {
+    'jsonl': JsonlWriter,
+    'csv': CsvWriter,
+    'columnar': PostsColumnarWriter,
+}
+
+
+def since_filter(since):
+    """Условие «позже ключа (pub_date, id)» для инкрементной выгрузки."""
+    if since is None:
+        return Q()
+    pub_date, pk = since
+    return Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+
+
+def parse_since(value):
+    """Разбирает значение --since: «дата» или «дата,id»."""
+    date, _, pk = value.partition(',')
+    pub_date = parse_datetime(date)
+    if pub_date is None:
+        raise CommandError(f'Некорректная дата в --since: {date}')
+    if timezone.is_naive(pub_date):
+        pub_date = timezone.make_aware(pub_date)
+    try:
+        return pub_date, int(pk or 0)
+    except ValueError:
+        raise CommandError(f'Некорректный id в --since: {pk}')
+
+
+def scan(first_id, last_id, since, chunk_size):
+    """Строки постов с id из [first_id, last_id] пачками по chunk_size.
+
+    Каждая пачка — отдельный запрос по первичному ключу, начиная
+    с последнего прочитанного id (keyset), поэтому память и время
+    чтения пачки не зависят от её положения в таблице.
+    """
+    queryset = Post.objects.filter(since_filter(since)).order_by(
+        'id'
+    ).values_list(*[path for _, _, path in COLUMNS])
+    last = first_id - 1
+    while True:
+        rows = list(queryset.filter(id__gt=last, id__lte=last_id)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+@contextmanager
+def open_output(path, binary):
+    if path == '-':
+        yield sys.stdout.buffer if binary else sys.stdout
+        return
+    mode = 'wb' if binary else 'w'
+    kwargs = {} if binary else {'encoding': 'utf-8', 'newline': ''}
+    with open(path, mode, **kwargs) as stream:
+        yield stream
+
+
+def export_shard(path, output_format, first_id, last_id, since, chunk_size):
+    """Выгружает посты диапазона id в файл path.
+
+    Возвращает число строк и наибольший ключ (pub_date, id) среди них.
+    """
+    writer_class = WRITERS[output_format]
+    count = 0
+    latest = None
+    with open_output(path, writer_class.binary) as stream:
+        writer = writer_class(stream)
+        if first_id is None:
+            return count, latest
+        for rows in scan(first_id, last_id, since, chunk_size):
+            writer.write_rows(rows)
+            count += len(rows)
+            chunk_latest = max((pub_date, pk) for pk, pub_date, *_ in rows)
+            latest = max(latest, chunk_latest) if latest else chunk_latest
+    return count, latest
+
+
+def _export_shard(args):
+    return export_shard(*args)
+
+
+def shard_ranges(first_id, last_id, shards):
+    """Делит [first_id, last_id] на shards диапазонов."""
+    if first_id is None:
+        return [(None, None)] * shards
+    step = -(-(last_id - first_id + 1) // shards)
+    return [
+        (first_id + step * shard,
+         min(last_id, first_id + step * (shard + 1) - 1))
+        for shard in range(shards)
+    ]
+
+
+def shard_path(path, shard, shards):
+    if shards == 1:
+        return path
+    path = Path(path)
+    return str(path.with_name(f'{path.stem}.{shard}{path.suffix}'))
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты с автором и группой в JSONL, CSV или колоночный '
+        'формат, с постоянным расходом памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='файл выгрузки; «-» — стандартный вывод',
+        )
+        parser.add_argument(
+            '--format', choices=tuple(WRITERS), default='jsonl',
+            help='формат выгрузки',
+        )
+        parser.add_argument(
+            '--since',
+            help='выгрузить только посты позже ключа «дата[,id]»; ключ '
+                 'для следующей выгрузки выводится по её завершении',
+        )
+        parser.add_argument(
+            '--shards', type=int, default=1,
+            help='разбить выгрузку на N файлов по диапазонам id',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='число процессов, выгружающих файлы параллельно',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='число строк в одном запросе',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        shards = max(options['shards'], 1)
+        if path == '-' and shards > 1:
+            raise CommandError('Файлы частей нельзя выводить в stdout')
+        since = options['since'] and parse_since(options['since'])
+        bounds = Post.objects.filter(since_filter(since)).aggregate(
+            first_id=Min('id'), last_id=Max('id')
+        )
+        tasks = [
+            (shard_path(path, shard, shards), options['format'],
+             first_id, last_id, since, options['chunk_size'])
+            for shard, (first_id, last_id) in enumerate(shard_ranges(
+                bounds['first_id'], bounds['last_id'], shards
+            ))
+        ]
+        workers = min(max(options['workers'], 1), shards)
+        if workers == 1:
+            results = [export_shard(*task) for task in tasks]
+        else:
+            # Дочерние процессы открывают собственные соединения с БД.
+            connections.close_all()
+            with multiprocessing.Pool(workers) as pool:
+                results = pool.map(_export_shard, tasks)
+        count = sum(count for count, _ in results)
+        latest = max((key for _, key in results if key), default=since)
+        out = self.stderr if path == '-' else self.stdout
+        out.write(f'Выгружено постов: {count}')
+        if latest:
+            out.write(
+                f'Следующая выгрузка: --since '
+                f'{latest[0].isoformat()},{latest[1]}'
+            )
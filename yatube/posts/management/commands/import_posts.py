@@ -0,0 +1,281 @@
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from posts.bulk import bulk_create_posts
+from posts.models import Group, Post, User
+from posts.sharding import place_bulk_created
+
+
+# Число строк файла, загружаемых одной транзакцией.
+BATCH_SIZE = 1000
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def _required(row, field):
+    value = row.get(field)
+    if not value:
+        raise InvalidRow(f'не заполнено поле {field}')
+    return value
+
+
+def _parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise InvalidRow(f'некорректная дата {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Importer:
+    """Загрузка строк импорта пачками.
+
+    Авторы и группы постов находятся по словарям {username: id}
+    и {slug: id}; недостающие в словарях имена загружаются одним
+    запросом на пачку. Словари растут с числом авторов и групп,
+    а не с размером файла.
+    """
+
+    def __init__(self, on_error):
+        self.on_error = on_error
+        self.author_ids = {}
+        self.group_ids = {}
+        self.created = {'user': 0, 'group': 0, 'post': 0}
+        self.errors = 0
+
+    def error(self, number, error):
+        self.errors += 1
+        self.on_error(number, str(error))
+
+    def import_rows(self, rows):
+        """Импортирует пачку строк [(номер, строка)] одной транзакцией."""
+        parsed = {'user': [], 'group': [], 'post': []}
+        for number, row in rows:
+            try:
+                if isinstance(row, InvalidRow):
+                    raise row
+                row_type = row.get('type') or 'post'
+                if row_type not in parsed:
+                    raise InvalidRow(f'неизвестный тип {row_type}')
+                parsed[row_type].append((number, row))
+            except InvalidRow as error:
+                self.error(number, error)
+        with transaction.atomic():
+            self.create_users(parsed['user'])
+            self.create_groups(parsed['group'])
+            self.create_posts(parsed['post'])
+
+    def _build(self, rows, build):
+        objects = []
+        for number, row in rows:
+            try:
+                objects.append(build(row))
+            except InvalidRow as error:
+                self.error(number, error)
+        return objects
+
+    def create_users(self, rows):
+        users = self._build(rows, lambda row: User(
+            username=_required(row, 'username'),
+            first_name=row.get('first_name') or '',
+            last_name=row.get('last_name') or '',
+            email=row.get('email') or '',
+            password=make_password(None),
+        ))
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        place_bulk_created(User, User.objects.filter(
+            username__in=[user.username for user in users]
+        ))
+        self._forget_missing(self.author_ids, [
+            user.username for user in users
+        ])
+        self.created['user'] += len(users)
+
+    def create_groups(self, rows):
+        groups = self._build(rows, lambda row: Group(
+            slug=_required(row, 'slug'),
+            title=_required(row, 'title'),
+            description=row.get('description') or '',
+        ))
+        Group.objects.bulk_create(groups, ignore_conflicts=True)
+        place_bulk_created(Group, Group.objects.filter(
+            slug__in=[group.slug for group in groups]
+        ))
+        self._forget_missing(self.group_ids, [group.slug for group in groups])
+        self.created['group'] += len(groups)
+
+    @staticmethod
+    def _forget_missing(cache, names):
+        for name in names:
+            if name in cache and cache[name] is None:
+                del cache[name]
+
+    def _resolve(self, cache, queryset, field, names):
+        missing = set(names) - set(cache)
+        if missing:
+            cache.update(queryset.filter(
+                **{f'{field}__in': missing}
+            ).values_list(field, 'pk'))
+            # Не найденные имена тоже запоминаются, чтобы не искать их
+            # в каждой пачке заново.
+            cache.update(dict.fromkeys(missing - set(cache)))
+
+    def create_posts(self, rows):
+        self._resolve(
+            self.author_ids, User.objects, 'username',
+            [row.get('author') for _, row in rows if row.get('author')],
+        )
+        self._resolve(
+            self.group_ids, Group.objects, 'slug',
+            [row.get('group') for _, row in rows if row.get('group')],
+        )
+        posts = self._build(rows, self.build_post)
+        bulk_create_posts(posts, explicit_dates=True)
+        self.created['post'] += len(posts)
+
+    def build_post(self, row):
+        username = _required(row, 'author')
+        author_id = self.author_ids.get(username)
+        if author_id is None:
+            raise InvalidRow(f'автор {username} не найден')
+        group_id = None
+        if row.get('group'):
+            group_id = self.group_ids.get(row['group'])
+            if group_id is None:
+                raise InvalidRow(f'группа {row["group"]} не найдена')
+        pub_date = _parse_date(row.get('pub_date'))
+        return Post(
+            text=_required(row, 'text'),
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=pub_date,
+            updated_at=pub_date,
+        )
+
+
+def _parse_json(line):
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return InvalidRow('некорректный JSON')
+    if not isinstance(row, dict):
+        return InvalidRow('строка должна быть JSON-объектом')
+    return row
+
+
+def read_rows(stream, input_format, skip):
+    """Строки файла импорта, начиная со строки skip + 1,
+    в виде пар (номер, строка); пустые строки JSONL пропускаются."""
+    if input_format == 'csv':
+        rows = islice(csv.DictReader(stream), skip, None)
+    else:
+        rows = (
+            _parse_json(line) if line.strip() else None
+            for line in islice(stream, skip, None)
+        )
+    for number, row in enumerate(rows, start=skip + 1):
+        if row is not None:
+            yield number, row
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует пользователей, группы и посты из JSONL или CSV '
+        '(файла или stdin) пачками bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='файл импорта; «-» — стандартный ввод',
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='формат файла (по умолчанию — по расширению, иначе jsonl)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='число строк в одной транзакции',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='файл с номером последней загруженной строки: импорт '
+                 'продолжается с него и обновляет его после каждой пачки',
+        )
+
+    @contextmanager
+    def open_input(self, path):
+        if path == '-':
+            yield sys.stdin
+            return
+        try:
+            stream = open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+        with stream:
+            yield stream
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        checkpoint = options['checkpoint'] and Path(options['checkpoint'])
+        done = 0
+        if checkpoint and checkpoint.exists():
+            done = int(checkpoint.read_text() or 0)
+        importer = Importer(
+            lambda number, message: self.stderr.write(
+                f'Строка {number}: {message}'
+            ),
+        )
+        started = time.monotonic()
+        processed = 0
+        with self.open_input(path) as stream:
+            rows = read_rows(stream, input_format, done)
+            for batch in batches(rows, options['batch_size']):
+                importer.import_rows(batch)
+                done = batch[-1][0]
+                processed += len(batch)
+                if checkpoint:
+                    checkpoint.write_text(str(done))
+                if options['verbosity'] > 1:
+                    self.report(processed, started)
+        created = importer.created
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: пользователей — {created["user"]}, '
+            f'групп — {created["group"]}, постов — {created["post"]}; '
+            f'ошибок — {importer.errors}'
+        ))
+        self.report(processed, started)
+
+    def report(self, processed, started):
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{processed} строк за {elapsed:.1f} с ({rate:.0f} строк/с)'
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from posts.cache import page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Выводит счётчики попаданий и промахов кэша страниц лент.'
+
+    def handle(self, *args, **options):
+        stats = page_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f'hits {stats["hits"]}\nmisses {stats["misses"]}\n'
+            f'hit_ratio {ratio:.3f}'
+        )
@@ -0,0 +1,159 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from posts.bulk import insert_posts
+from posts.models import AuthorShard, Group, Post, PostRoute, User
+from posts.sharding import (REFERENCE_FIELDS, author_shard, copy_references,
+                            hash_shard, is_sharded, shards)
+
+POSTS_TABLE = Post._meta.db_table
+POST_FIELDS = [field.attname for field in Post._meta.concrete_fields]
+
+
+def sync_references():
+    """Копирует всех пользователей и все группы в базы постов."""
+    for model in (User, Group):
+        copy_references(
+            model,
+            model.objects.only('pk', *REFERENCE_FIELDS[model]).order_by('pk'),
+        )
+
+
+def add_routes(author_id):
+    """Заводит маршруты постов автора, созданных в основной базе
+    до шардирования: после переноса по ним находится база поста."""
+    routes = PostRoute._meta.db_table
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {routes} (id, author_id) '
+            f'SELECT id, author_id FROM {POSTS_TABLE} '
+            f'WHERE author_id = %s AND id NOT IN (SELECT id FROM {routes})',
+            [author_id],
+        )
+
+
+def _delete_posts(alias, pks):
+    # Без сигналов: посты не удаляются, а переносятся, счётчики и кэш
+    # менять незачем.
+    with connections[alias].cursor() as cursor:
+        for start in range(0, len(pks), 500):
+            batch = pks[start:start + 500]
+            cursor.execute(
+                f'DELETE FROM {POSTS_TABLE} WHERE id IN '
+                f'({", ".join(["%s"] * len(batch))})',
+                batch,
+            )
+
+
+def copy_posts(queryset, target, batch_size):
+    """Копирует посты queryset с их id и датами в базу target, заменяя
+    копии, сделанные раньше. Возвращает id скопированных постов."""
+    copied = []
+    last_pk = 0
+    while True:
+        rows = queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+            *POST_FIELDS
+        )[:batch_size]
+        posts = [Post(**dict(zip(POST_FIELDS, row))) for row in rows]
+        if not posts:
+            return copied
+        pks = [post.pk for post in posts]
+        _delete_posts(target, pks)
+        insert_posts(posts, target)
+        copied.extend(pks)
+        last_pk = pks[-1]
+
+
+def move_author(author_id, target, batch_size=1000):
+    """Переносит посты автора в базу target, не останавливая сайт.
+
+    Посты копируются в транзакции target и становятся видны разом.
+    Затем запись в исходную базу блокируется, в target докопируются
+    посты, созданные и изменённые за время копирования, удаляются
+    копии постов, удалённых за это время, автор закрепляется за target
+    и его посты удаляются из исходной базы. Пост, сохранение которого
+    ждало этой блокировки, останется в исходной базе — его перенесёт
+    повторный запуск для автора. Возвращает число перенесённых постов.
+    """
+    sources = [
+        alias for alias in shards() if alias != target
+        and Post.objects.using(alias).filter(author_id=author_id).exists()
+    ]
+    moved = 0
+    for source in sources:
+        if source == DEFAULT_DB_ALIAS:
+            add_routes(author_id)
+        posts = Post.objects.using(source).filter(author_id=author_id)
+        started = timezone.now()
+        with transaction.atomic(using=target):
+            copied = copy_posts(posts, target, batch_size)
+        with transaction.atomic(using=source):
+            # Первый запрос транзакции — запись: SQLite берёт блокировку
+            # записи, и посты автора в source больше не меняются.
+            with connections[source].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {POSTS_TABLE} WHERE 0')
+            with transaction.atomic(using=target):
+                copy_posts(
+                    posts.filter(updated_at__gte=started), target, batch_size
+                )
+                remaining = list(posts.values_list('pk', flat=True))
+                _delete_posts(target, sorted(set(copied) - set(remaining)))
+            AuthorShard.objects.update_or_create(
+                author_id=author_id, defaults={'alias': target}
+            )
+            _delete_posts(source, remaining)
+        moved += len(remaining)
+    if not sources:
+        AuthorShard.objects.update_or_create(
+            author_id=author_id, defaults={'alias': target}
+        )
+    return moved
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует пользователей и группы в базы постов (POST_SHARDS) '
+        'и переносит посты авторов в базы по хешу id или в указанную.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author', action='append', default=[],
+            help='перенести только этого автора (можно повторять)',
+        )
+        parser.add_argument(
+            '--to', help='база, в которую перенести авторов --author',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='число постов, копируемых одним запросом',
+        )
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            raise CommandError('В POST_SHARDS одна база')
+        if options['to'] and options['to'] not in shards():
+            raise CommandError(f'Базы {options["to"]} нет в POST_SHARDS')
+        if options['to'] and not options['author']:
+            raise CommandError('--to указывается вместе с --author')
+        sync_references()
+        authors = User.objects.select_related('shard').order_by('pk')
+        if options['author']:
+            authors = authors.filter(username__in=options['author'])
+            missing = set(options['author']) - {
+                author.username for author in authors
+            }
+            if missing:
+                raise CommandError(
+                    f'Нет пользователей: {", ".join(sorted(missing))}'
+                )
+        for author in authors:
+            source = author_shard(author)
+            target = options['to'] or hash_shard(author.pk)
+            if source == target and not options['author']:
+                continue
+            moved = move_author(author.pk, target, options['batch_size'])
+            self.stdout.write(
+                f'{author.username}: {source} → {target}, постов: {moved}'
+            )
+        self.stdout.write(self.style.SUCCESS('Авторы распределены'))
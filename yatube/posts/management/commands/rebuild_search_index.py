@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from posts.search import rebuild_index
+from posts.sharding import shards
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс записей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--optimize',
+            action='store_true',
+            help='объединить сегменты индекса после перестроения',
+        )
+
+    def handle(self, *args, **options):
+        for alias in shards():
+            rebuild_index(optimize=options['optimize'], using=alias)
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов авторов и групп.'
+
+    def handle(self, *args, **options):
+        authors, groups = recount()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано счётчиков: авторов — {authors}, групп — {groups}'
+        ))
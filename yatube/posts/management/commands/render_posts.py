@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from posts.models import Post
+from posts.rendering import render_posts
+from posts.sharding import shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново отрисовывает HTML и отрывки текста постов во всех базах '
+        'постов (после изменения правил отрисовки или записи в обход '
+        'Post.save).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='число постов, обновляемых одним запросом',
+        )
+
+    def handle(self, *args, **options):
+        rendered = sum(
+            render_posts(Post.objects.using(alias), options['batch_size'])
+            for alias in shards()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Отрисовано постов: {rendered}'
+        ))
@@ -0,0 +1,70 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from posts.archive import restore_posts
+from posts.models import ArchivedPost
+
+
+def month_range(month):
+    """Начало месяца month (ГГГГ-ММ) и начало следующего, UTC."""
+    try:
+        start = dt.datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        raise CommandError(f'Месяц {month} не в формате ГГГГ-ММ')
+    end = (start + dt.timedelta(days=32)).replace(day=1)
+    return (
+        timezone.make_aware(start, timezone.utc),
+        timezone.make_aware(end, timezone.utc),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Возвращает посты из архива в таблицу постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--post', type=int, action='append', default=[],
+            help='id поста (можно повторять)',
+        )
+        parser.add_argument(
+            '--author', action='append', default=[],
+            help='посты пользователя (можно повторять)',
+        )
+        parser.add_argument(
+            '--month', action='append', default=[],
+            help='посты, опубликованные в месяце ГГГГ-ММ (можно повторять)',
+        )
+        parser.add_argument(
+            '--all', action='store_true', help='все посты архива',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='число постов, возвращаемых за один проход',
+        )
+
+    def handle(self, *args, **options):
+        archived = ArchivedPost.objects.all()
+        if not options['all']:
+            if not (options['post'] or options['author']
+                    or options['month']):
+                raise CommandError(
+                    'Укажите --post, --author, --month или --all'
+                )
+            if options['post']:
+                archived = archived.filter(pk__in=options['post'])
+            if options['author']:
+                archived = archived.filter(
+                    author__username__in=options['author']
+                )
+            if options['month']:
+                months = Q()
+                for month in options['month']:
+                    start, end = month_range(month)
+                    months |= Q(pub_date__gte=start, pub_date__lt=end)
+                archived = archived.filter(months)
+        restored = restore_posts(archived, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Возвращено из архива постов: {restored}'
+        ))
@@ -0,0 +1,188 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from posts.bulk import bulk_create_posts
+from posts.management.commands.import_posts import batches
+from posts.models import Group, Post, User
+from posts.sharding import place_bulk_created
+
+# Число постов, сохраняемых одной транзакцией.
+BATCH_SIZE = 5000
+# Число заранее сгенерированных текстов, из которых собираются посты:
+# Faker медленный, а миллионы постов не должны генерироваться часами.
+TEXT_POOL_SIZE = 2000
+# Из скольких текстов пула собирается длинный пост (--long-posts).
+LONG_POST_PARTS = 30
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса рангов 1..count по закону Ципфа: вес ранга r
+    пропорционален 1 / r ** skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class Seeder:
+    """Генератор пользователей, групп и постов.
+
+    Авторы и группы выбираются с весами по закону Ципфа: немногие
+    популярные авторы и группы получают большую часть постов,
+    как и на живом сайте.
+    """
+
+    def __init__(self, seed=None, locale='ru_RU'):
+        self.random = random.Random(seed)
+        self.fake = Faker(locale)
+        self.fake.seed_instance(seed)
+
+    def create_users(self, count):
+        start = User.objects.count()
+        password = make_password(None)
+        users = [
+            User(
+                username=f'{self.fake.user_name()}_{start + num}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=self.fake.email(),
+                password=password,
+            )
+            for num in range(count)
+        ]
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        created = User.objects.filter(
+            username__in=[user.username for user in users]
+        )
+        place_bulk_created(User, created)
+        return list(created.values_list('pk', flat=True))
+
+    def create_groups(self, count):
+        start = Group.objects.count()
+        groups = [
+            Group(
+                title=self.fake.sentence(nb_words=3)[:-1][:200],
+                slug=f'group-{start + num}',
+                description=self.fake.paragraph(),
+            )
+            for num in range(count)
+        ]
+        Group.objects.bulk_create(groups, ignore_conflicts=True)
+        created = Group.objects.filter(
+            slug__in=[group.slug for group in groups]
+        )
+        place_bulk_created(Group, created)
+        return list(created.values_list('pk', flat=True))
+
+    def text_pool(self, size=TEXT_POOL_SIZE):
+        return [
+            self.fake.text(max_nb_chars=self.random.choice((80, 300, 1200)))
+            for _ in range(size)
+        ]
+
+    def build_posts(self, count, author_ids, group_ids, options):
+        """Посты без сохранения: авторы, группы и даты случайны."""
+        texts = self.text_pool()
+        author_weights = zipf_weights(len(author_ids), options['skew'])
+        group_weights = zipf_weights(len(group_ids), options['skew'])
+        now = timezone.now()
+        period = timedelta(days=options['days']).total_seconds()
+        for _ in range(count):
+            author_id = self.random.choices(
+                author_ids, cum_weights=author_weights
+            )[0]
+            group_id = None
+            if group_ids and self.random.random() >= options['ungrouped']:
+                group_id = self.random.choices(
+                    group_ids, cum_weights=group_weights
+                )[0]
+            pub_date = now - timedelta(
+                seconds=self.random.random() * period
+            )
+            if (options['long_posts']
+                    and self.random.random() < options['long_posts']):
+                text = '\n\n'.join(
+                    self.random.choices(texts, k=LONG_POST_PARTS)
+                )
+            else:
+                text = self.random.choice(texts)
+            yield Post(
+                text=text,
+                author_id=author_id,
+                group_id=group_id,
+                pub_date=pub_date,
+                updated_at=pub_date,
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами и постами '
+        'для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='показатель закона Ципфа для распределения постов '
+                 'по авторам и группам; 0 — равномерное',
+        )
+        parser.add_argument(
+            '--ungrouped', type=float, default=0.3,
+            help='доля постов без группы',
+        )
+        parser.add_argument(
+            '--long-posts', type=float, default=0,
+            help='доля очень длинных постов (из нескольких десятков '
+                 'абзацев)',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='даты постов равномерно распределены за столько дней',
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='начальное значение генератора для воспроизводимых данных',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='число постов в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        if options['posts'] and options['users'] < 1:
+            raise CommandError('Для постов нужен хотя бы один пользователь')
+        seeder = Seeder(options['seed'])
+        started = time.monotonic()
+        with transaction.atomic():
+            author_ids = seeder.create_users(options['users'])
+            group_ids = seeder.create_groups(options['groups'])
+        self.stdout.write(
+            f'Создано: пользователей — {len(author_ids)}, '
+            f'групп — {len(group_ids)}'
+        )
+        posts = seeder.build_posts(
+            options['posts'], author_ids, group_ids, options
+        )
+        created = 0
+        for batch in batches(posts, options['batch_size']):
+            bulk_create_posts(batch, explicit_dates=True)
+            created += len(batch)
+            if options['verbosity'] > 1:
+                self.report(created, started)
+        self.stdout.write(self.style.SUCCESS(f'Создано постов: {created}'))
+        self.report(created, started)
+
+    def report(self, created, started):
+        elapsed = time.monotonic() - started
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{created} постов за {elapsed:.1f} с ({rate:.0f} постов/с)'
+        )
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    posts = Post.objects.order_by()
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(author_id=row['author_id'], posts_count=row['n'])
+            for row in posts.values('author_id').annotate(n=Count('pk'))
+        ],
+    )
+    for row in posts.filter(group__isnull=False).values(
+        'group_id'
+    ).annotate(n=Count('pk')):
+        Group.objects.filter(pk=row['group_id']).update(posts_count=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
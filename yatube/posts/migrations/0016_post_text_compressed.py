@@ -0,0 +1,79 @@
+import core.fields
+from django.db import migrations
+
+# Триггеры полнотекстового индекса получают текст поста функцией
+# uncompressed_text() (см. core.sqlite): сжатый текст хранится как BLOB.
+# Индекс остаётся external content по таблице постов, но читать текст
+# из неё сам FTS5 больше не может, поэтому 'rebuild' заменён
+# в posts.search.rebuild_index, а snippet() и highlight() недоступны.
+TRIGGERS = (
+    """
+    CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text)
+        VALUES (new.id, {new});
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {old});
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {old});
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, {new});
+    END
+    """,
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+)
+
+
+def triggers(new, old):
+    return [
+        statement.format(new=new, old=old) for statement in TRIGGERS
+    ]
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in (*DROP_SQL, *statements):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_archive'),
+    ]
+
+    operations = [
+        # Тип столбца не меняется. AlterField на SQLite пересоздал бы
+        # таблицу постов, а вместе с ней удалил бы триггеры индекса.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='post',
+                    name='text',
+                    field=core.fields.CompressedTextField(),
+                ),
+            ],
+            database_operations=[],
+        ),
+        migrations.RunPython(
+            run_sql(triggers(
+                'uncompressed_text(new.text)', 'uncompressed_text(old.text)'
+            )),
+            run_sql(triggers('new.text', 'old.text')),
+        ),
+    ]
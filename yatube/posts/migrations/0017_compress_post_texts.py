@@ -0,0 +1,72 @@
+from core.fields import compress_text, uncompressed_text
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+SELECT_SQL = (
+    'SELECT id, text FROM posts_post WHERE id > %s AND {where} '
+    'ORDER BY id LIMIT %s'
+)
+
+
+def convert(where, transform):
+    def run(apps, schema_editor):
+        # Сжатие есть только на SQLite (см. core.fields).
+        connection = schema_editor.connection
+        if connection.vendor != 'sqlite':
+            return
+        field = apps.get_model('posts', 'Post')._meta.get_field('text')
+        select = SELECT_SQL.format(
+            where=where.format(min_bytes=int(field.min_bytes))
+        )
+        last_pk = 0
+        while True:
+            # Каждая пачка — отдельная транзакция: таблица постов
+            # не блокируется для записи на всё время миграции.
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(select, [last_pk, BATCH_SIZE])
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    updates = []
+                    for pk, text in rows:
+                        value = transform(text, field.min_bytes)
+                        if value is not text:
+                            updates.append((value, pk))
+                    cursor.executemany(
+                        'UPDATE posts_post SET text = %s WHERE id = %s',
+                        updates,
+                    )
+            last_pk = rows[-1][0]
+        # Изменение строк по одной дробит полнотекстовый индекс.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO posts_post_fts(posts_post_fts) "
+                "VALUES ('optimize')"
+            )
+    return run
+
+
+def decompress(value, min_bytes):
+    return uncompressed_text(value)
+
+
+class Migration(migrations.Migration):
+    # Пачки сохраняются каждая своей транзакцией (см. convert).
+    atomic = False
+
+    dependencies = [
+        ('posts', '0016_post_text_compressed'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            convert(
+                "typeof(text) = 'text' "
+                'AND length(CAST(text AS BLOB)) >= {min_bytes}',
+                compress_text,
+            ),
+            convert("typeof(text) = 'blob'", decompress),
+        ),
+    ]
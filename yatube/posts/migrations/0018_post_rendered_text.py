@@ -0,0 +1,126 @@
+from importlib import import_module
+
+import core.fields
+from django.db import migrations, models, transaction
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+BATCH_SIZE = 1000
+# Отрисовка на момент миграции; posts.rendering может измениться позже.
+EXCERPT_LENGTH = 200
+
+
+def new_fields():
+    fields = [
+        ('text_html', core.fields.CompressedTextField(
+            default='', editable=False,
+        )),
+        ('excerpt', models.CharField(
+            default='', editable=False, max_length=EXCERPT_LENGTH,
+        )),
+    ]
+    for name, field in fields:
+        field.set_attributes_from_name(name)
+    return fields
+
+
+def add_columns(apps, schema_editor):
+    # AddField на SQLite пересоздаёт таблицу: это долго для большой
+    # таблицы постов и удаляет триггеры полнотекстового индекса.
+    # ALTER TABLE ADD COLUMN с умолчанием не переписывает строки.
+    Post = apps.get_model('posts', 'Post')
+    for name, field in new_fields():
+        if schema_editor.connection.vendor != 'sqlite':
+            schema_editor.add_field(Post, field)
+            continue
+        definition, _ = schema_editor.column_sql(
+            Post, field, include_default=False
+        )
+        schema_editor.execute(
+            f'ALTER TABLE {schema_editor.quote_name(Post._meta.db_table)} '
+            f'ADD COLUMN {schema_editor.quote_name(field.column)} '
+            f"{definition} DEFAULT ''"
+        )
+
+
+def drop_column(name):
+    def run(apps, schema_editor):
+        # ALTER TABLE DROP COLUMN есть только в SQLite 3.35 и новее,
+        # поэтому на SQLite remove_field пересоздаёт таблицу постов,
+        # а с ней удаляет триггеры индекса: они создаются заново, как
+        # в 0016.
+        Post = apps.get_model('posts', 'Post')
+        schema_editor.remove_field(Post, Post._meta.get_field(name))
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        text_compressed = import_module(
+            'posts.migrations.0016_post_text_compressed'
+        )
+        for statement in text_compressed.triggers(
+            'uncompressed_text(new.text)', 'uncompressed_text(old.text)'
+        ):
+            schema_editor.execute(statement)
+    return run
+
+
+def render(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    posts = apps.get_model('posts', 'Post').objects.using(alias)
+    last_pk = 0
+    while True:
+        with transaction.atomic(using=alias):
+            batch = list(
+                posts.filter(pk__gt=last_pk).order_by('pk').only('text')[
+                    :BATCH_SIZE
+                ]
+            )
+            if not batch:
+                return
+            for post in batch:
+                post.text_html = linebreaksbr(post.text)
+                post.excerpt = Truncator(post.text).chars(EXCERPT_LENGTH)
+            posts.bulk_update(batch, ['text_html', 'excerpt'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Посты отрисовываются пачками, каждая — своей транзакцией.
+    atomic = False
+
+    dependencies = [
+        ('posts', '0017_compress_post_texts'),
+    ]
+
+    # Столбцы удаляются по одному операциями после добавления своего
+    # поля в состояние: remove_field нужна модель с этим полем, но без
+    # уже удалённых.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='post',
+                    name='text_html',
+                    field=dict(new_fields())['text_html'],
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(add_columns, migrations.RunPython.noop),
+            ],
+        ),
+        migrations.RunPython(
+            migrations.RunPython.noop, drop_column('text_html')
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='post',
+                    name='excerpt',
+                    field=dict(new_fields())['excerpt'],
+                ),
+            ],
+        ),
+        migrations.RunPython(
+            migrations.RunPython.noop, drop_column('excerpt')
+        ),
+        migrations.RunPython(render, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,86 @@
+from core.fields import CompressedTextField
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils.functional import cached_property
+
+from .rendering import EXCERPT_LENGTH, make_excerpt, render_html
+from .rows import ArchivedPostRow, ArchivedRowIterable, PostRow, RowIterable
 
 User = get_user_model()
 
 
+# Поля постов, выводимые в лентах, кроме текста.
+FEED_FIELDS = (
+    'pub_date',
+    'updated_at',
+    'version',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__title',
+    'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self, excerpt=False):
+        """Посты для лент: автор и группа выбираются тем же запросом,
+        из связанных таблиц читаются только выводимые поля. Вместо
+        текста читается его HTML или, если excerpt, отрывок."""
+        return self.select_related('author', 'group').only(
+            'excerpt' if excerpt else 'text_html', *FEED_FIELDS
+        )
+
+    def rows(self):
+        """Посты для лент в виде легковесных строк вместо экземпляров
+        моделей (см. posts.rows)."""
+        queryset = self.values_list(*PostRow.FIELDS)
+        queryset._iterable_class = RowIterable
+        return queryset
+
+
+class ArchivedPostQuerySet(models.QuerySet):
+    def feed(self, excerpt=False):
+        """Архивные посты для лент (см. PostQuerySet.feed); текст
+        читается из архива при обращении."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def rows(self):
+        """Архивные посты для лент в виде строк (см. PostQuerySet.rows)."""
+        queryset = self.values_list(*ArchivedPostRow.FIELDS)
+        queryset._iterable_class = ArchivedRowIterable
+        return queryset
+
+
 class Post(models.Model):
-    text = models.TextField()  # type: ignore
+    # Длинные тексты хранятся сжатыми, чтобы не раздувать таблицу,
+    # которую читает каждая лента.
+    text = CompressedTextField()  # type: ignore
+    # Текст, отрисованный для шаблонов (см. posts.rendering).
+    text_html = CompressedTextField(
+        default='',
+        editable=False,
+    )  # type: ignore
+    excerpt = models.CharField(
+        max_length=EXCERPT_LENGTH,
+        default='',
+        editable=False,
+    )  # type: ignore
     pub_date = models.DateTimeField(auto_now_add=True)  # type: ignore
+    updated_at = models.DateTimeField(auto_now=True)  # type: ignore
+    # Версия отрисованной карточки поста (см. posts.cache): увеличивается
+    # при редактировании поста и переименовании автора или группы.
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+    )  # type: ignore
+    # Отдельные индексы по внешним ключам не нужны: их заменяют
+    # составные индексы лент из Meta.indexes.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='posts'
+        related_name='posts',
+        db_index=False,
     )  # type: ignore
     group = models.ForeignKey(
         'Group',
@@ -18,19 +88,190 @@ class Post(models.Model):
         null=True,
         on_delete=models.SET_NULL,
         related_name='posts',
+        db_index=False,
     )  # type: ignore
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', 'id')
+        # Индексы совпадают с порядком лент (см. posts.paginators),
+        # поэтому выборка страницы не требует сортировки.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', 'id'],
+                name='post_feed_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', 'id'],
+                name='post_group_feed_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', 'id'],
+                name='post_author_feed_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Автор и группа на момент загрузки: по ним обработчик post_save
+        # переносит пост между счётчиками (см. posts.counters).
+        post._loaded_author_id = post.__dict__.get('author_id')
+        post._loaded_group_id = post.__dict__.get('group_id')
+        return post
+
+    def render(self):
+        """Отрисовывает text_html и excerpt по тексту поста."""
+        self.text_html = render_html(self.text)
+        self.excerpt = make_excerpt(self.text)
+
+    def save(self, *args, **kwargs):
+        self.render()
+        if self.pk is None:
+            from .sharding import is_sharded, place_new_posts
+            if is_sharded():
+                # Новый пост сохраняется в базу автора с id из общей
+                # последовательности (см. posts.sharding). Счётчики
+                # в основной базе, общей транзакции с постом у них нет:
+                # каждый запрос фиксируется сразу и не держит блокировку
+                # одной базы, ожидая другую.
+                kwargs['using'] = place_new_posts([self])[0][0]
+                kwargs['force_insert'] = True
+                return super().save(*args, **kwargs)
+        # Счётчики постов обновляются в той же транзакции, что и пост.
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)  # type: ignore
     slug = models.SlugField(max_length=50, unique=True)  # type: ignore
     description = models.TextField()  # type: ignore
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )  # type: ignore
 
     def __str__(self) -> str:
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        group = super().from_db(db, field_names, values)
+        group._loaded_names = (
+            group.__dict__.get('title'), group.__dict__.get('slug')
+        )
+        return group
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='post_stats',
+    )  # type: ignore
+    posts_count = models.PositiveIntegerField(default=0)  # type: ignore
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.posts_count}'
+
+
+class AuthorShard(models.Model):
+    """База, в которой хранятся посты автора (см. posts.sharding).
+
+    Нет строки — посты автора в основной базе.
+    """
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='shard',
+    )  # type: ignore
+    alias = models.CharField(max_length=100)  # type: ignore
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.alias}'
+
+
+class PostRoute(models.Model):
+    """Id поста, выданный при шардировании, и его автор.
+
+    id постов выдаются этой таблицей основной базы и уникальны во всех
+    базах; по автору находится база поста.
+    """
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )  # type: ignore
+
+    def __str__(self) -> str:
+        return f'{self.pk}: {self.author_id}'
+
+
+class ArchivedPost(models.Model):
+    """Пост, перенесённый в архив (см. posts.archive).
+
+    Текст поста хранится в архивной базе месяца публикации; в строке
+    — поля, по которым посты отбираются и сортируются в лентах,
+    и поля карточки поста. Экземпляр выводится в шаблонах как Post.
+    """
+    id = models.IntegerField(primary_key=True)  # type: ignore
+    pub_date = models.DateTimeField()  # type: ignore
+    updated_at = models.DateTimeField()  # type: ignore
+    version = models.PositiveIntegerField()  # type: ignore
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        db_index=False,
+    )  # type: ignore
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        db_index=False,
+    )  # type: ignore
+
+    objects = ArchivedPostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-pub_date', 'id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', 'id'],
+                name='archived_feed_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', 'id'],
+                name='archived_group_feed_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', 'id'],
+                name='archived_author_feed_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.text[:15]
+
+    @cached_property
+    def text(self):
+        from .archive import read_texts
+        return read_texts([self])[self.pk]
+
+    @cached_property
+    def text_html(self):
+        return render_html(self.text)
+
+    @cached_property
+    def excerpt(self):
+        return make_excerpt(self.text)
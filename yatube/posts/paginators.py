@@ -0,0 +1,345 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import (EmptyPage, InvalidPage, Page,
+                                   PageNotAnInteger, Paginator)
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils.functional import cached_property
+
+# Порядок лент: ключ (pub_date, id) однозначно задаёт позицию поста.
+FEED_ORDERING = ('-pub_date', 'id')
+
+PAGE_PARAM = 'page'
+AFTER_PARAM = 'after'
+BEFORE_PARAM = 'before'
+PAGINATION_PARAMS = (PAGE_PARAM, AFTER_PARAM, BEFORE_PARAM)
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def _build_query(query, **params):
+    """Собирает строку запроса, сохраняя параметры, не связанные
+    с пагинацией."""
+    query = query.copy()
+    for param in PAGINATION_PARAMS:
+        query.pop(param, None)
+    for param, value in params.items():
+        query[param] = value
+    return query.urlencode()
+
+
+class OffsetPage(Page):
+    """Страница с номером: поддерживает старые адреса вида ?page=N."""
+
+    def __init__(self, object_list, number, paginator):
+        super().__init__(object_list, number, paginator)
+        self.query = paginator.query
+
+    @property
+    def first_query(self):
+        return _build_query(self.query, page=1)
+
+    @property
+    def previous_query(self):
+        return _build_query(self.query, page=self.previous_page_number())
+
+    @property
+    def next_query(self):
+        return _build_query(self.query, page=self.next_page_number())
+
+    @property
+    def last_query(self):
+        return _build_query(self.query, page=self.paginator.num_pages)
+
+    @property
+    def page_links(self):
+        """Окно ссылок вокруг текущей страницы.
+
+        Возвращает пары (номер, строка запроса); пропуск обозначается
+        парой (None, None).
+        """
+        window = settings.POSTS_PAGE_WINDOW
+        num_pages = self.paginator.num_pages
+        numbers = sorted({1, num_pages} | set(range(
+            max(self.number - window, 1),
+            min(self.number + window, num_pages) + 1,
+        )))
+        links = []
+        previous = 0
+        for number in numbers:
+            if number - previous > 1:
+                links.append((None, None))
+            links.append((number, _build_query(self.query, page=number)))
+            previous = number
+        return links
+
+
+class OffsetPaginator(Paginator):
+    """Классический постраничный вывод с окном ссылок на страницы.
+
+    Если число объектов известно заранее (count), COUNT(*) не выполняется.
+    """
+
+    def __init__(self, object_list, per_page, query=None, count=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.query = query if query is not None else QueryDict()
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is not None:
+            return self._count
+        return super().count
+
+    def normalize_number(self, number):
+        """Номер страницы, которую вернёт get_page(number)."""
+        try:
+            return self.validate_number(number)
+        except PageNotAnInteger:
+            return 1
+        except EmptyPage:
+            return self.num_pages
+
+    def page_queryset(self, number):
+        """Запрос строк страницы с номером number."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        return self.object_list[bottom:top]
+
+    def _get_page(self, *args, **kwargs):
+        return OffsetPage(*args, **kwargs)
+
+
+class CursorPage(Page):
+    """Страница, границы которой заданы курсорами, а не номером.
+
+    Не обращается к paginator.count, поэтому не вызывает COUNT(*).
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self.query = paginator.query
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<CursorPage of %s posts>' % len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+    @property
+    def first_query(self):
+        return _build_query(self.query)
+
+    @property
+    def previous_query(self):
+        return _build_query(self.query, before=self.previous_cursor)
+
+    @property
+    def next_query(self):
+        return _build_query(self.query, after=self.next_cursor)
+
+    @property
+    def last_query(self):
+        return None
+
+    @property
+    def page_links(self):
+        return []
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (keyset): стоимость любой страницы
+    равна стоимости первой.
+
+    Курсор — непрозрачный токен со значениями полей ключа сортировки
+    у граничного поста страницы. Ключ может включать аннотации
+    запроса (например, rank поиска).
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 query=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.ordering = tuple(ordering)
+        self.query = query if query is not None else QueryDict()
+
+    @property
+    def _fields(self):
+        return [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def _get_field(self, name):
+        """Поле модели или выходное поле аннотации с именем name."""
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def encode_cursor(self, obj):
+        if isinstance(obj, dict):
+            # Строка values(): поля ключа переносятся в экземпляр модели.
+            row, obj = obj, self.object_list.model()
+            for name, _ in self._fields:
+                setattr(obj, name, row[name])
+        annotations = self.object_list.query.annotations
+        values = [
+            getattr(obj, name) if name in annotations
+            else self._get_field(name).value_to_string(obj)
+            for name, _ in self._fields
+        ]
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(cursor + padding)
+            values = json.loads(raw.decode())
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidCursor('Некорректный курсор')
+        if not isinstance(values, list) or len(values) != len(self._fields):
+            raise InvalidCursor('Некорректный курсор')
+        try:
+            return [
+                self._get_field(name).to_python(value)
+                for (name, _), value in zip(self._fields, values)
+            ]
+        except (TypeError, ValidationError):
+            raise InvalidCursor('Некорректный курсор')
+
+    def _keyset_filter(self, values, reverse):
+        """Условие «строго после курсора» в порядке self.ordering
+        (или «строго до», если reverse).
+
+        Нестрогая граница по первому полю ключа позволяет СУБД начать
+        чтение индекса сразу с позиции курсора.
+        """
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self._fields, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        (name, descending), value = self._fields[0], values[0]
+        lookup = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{name}__{lookup}': value}) & condition
+
+    def page_queryset(self, after=None, before=None):
+        """Запрос строк страницы (с одной лишней строкой, по которой
+        определяется наличие следующей страницы)."""
+        queryset = self.object_list
+        reverse = before is not None
+        cursor = before if reverse else after
+        if cursor is not None:
+            values = self.decode_cursor(cursor)
+            queryset = queryset.filter(self._keyset_filter(values, reverse))
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            ]
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def page(self, after=None, before=None):
+        """Возвращает страницу после курсора after или до курсора before."""
+        reverse = before is not None
+        rows = list(self.page_queryset(after=after, before=before))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            return self._get_page(
+                rows, self, has_next=True, has_previous=has_more
+            )
+        return self._get_page(
+            rows, self, has_next=has_more, has_previous=after is not None
+        )
+
+    def get_page(self, after=None, before=None):
+        """Как Paginator.get_page: при некорректном курсоре
+        возвращает первую страницу."""
+        try:
+            return self.page(after=after, before=before)
+        except InvalidCursor:
+            return self.page()
+
+    def _get_page(self, *args, **kwargs):
+        return CursorPage(*args, **kwargs)
+
+
+class FeedPagination:
+    """Пагинация ленты по параметрам запроса.
+
+    Адреса с ?page=N обслуживаются постраничным пагинатором,
+    остальные — курсорным, если не включён режим 'offset'.
+    count — известное заранее число постов ленты.
+
+    Запрос строк страницы (page_queryset) доступен до загрузки самой
+    страницы (page), например для проверки условного GET.
+    """
+
+    def __init__(self, request, queryset, count=None):
+        queryset = queryset.order_by(*FEED_ORDERING)
+        per_page = settings.POSTS_PER_PAGE
+        if (settings.POSTS_PAGINATION == 'offset'
+                or PAGE_PARAM in request.GET):
+            self.paginator = OffsetPaginator(
+                queryset, per_page, query=request.GET, count=count
+            )
+            self.page_kwargs = {
+                'number': self.paginator.normalize_number(
+                    request.GET.get(PAGE_PARAM)
+                ),
+            }
+            return
+        self.paginator = CursorPaginator(
+            queryset, per_page, query=request.GET
+        )
+        self.page_kwargs = {
+            'after': request.GET.get(AFTER_PARAM),
+            'before': request.GET.get(BEFORE_PARAM),
+        }
+        try:
+            self.paginator.page_queryset(**self.page_kwargs)
+        except InvalidCursor:
+            self.page_kwargs = {}
+
+    def page_queryset(self):
+        return self.paginator.page_queryset(**self.page_kwargs)
+
+    def page(self):
+        return self.paginator.page(**self.page_kwargs)
+
+
+def paginate(request, queryset, count=None):
+    """Возвращает страницу ленты для запроса (см. FeedPagination)."""
+    return FeedPagination(request, queryset, count).page()
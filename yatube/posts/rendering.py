@@ -0,0 +1,45 @@
+"""Отрисованный текст поста.
+
+HTML текста (text_html) и короткий отрывок (excerpt) вычисляются при
+сохранении поста и хранятся в его строке: шаблоны лент и страницы
+поста не прогоняют текст через фильтры на каждый запрос, а ленты
+не читают столбец text. Посты, сохранённые до появления столбцов или
+в обход Post.save, отрисовывает команда render_posts.
+"""
+
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+# Наибольшая длина отрывка в символах, включая многоточие.
+EXCERPT_LENGTH = 200
+RENDERED_FIELDS = ('text_html', 'excerpt')
+
+
+def render_html(text):
+    """Безопасный HTML текста поста: то же, что фильтр linebreaksbr."""
+    return linebreaksbr(text)
+
+
+def make_excerpt(text):
+    return Truncator(text).chars(EXCERPT_LENGTH)
+
+
+def render_posts(queryset, batch_size=1000):
+    """Заново отрисовывает text_html и excerpt постов queryset пачками
+    по batch_size, каждую — одним UPDATE. Возвращает число постов."""
+    rendered = 0
+    last_pk = 0
+    while True:
+        posts = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').only('text')[
+                :batch_size
+            ]
+        )
+        if not posts:
+            return rendered
+        for post in posts:
+            post.text_html = render_html(post.text)
+            post.excerpt = make_excerpt(post.text)
+        queryset.bulk_update(posts, RENDERED_FIELDS)
+        rendered += len(posts)
+        last_pk = posts[-1].pk
@@ -0,0 +1,207 @@
+"""Легковесные строки постов для лент.
+
+Ленты выводят у поста только дату, HTML текста, имя автора и название
+группы со ссылками. Экземпляры Post, User и Group для этого избыточны:
+у каждого __dict__ со всеми полями, ModelState, сигналы pre_init
+и post_init. Запрос rows() читает те же поля через values_list(),
+а строки собираются в объекты со __slots__ с атрибутами, которые
+используют шаблоны карточек (post.author.get_full_name, post.group.slug,
+post.pub_date, …).
+
+Остальные поля модели строка читает из базы при обращении, как
+отложенные поля экземпляра: загружается экземпляр модели целиком,
+одним запросом на строку.
+"""
+
+from functools import lru_cache
+
+from django.db.models.query import ValuesListIterable
+
+
+class AuthorRow:
+    __slots__ = ('id', 'username', 'first_name', 'last_name', '_instance')
+
+    def __init__(self, id, username, first_name, last_name):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+        self._instance = None
+
+    def __str__(self):
+        return self.username
+
+    def __getattr__(self, name):
+        from .models import User
+        _check_field(User, name)
+        if self._instance is None:
+            self._instance = User.objects.get(pk=self.id)
+        return getattr(self._instance, name)
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+
+class GroupRow:
+    __slots__ = ('id', 'title', 'slug', '_instance')
+
+    def __init__(self, id, title, slug):
+        self.id = id
+        self.title = title
+        self.slug = slug
+        self._instance = None
+
+    def __str__(self):
+        return self.title
+
+    def __getattr__(self, name):
+        from .models import Group
+        _check_field(Group, name)
+        if self._instance is None:
+            self._instance = Group.objects.get(pk=self.id)
+        return getattr(self._instance, name)
+
+    @property
+    def pk(self):
+        return self.id
+
+
+@lru_cache(maxsize=None)
+def _field_names(model):
+    return frozenset(
+        [field.name for field in model._meta.get_fields()]
+        + [field.attname for field in model._meta.concrete_fields]
+    )
+
+
+def _check_field(model, name):
+    # Из базы читаются только поля модели: прочие атрибуты, которые
+    # запрашивают hasattr(), шаблоны и copy, не должны её читать.
+    if name not in _field_names(model):
+        raise AttributeError(name)
+
+
+class PostRow:
+    """Пост ленты (см. PostQuerySet.rows)."""
+
+    __slots__ = ('id', 'pub_date', 'updated_at', 'version', 'text_html',
+                 'author', 'group', '_instance')
+    # Поля values_list() строки в порядке аргументов from_values.
+    FIELDS = (
+        'id', 'pub_date', 'updated_at', 'version', 'text_html',
+        'author_id', 'author__username', 'author__first_name',
+        'author__last_name', 'group_id', 'group__title', 'group__slug',
+    )
+
+    @classmethod
+    def from_values(cls, values, related=None):
+        """Строка из кортежа полей FIELDS. Строки автора и группы
+        берутся из словаря related, если они там уже есть: посты одной
+        страницы делят их."""
+        (pk, pub_date, updated_at, version, text_html, author_id, username,
+         first_name, last_name, group_id, title, slug) = values
+        if related is None:
+            related = {}
+        row = cls.__new__(cls)
+        row.id = pk
+        row.pub_date = pub_date
+        row.updated_at = updated_at
+        row.version = version
+        row.text_html = text_html
+        row.author = related.get((AuthorRow, author_id))
+        if row.author is None:
+            row.author = related[AuthorRow, author_id] = AuthorRow(
+                author_id, username, first_name, last_name
+            )
+        row.group = None
+        if group_id is not None:
+            row.group = related.get((GroupRow, group_id))
+            if row.group is None:
+                row.group = related[GroupRow, group_id] = GroupRow(
+                    group_id, title, slug
+                )
+        row._instance = None
+        return row
+
+    def __repr__(self):
+        return f'<{type(self).__name__}: {self.id}>'
+
+    def __getattr__(self, name):
+        from .models import Post
+        _check_field(Post, name)
+        return getattr(self._load(), name)
+
+    def _load(self):
+        if self._instance is None:
+            from .models import Post
+            from .sharding import for_post
+            self._instance = for_post(Post.objects.all(), self.id).get(
+                pk=self.id
+            )
+        return self._instance
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def author_id(self):
+        return self.author.id
+
+    @property
+    def group_id(self):
+        return None if self.group is None else self.group.id
+
+
+class ArchivedPostRow(PostRow):
+    """Архивный пост ленты: текст читается из архива при обращении,
+    если его не прочитала вся страница (archive.read_page_texts), как
+    у ArchivedPost."""
+
+    __slots__ = ('text',)
+    FIELDS = tuple(name for name in PostRow.FIELDS if name != 'text_html')
+
+    @classmethod
+    def from_values(cls, values, related=None):
+        row = super().from_values((*values[:4], None, *values[4:]), related)
+        del row.text_html
+        return row
+
+    def __getattr__(self, name):
+        if name == 'text':
+            from .archive import read_texts
+            self.text = read_texts([self])[self.id]
+            return self.text
+        if name == 'text_html':
+            from .rendering import render_html
+            self.text_html = render_html(self.text)
+            return self.text_html
+        from .models import ArchivedPost
+        _check_field(ArchivedPost, name)
+        return getattr(self._load(), name)
+
+    def _load(self):
+        if self._instance is None:
+            from .models import ArchivedPost
+            self._instance = ArchivedPost.objects.get(pk=self.id)
+        return self._instance
+
+
+class RowIterable(ValuesListIterable):
+    """Строки values_list() запроса rows() в виде объектов row_class."""
+
+    row_class = PostRow
+
+    def __iter__(self):
+        make = self.row_class.from_values
+        related = {}
+        for values in super().__iter__():
+            yield make(values, related)
+
+
+class ArchivedRowIterable(RowIterable):
+    row_class = ArchivedPostRow
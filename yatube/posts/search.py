@@ -0,0 +1,90 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'posts_post_fts'
+
+# Порядок результатов поиска: сначала наиболее релевантные (rank в FTS5
+# тем меньше, чем выше релевантность), id делает ключ однозначным.
+SEARCH_ORDERING = ('rank', 'id')
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """Выражение FTS5 MATCH для пользовательской строки поиска.
+
+    Каждое слово берётся в кавычки, поэтому синтаксис FTS5 (OR, NEAR,
+    звёздочки, двоеточия) во вводе пользователя не интерпретируется;
+    слова объединяются по AND. Пустая строка, если слов нет.
+    """
+    return ' '.join(f'"{word}"' for word in _WORD_RE.findall(query))
+
+
+def search_available():
+    """Есть ли полнотекстовый индекс у текущей СУБД."""
+    return connection.vendor == 'sqlite'
+
+
+def search_posts(queryset, query):
+    """Посты queryset, подходящие под строку поиска, с аннотацией rank.
+
+    На SQLite запрос соединяется с полнотекстовым индексом
+    posts_post_fts по rowid и ранжируется по bm25; на других СУБД
+    выполняется поиск по вхождению всех слов, rank у всех строк равен 0.
+    """
+    words = _WORD_RE.findall(query)
+    if not words:
+        return queryset.none().annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+    if not search_available():
+        for word in words:
+            queryset = queryset.filter(text__icontains=word)
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match_expression(query)],
+    ).annotate(rank=RawSQL(f'{FTS_TABLE}.rank', (), FloatField()))
+
+
+def matching_ids(query):
+    """Подзапрос id постов, подходящих под строку поиска (без ранжирования).
+
+    Используется там, где порядок задаётся отдельно, например в админке.
+    """
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (match_expression(query),),
+    )
+
+
+def rebuild_index(optimize=False, using=DEFAULT_DB_ALIAS):
+    """Перестраивает полнотекстовый индекс по таблице постов базы using.
+
+    Команда FTS5 'rebuild' прочитала бы из таблицы постов сжатые тексты
+    (см. core.fields.CompressedTextField), поэтому индекс очищается
+    и заполняется распакованными текстами.
+    """
+    if not search_available():
+        return
+    cursor = connections[using].cursor()
+    with transaction.atomic(using=using), cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            'SELECT id, uncompressed_text(text) FROM posts_post'
+        )
+        if optimize:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+            )
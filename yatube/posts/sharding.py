@@ -0,0 +1,515 @@
+"""Хранение постов по авторам в нескольких базах.
+
+Базы перечислены в POST_SHARDS, первой — основная. Все посты автора
+лежат в одной базе: новые авторы закрепляются за базой по хешу id
+(AuthorShard), авторы без закрепления — в основной базе; переносит
+авторов команда rebalance_shards. Пользователи и группы копируются
+во все базы, чтобы ленты соединялись с ними внутри одной базы;
+счётчики, сессии и прочие данные остаются в основной базе.
+
+id постов выдаются в основной базе (PostRoute) и уникальны во всех
+базах; PostRoute хранит автора поста, по нему страница поста находит
+его базу. Ленты по всем авторам читаются из каждой базы и сливаются
+(MergedQuerySet).
+"""
+
+import heapq
+import itertools
+import zlib
+
+from core.routers import primary_reads
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import (AutoField, CharField, Count, DateField,
+                              ExpressionWrapper, F, IntegerField, Max, Min,
+                              Sum, Value)
+from django.db.models.functions import Cast
+from django.db.models.query import ModelIterable
+
+from .models import AuthorShard, Group, Post, PostRoute, User
+from .rows import RowIterable
+
+# Поля пользователей и групп, копируемые в базы постов: их выводят
+# карточки постов.
+REFERENCE_FIELDS = {
+    User: ('username', 'first_name', 'last_name'),
+    Group: ('title', 'slug', 'description'),
+}
+# Связи, данные которых есть только в основной базе: в запросах
+# к другим базам они не присоединяются, а читаются из основной.
+PRIMARY_ONLY_RELATIONS = {'post_stats', 'shard'}
+# Методы QuerySet, которые MergedQuerySet применяет к запросу каждой базы.
+CHAINED_METHODS = frozenset({
+    'all', 'annotate', 'defer', 'distinct', 'exclude', 'extra', 'filter',
+    'none', 'only', 'order_by', 'select_related', 'values', 'values_list',
+})
+# Методы, которые QuerySet запрещает после среза.
+FILTER_METHODS = frozenset({'distinct', 'exclude', 'filter', 'order_by'})
+# Агрегаты, значения которых по базам можно объединить.
+AGGREGATE_MERGERS = {Count: sum, Sum: sum, Max: max, Min: min}
+# Наибольшее число строк в одном INSERT при выдаче id.
+ALLOCATE_BATCH_SIZE = 5000
+# Запросы, строки которых — объекты с атрибутом pk, а не словари
+# или кортежи values().
+OBJECT_ITERABLES = (ModelIterable, RowIterable)
+
+
+def shards():
+    return list(settings.POST_SHARDS)
+
+
+def is_sharded():
+    return len(settings.POST_SHARDS) > 1
+
+
+def hash_shard(author_id):
+    """База нового автора по хешу его id."""
+    aliases = settings.POST_SHARDS
+    return aliases[zlib.crc32(str(author_id).encode()) % len(aliases)]
+
+
+def author_shard(author):
+    """База постов автора (пользователь или его id)."""
+    if not is_sharded():
+        return DEFAULT_DB_ALIAS
+    with primary_reads():
+        if isinstance(author, User):
+            try:
+                return author.shard.alias
+            except AuthorShard.DoesNotExist:
+                return DEFAULT_DB_ALIAS
+        alias = AuthorShard.objects.filter(author_id=author).values_list(
+            'alias', flat=True
+        ).first()
+    return alias or DEFAULT_DB_ALIAS
+
+
+def post_shard(pk):
+    """База поста с id pk. Посты без маршрута созданы до
+    шардирования и лежат в основной базе."""
+    if not is_sharded():
+        return DEFAULT_DB_ALIAS
+    with primary_reads():
+        alias = PostRoute.objects.filter(pk=pk).values_list(
+            'author__shard__alias', flat=True
+        ).first()
+    return alias or DEFAULT_DB_ALIAS
+
+
+def _prune_relations(related):
+    return {
+        name: _prune_relations(nested) for name, nested in related.items()
+        if name not in PRIMARY_ONLY_RELATIONS
+    }
+
+
+def on_shard(queryset, alias):
+    """Запрос queryset к базе alias.
+
+    Запросы к основной базе не меняются (их может направить на копию
+    core.routers); в запросах к другим базам из select_related
+    убираются связи PRIMARY_ONLY_RELATIONS — они будут прочитаны
+    из основной базы при обращении.
+    """
+    if alias == DEFAULT_DB_ALIAS:
+        return queryset
+    queryset = queryset.using(alias)
+    if isinstance(queryset.query.select_related, dict):
+        queryset.query.select_related = _prune_relations(
+            queryset.query.select_related
+        )
+    return queryset
+
+
+def on_author_shard(queryset, author):
+    """Запрос queryset к базе постов автора."""
+    return on_shard(queryset, author_shard(author))
+
+
+def for_post(queryset, pk):
+    """Запрос queryset к базе поста с id pk."""
+    return on_shard(queryset, post_shard(pk))
+
+
+def across_shards(queryset):
+    """Запрос queryset ко всем базам постов."""
+    if not is_sharded():
+        return queryset
+    return MergedQuerySet([on_shard(queryset, alias) for alias in shards()])
+
+
+def allocate_post_ids(author_ids):
+    """Выдаёт id новым постам авторов author_ids и записывает маршруты.
+
+    Новые id больше всех id, выданных PostRoute и автоинкрементом
+    таблицы постов основной базы (посты, созданные без шардирования),
+    поэтому не совпадают ни с одним существующим. INSERT выполняется
+    первым: транзакция берёт блокировку записи SQLite до чтения
+    последнего id, и параллельная выдача тех же id невозможна.
+    """
+    routes = PostRoute._meta.db_table
+    ids = []
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), \
+            connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        for start in range(0, len(author_ids), ALLOCATE_BATCH_SIZE):
+            batch = author_ids[start:start + ALLOCATE_BATCH_SIZE]
+            rows = ', '.join(['(%s, %s)'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {routes} (id, author_id) '
+                'SELECT base.seq + new.column1, new.column2 FROM '
+                '(SELECT COALESCE(MAX(seq), 0) AS seq FROM sqlite_sequence '
+                'WHERE name IN (%s, %s)) AS base, '
+                f'(VALUES {rows}) AS new',
+                [Post._meta.db_table, routes] + [
+                    value for number, author_id in enumerate(batch, 1)
+                    for value in (number, author_id)
+                ],
+            )
+            cursor.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = %s', [routes]
+            )
+            (last,) = cursor.fetchone()
+            ids.extend(range(last - len(batch) + 1, last + 1))
+    return ids
+
+
+def place_new_posts(posts):
+    """Назначает новым постам id и распределяет их по базам авторов.
+
+    Возвращает пары (база, посты этой базы).
+    """
+    author_ids = [post.author_id for post in posts]
+    with primary_reads():
+        aliases = dict(AuthorShard.objects.filter(
+            author_id__in=set(author_ids)
+        ).values_list('author_id', 'alias'))
+    by_alias = {}
+    for post, pk in zip(posts, allocate_post_ids(author_ids)):
+        post.pk = pk
+        alias = aliases.get(post.author_id, DEFAULT_DB_ALIAS)
+        by_alias.setdefault(alias, []).append(post)
+    return list(by_alias.items())
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def copy_references(model, objects, aliases=None, batch_size=500):
+    """Копирует пользователей или групп objects в базы постов aliases
+    (по умолчанию — во все, кроме основной).
+
+    Сигналы не отправляются: копии — не самостоятельные объекты.
+    """
+    fields = REFERENCE_FIELDS[model]
+    if aliases is None:
+        aliases = [alias for alias in shards() if alias != DEFAULT_DB_ALIAS]
+    for alias in aliases:
+        manager = model._base_manager.using(alias)
+        for batch in _chunks(list(objects), batch_size):
+            existing = {
+                row[0]: row[1:] for row in manager.filter(
+                    pk__in=[obj.pk for obj in batch]
+                ).values_list('pk', *fields)
+            }
+            missing = []
+            for obj in batch:
+                values = {field: getattr(obj, field) for field in fields}
+                if obj.pk not in existing:
+                    missing.append(model(pk=obj.pk, **values))
+                elif existing[obj.pk] != tuple(values.values()):
+                    manager.filter(pk=obj.pk).update(**values)
+            manager.bulk_create(missing)
+
+
+def place_bulk_created(model, queryset):
+    """Закрепляет за базами и копирует в базы постов пользователей
+    или группы, созданных bulk_create: post_save для них
+    не отправляется (см. posts.signals.place_author
+    и copy_reference_row).
+
+    queryset — созданные объекты в основной базе; уже закреплённые
+    авторы и уже скопированные строки не меняются.
+    """
+    if not is_sharded():
+        return
+    objects = list(queryset.only('pk', *REFERENCE_FIELDS[model]))
+    if model is User:
+        with primary_reads():
+            placed = set(AuthorShard.objects.filter(
+                author_id__in=[obj.pk for obj in objects]
+            ).values_list('author_id', flat=True))
+        AuthorShard.objects.bulk_create([
+            AuthorShard(author_id=obj.pk, alias=hash_shard(obj.pk))
+            for obj in objects if obj.pk not in placed
+        ], ignore_conflicts=True)
+    copy_references(model, objects)
+
+
+class ShardRouter:
+    """Перечитывает и сохраняет пост в той базе постов, из которой
+    он прочитан; база новых постов выбирается в Post.save."""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if (model is Post and isinstance(instance, Post)
+                and instance._state.db in settings.POST_SHARDS
+                and instance._state.db != DEFAULT_DB_ALIAS):
+            return instance._state.db
+        return None
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        if (model is Post and instance is not None
+                and instance._state.db in settings.POST_SHARDS):
+            return instance._state.db
+        return None
+
+
+def _tagged(index, rows):
+    for row in rows:
+        yield index, row
+
+
+class _Descending:
+    """Значение ключа сортировки по убыванию."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+class MergedQuerySet:
+    """Запрос к нескольким базам с общим порядком строк.
+
+    Методы QuerySet из CHAINED_METHODS применяются к запросу каждой
+    базы. Срез [start:stop] читает из каждой базы первые stop строк
+    в порядке запроса и сливает отсортированные потоки (k-way merge);
+    строки до start отбрасываются, поэтому глубокие страницы ?page=N
+    читают из каждой базы все строки до страницы. Остальные атрибуты
+    (model, query, ordered) берутся у запроса первой базы.
+    """
+
+    def __init__(self, querysets, start=0, stop=None):
+        self.querysets = querysets
+        self.start = start
+        self.stop = stop
+        self._result_cache = None
+
+    def __repr__(self):
+        return f'<MergedQuerySet of {len(self.querysets)} databases>'
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('querysets', 'start', 'stop'):
+            raise AttributeError(name)
+        if name not in CHAINED_METHODS:
+            return getattr(self.querysets[0], name)
+
+        def chained(*args, **kwargs):
+            sliced = self.start or self.stop is not None
+            if sliced and name in FILTER_METHODS:
+                raise TypeError('Cannot filter a query once a slice has '
+                                'been taken.')
+            return type(self)([
+                getattr(queryset, name)(*args, **kwargs)
+                for queryset in self.querysets
+            ], self.start, self.stop)
+        return chained
+
+    def _sliced(self):
+        if self.stop is None:
+            return self.querysets
+        return [queryset[:self.stop] for queryset in self.querysets]
+
+    def _ordering(self):
+        queryset = self.querysets[0]
+        return queryset.query.order_by or queryset.model._meta.ordering
+
+    def _sort_key(self):
+        """Ключ сортировки строк: экземпляров модели, словарей values()
+        или кортежей values_list()."""
+        queryset = self.querysets[0]
+        pk_names = {'pk', queryset.model._meta.pk.attname}
+        fields = getattr(queryset, '_fields', None) or ()
+        getters = []
+        for name in self._ordering():
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            names = pk_names if name in pk_names else {name}
+            getters.append((names, descending))
+
+        def value(row, names):
+            if isinstance(row, dict):
+                return next(row[name] for name in names if name in row)
+            if isinstance(row, tuple):
+                return next(
+                    row[fields.index(name)] for name in names
+                    if name in fields
+                )
+            return getattr(row, next(iter(names)))
+
+        def key(row):
+            return tuple(
+                _Descending(value(row, names)) if descending
+                else value(row, names)
+                for names, descending in getters
+            )
+        return key
+
+    def _page_keys(self):
+        """Выражения ключа сортировки для _fetch_page и направление
+        слияния; None, если ключ не выразить в SQL.
+
+        Даты сравниваются в виде текста, в котором их хранит SQLite:
+        разбор десятков тысяч дат занял бы больше, чем запросы. Числа
+        с направлением, обратным первому полю, берутся с обратным
+        знаком, и строки ключей сравниваются без обёрток.
+        """
+        model = self.querysets[0].model
+        ordering = self._ordering()
+        reverse = ordering[0].startswith('-')
+        keys = {}
+        for position, name in enumerate(ordering):
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            try:
+                field = model._meta.get_field(
+                    model._meta.pk.name if name == 'pk' else name
+                )
+            except FieldDoesNotExist:
+                field = None
+            expression = F(name)
+            if isinstance(field, DateField):
+                expression = Cast(name, CharField())
+            if descending != reverse:
+                if not isinstance(field, (AutoField, IntegerField)):
+                    return None
+                expression = ExpressionWrapper(
+                    expression * -1, output_field=IntegerField()
+                )
+            keys[f'_key{position}'] = expression
+        return keys, reverse
+
+    def _fetch_page(self, keys, reverse):
+        """Строки среза, начинающегося не с первой строки.
+
+        Из каждой базы читаются только ключи сортировки и id строк
+        до конца среза; полные строки читаются по id только для самого
+        среза.
+        """
+        streams = [
+            queryset.annotate(
+                **keys, _shard=Value(index, output_field=IntegerField())
+            ).values_list(*keys, 'pk', '_shard')[:self.stop]
+            for index, queryset in enumerate(self.querysets)
+        ]
+        page = list(itertools.islice(
+            heapq.merge(*streams, reverse=reverse), self.start, self.stop
+        ))
+        pks = {}
+        for *_, pk, index in page:
+            pks.setdefault(index, []).append(pk)
+        rows = {
+            (index, row.pk): row
+            for index, index_pks in pks.items()
+            for row in self.querysets[index].filter(pk__in=index_pks)
+        }
+        return [rows[index, pk] for *_, pk, index in page]
+
+    def _fetch(self):
+        if self._result_cache is None:
+            # Глубокие страницы объектов: полные строки до среза
+            # незачем читать.
+            page_keys = None
+            if self.start and issubclass(
+                self.querysets[0]._iterable_class, OBJECT_ITERABLES
+            ):
+                page_keys = self._page_keys()
+            if page_keys is not None:
+                self._result_cache = self._fetch_page(*page_keys)
+            else:
+                rows = heapq.merge(*self._sliced(), key=self._sort_key())
+                self._result_cache = list(
+                    itertools.islice(rows, self.start, self.stop)
+                )
+        return self._result_cache
+
+    def __iter__(self):
+        return iter(self._fetch())
+
+    def __len__(self):
+        return len(self._fetch())
+
+    def __bool__(self):
+        return bool(self._fetch())
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self._fetch()[key]
+        if key.step is not None:
+            raise ValueError('Шаг среза не поддерживается')
+        start = self.start + (key.start or 0)
+        stop = self.stop
+        if key.stop is not None:
+            stop = self.start + key.stop
+            if self.stop is not None:
+                stop = min(stop, self.stop)
+        return type(self)(self.querysets, start, stop)
+
+    def iterator(self, chunk_size=None):
+        """Потоковое слияние: строки каждой базы читаются
+        QuerySet.iterator(), результат не кэшируется."""
+        # Как у QuerySet, запросы выполняются при первом обращении.
+        if self._result_cache is not None:
+            yield from self._result_cache
+            return
+        streams = [
+            queryset.iterator(chunk_size) if chunk_size
+            else queryset.iterator()
+            for queryset in self._sliced()
+        ]
+        rows = heapq.merge(*streams, key=self._sort_key())
+        yield from itertools.islice(rows, self.start, self.stop)
+
+    def first(self):
+        return next(iter(self[:1]), None)
+
+    def exists(self):
+        return any(queryset.exists() for queryset in self._sliced())
+
+    def count(self):
+        if self.start or self.stop is not None:
+            return len(self)
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def aggregate(self, **aggregates):
+        """Агрегаты по строкам всех баз.
+
+        У среза агрегируются первые stop строк каждой базы — все строки,
+        из которых выбирается срез.
+        """
+        results = [
+            queryset.aggregate(**aggregates) for queryset in self._sliced()
+        ]
+        merged = {}
+        for name, aggregate in aggregates.items():
+            merge = AGGREGATE_MERGERS.get(type(aggregate))
+            if merge is None:
+                raise TypeError(
+                    f'Агрегат {type(aggregate).__name__} не поддерживается'
+                )
+            values = [
+                result[name] for result in results
+                if result[name] is not None
+            ]
+            merged[name] = merge(values) if values else None
+        return merged
@@ -0,0 +1,183 @@
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .archive import _delete_texts
+from .cache import (bump_post_versions, invalidate_author_pages,
+                    invalidate_pages, invalidate_post_pages)
+from .counters import update_counts
+from .models import (ArchivedPost, AuthorShard, AuthorStats, Group, Post,
+                     PostRoute, User)
+from .sharding import (REFERENCE_FIELDS, author_shard, copy_references,
+                       hash_shard, is_sharded, shards)
+
+# Поля пользователя, выводимые в карточках постов.
+AUTHOR_CARD_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw, **kwargs):
+    """Заводит счётчики нового пользователя, чтобы при публикации
+    постов их оставалось только увеличить."""
+    if created and not raw:
+        AuthorStats.objects.create(author=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_loaded_relations(sender, instance, raw, **kwargs):
+    """Для поста, созданного не из базы, загружает текущих автора
+    и группу, чтобы post_save мог перенести пост между счётчиками."""
+    if raw or instance.pk is None or hasattr(instance, '_loaded_author_id'):
+        return
+    loaded = sender.objects.filter(pk=instance.pk).values(
+        'author_id', 'group_id'
+    ).first() or {}
+    instance._loaded_author_id = loaded.get('author_id')
+    instance._loaded_group_id = loaded.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw, **kwargs):
+    """Обновляет счётчики постов автора и группы и сбрасывает
+    закэшированные страницы с постом."""
+    if raw:
+        return
+    authors = Counter()
+    groups = Counter()
+    previous_author_id = previous_group_id = None
+    if created:
+        authors[instance.author_id] += 1
+        groups[instance.group_id] += 1
+    else:
+        previous_author_id = instance._loaded_author_id
+        previous_group_id = instance._loaded_group_id
+        authors[previous_author_id] -= 1
+        authors[instance.author_id] += 1
+        groups[previous_group_id] -= 1
+        groups[instance.group_id] += 1
+    update_counts(authors, groups)
+    invalidate_post_pages(instance, previous_author_id, previous_group_id)
+    instance._loaded_author_id = instance.author_id
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def post_deleted(sender, instance, **kwargs):
+    """Уменьшает счётчики постов автора и группы и сбрасывает
+    закэшированные страницы с постом, свежим или архивным."""
+    update_counts(
+        {instance.author_id: -1},
+        {instance.group_id: -1},
+    )
+    invalidate_post_pages(instance)
+
+
+@receiver(post_delete, sender=ArchivedPost)
+def delete_archived_text(sender, instance, **kwargs):
+    """Удаляет из архива текст удалённого архивного поста."""
+    _delete_texts([instance])
+
+
+@receiver(pre_save, sender=User)
+def remember_author_names(sender, instance, raw, update_fields, **kwargs):
+    """Запоминает имя автора до сохранения."""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+        AUTHOR_CARD_FIELDS
+    ):
+        return
+    instance._loaded_names = sender.objects.filter(
+        pk=instance.pk
+    ).values_list(*AUTHOR_CARD_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def bump_author_cards(sender, instance, created, raw, **kwargs):
+    """После переименования автора обновляет версии его постов."""
+    if created or raw or not hasattr(instance, '_loaded_names'):
+        return
+    names = tuple(getattr(instance, field) for field in AUTHOR_CARD_FIELDS)
+    if names != instance._loaded_names:
+        bump_post_versions(author=instance)
+        invalidate_author_pages(instance, instance._loaded_names[0])
+    del instance._loaded_names
+
+
+@receiver(post_save, sender=Group)
+def bump_group_cards(sender, instance, created, raw, **kwargs):
+    """После переименования группы обновляет версии её постов."""
+    if created or raw:
+        return
+    names = (instance.title, instance.slug)
+    loaded_names = getattr(instance, '_loaded_names', None)
+    if names != loaded_names:
+        bump_post_versions(group=instance)
+        scopes = {'index', f'group:{instance.slug}'}
+        if loaded_names is not None:
+            scopes.add(f'group:{loaded_names[1]}')
+        invalidate_pages(scopes)
+    instance._loaded_names = names
+
+
+def _primary_sharded(using):
+    """Изменение в основной базе при шардировании: копии в базах
+    постов изменяются только вслед за ним."""
+    return using == DEFAULT_DB_ALIAS and is_sharded()
+
+
+@receiver(post_save, sender=User)
+def place_author(sender, instance, created, raw, using, **kwargs):
+    """Закрепляет нового автора за базой постов по хешу его id."""
+    if created and not raw and _primary_sharded(using):
+        AuthorShard.objects.create(
+            author=instance, alias=hash_shard(instance.pk)
+        )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Group)
+def copy_reference_row(sender, instance, raw, using, update_fields,
+                       **kwargs):
+    """Копирует пользователя или группу в базы постов."""
+    if raw or not _primary_sharded(using):
+        return
+    if update_fields is not None and not set(update_fields) & set(
+        REFERENCE_FIELDS[sender]
+    ):
+        return
+    copy_references(sender, [instance])
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_posts(sender, instance, using, **kwargs):
+    """Удаляет посты автора из базы постов: каскадное удаление
+    в основной базе их не видит. Посты удаляются с сигналами, чтобы
+    обновились счётчики и кэш."""
+    if not _primary_sharded(using):
+        return
+    alias = author_shard(instance)
+    if alias != DEFAULT_DB_ALIAS:
+        Post.objects.using(alias).filter(author=instance).delete()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Group)
+def delete_reference_row(sender, instance, using, **kwargs):
+    """Удаляет копии пользователя или группы из баз постов."""
+    if not _primary_sharded(using):
+        return
+    for alias in shards():
+        if alias != DEFAULT_DB_ALIAS:
+            sender._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_route(sender, instance, **kwargs):
+    """Удаляет маршрут удалённого поста."""
+    if is_sharded():
+        PostRoute.objects.filter(pk=instance.pk).delete()
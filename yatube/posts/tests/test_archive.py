@@ -0,0 +1,214 @@
+import datetime as dt
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from core.query_budget import QueryBudgetTestMixin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts.archive import (archive_cutoff, archive_path, archive_posts,
+                           read_texts)
+from posts.counters import recount
+from posts.models import ArchivedPost, AuthorStats, Group, Post
+
+User = get_user_model()
+
+
+class ArchiveTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        now = timezone.now()
+        for num in range(12):
+            post = Post.objects.create(
+                author=cls.author, text=f'Пост {num}', group=cls.group
+            )
+            # Половина постов — старше 30 дней.
+            date = now - dt.timedelta(days=(60 if num < 6 else 1), hours=num)
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=date, updated_at=date
+            )
+        cls.feed = list(
+            Post.objects.order_by('-pub_date', 'id').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        patcher = override_settings(
+            POSTS_ARCHIVE_AFTER_DAYS=30,
+            POSTS_ARCHIVE_DIR=tmpdir.name,
+            POSTS_PAGINATION='offset',
+            POSTS_PER_PAGE=4,
+        )
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.assertEqual(archive_posts(archive_cutoff()), 6)
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_archive_posts(self):
+        """Старые посты перенесены в базу месяца публикации,
+        счётчики постов не изменились."""
+        self.assertEqual(Post.objects.count(), 6)
+        archived = ArchivedPost.objects.order_by('pk')
+        self.assertEqual(len(archived), 6)
+        self.assertEqual(archived[0].text, 'Пост 0')
+        self.assertTrue(os.path.exists(archive_path(
+            archived[0].pub_date.strftime('%Y-%m')
+        )))
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 12
+        )
+        recount()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 12)
+
+    def assertFeedPages(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('test-slug',)),
+            reverse('posts:profile', args=('auth',)),
+        )
+        for url in urls:
+            for page in range(1, 4):
+                with self.subTest(url=url, page=page):
+                    response = self.assertWithinQueryBudget(
+                        self.client, f'{url}?page={page}'
+                    )
+                    self.assertEqual(
+                        [post.pk for post in response.context['page_obj']],
+                        self.feed[(page - 1) * 4:page * 4],
+                    )
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+    def test_delete_archived_posts(self):
+        """Удаление архивного поста, в том числе вместе с автором,
+        уменьшает счётчики и удаляет его текст из архива."""
+        post = ArchivedPost.objects.order_by('pk').first()
+        post.delete()
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 11
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 11)
+        self.assertEqual(read_texts([post]), {})
+        other = User.objects.create_user(username='other')
+        Post.objects.filter(pk__in=self.feed[:3]).update(author=other)
+        ArchivedPost.objects.filter(pk__in=self.feed[-3:]).update(
+            author=other
+        )
+        recount()
+        archived = list(ArchivedPost.objects.filter(author=other))
+        other_pk = other.pk
+        other.delete()
+        self.assertFalse(
+            ArchivedPost.objects.filter(author_id=other_pk).exists()
+        )
+        self.assertEqual(read_texts(archived), {})
+        self.assertFalse(
+            AuthorStats.objects.filter(author_id=other_pk).exists()
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 5)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 5
+        )
+
+    def test_pages_read_archive(self):
+        """Ленты и страница поста выводят архивные посты вместе
+        со свежими."""
+        self.assertFeedPages()
+        post = ArchivedPost.objects.get(pk=self.feed[-1])
+        response = self.client.get(
+            reverse('posts:profile', args=('auth',)) + '?page=3'
+        )
+        self.assertContains(response, post.text)
+        response = self.assertWithinQueryBudget(
+            self.client, reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, post.text)
+        self.assertEqual(response.context['posts_qty'], 12)
+
+    def test_page_texts_read_at_once(self):
+        """Тексты архивных постов страницы читаются из архива одним
+        вызовом read_texts — и для строк, и для экземпляров моделей."""
+        for rows in (True, False):
+            with self.subTest(rows=rows), override_settings(
+                POSTS_FEED_ROWS=rows
+            ), mock.patch(
+                'posts.archive.read_texts', wraps=read_texts
+            ) as read:
+                response = self.client.get(
+                    reverse('posts:index') + '?page=3'
+                )
+                self.assertEqual(read.call_count, 1)
+                self.assertEqual(len(read.call_args[0][0]), 4)
+                for post in response.context['page_obj']:
+                    self.assertContains(response, post.text)
+                self.assertEqual(read.call_count, 1)
+
+    def test_pages_with_restored_posts(self):
+        """Возвращённые из архива посты, которые старше архивных,
+        выводятся на своих местах в лентах."""
+        call_command(
+            'restore_posts', '--post', str(self.feed[-1]),
+            '--post', str(self.feed[-4]), stdout=StringIO(),
+        )
+        self.assertFeedPages()
+
+    def test_edit_restores_post(self):
+        """Редактирование архивного поста возвращает его из архива."""
+        post = ArchivedPost.objects.first()
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Новый текст', 'group': self.group.pk},
+        )
+        self.assertFalse(ArchivedPost.objects.filter(pk=post.pk).exists())
+        restored = Post.objects.get(pk=post.pk)
+        self.assertEqual(restored.text, 'Новый текст')
+        self.assertEqual(restored.pub_date, post.pub_date)
+
+    def test_edit_form_keeps_post_archived(self):
+        """Форма редактирования и неверная правка архивного поста
+        не возвращают его из архива."""
+        post = ArchivedPost.objects.first()
+        url = reverse('posts:post_edit', args=(post.pk,))
+        response = self.assertWithinQueryBudget(self.client, url)
+        self.assertEqual(
+            response.context['form'].initial,
+            {'text': post.text, 'group': self.group.pk},
+        )
+        response = self.client.post(url, {'text': ''})
+        self.assertTrue(response.context['form'].errors)
+        self.assertTrue(ArchivedPost.objects.filter(pk=post.pk).exists())
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_restore_posts_command(self):
+        """restore_posts возвращает посты с их id и датами."""
+        dates = dict(ArchivedPost.objects.values_list('pk', 'pub_date'))
+        out = StringIO()
+        call_command('restore_posts', '--all', stdout=out)
+        self.assertIn('Возвращено из архива постов: 6', out.getvalue())
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertEqual(
+            dict(Post.objects.filter(pk__in=dates).values_list(
+                'pk', 'pub_date'
+            )),
+            dates,
+        )
+        self.assertEqual(
+            Post.objects.get(pk=min(dates)).text, 'Пост 0'
+        )
@@ -0,0 +1,192 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.cache import page_cache_stats
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_warm_page_uses_one_cache_round_trip(self):
+        """Прогретая страница берёт карточки одним get_many
+        и ничего не отрисовывает заново."""
+        self.guest_client.get(reverse('posts:index'))
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many, mock.patch.object(cache, 'set_many') as set_many:
+            response = self.guest_client.get(reverse('posts:index'))
+        get_many.assert_called_once()
+        set_many.assert_not_called()
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_post_edit_refreshes_card(self):
+        """После редактирования поста выводится новый текст."""
+        self.guest_client.get(reverse('posts:index'))
+        self.author_client.post(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            data={'text': 'Отредактированный пост', 'group': self.group.id},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отредактированный пост')
+
+    def test_group_rename_refreshes_cards(self):
+        """После переименования группы карточки выводят новое название."""
+        self.guest_client.get(reverse('posts:index'))
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'все записи группы: Новое название')
+
+    def test_author_rename_refreshes_cards(self):
+        """После переименования автора карточки выводят новое имя."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        self.guest_client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Другое'
+        user.save()
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Другое Фамилия')
+
+    def test_unrelated_user_save_keeps_versions(self):
+        """Сохранение автора без смены имени не сбрасывает карточки."""
+        self.author_client.get(reverse('posts:index'))
+        user = User.objects.get(pk=self.user.pk)
+        user.email = 'auth@example.com'
+        user.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 1)
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other_user = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        cls.index_url = reverse('posts:index')
+        cls.group_url = reverse('posts:group_list', args=('test-slug',))
+        cls.other_group_url = reverse(
+            'posts:group_list', args=('other-slug',)
+        )
+        cls.profile_url = reverse('posts:profile', args=('auth',))
+        cls.other_profile_url = reverse('posts:profile', args=('other',))
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def warm_up(self, *urls):
+        for url in urls:
+            self.guest_client.get(url)
+
+    def assertCacheResult(self, url, result):
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], result, url)
+        return response
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторный запрос анонимного пользователя не выполняет
+        SQL-запросов."""
+        self.warm_up(self.index_url)
+        with self.assertNumQueries(0):
+            response = self.assertCacheResult(self.index_url, 'hit')
+        self.assertContains(response, 'Тестовый пост')
+        self.assertEqual(page_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_cursor_pages_cached_separately(self):
+        """Страницы с разными курсорами кэшируются отдельно."""
+        self.warm_up(self.index_url)
+        self.assertCacheResult(self.index_url + '?after=abc', 'miss')
+
+    def test_authenticated_user_bypasses_cache(self):
+        """Авторизованный пользователь получает страницу без кэша."""
+        self.warm_up(self.index_url)
+        response = self.author_client.get(self.index_url)
+        self.assertNotIn('X-Page-Cache', response)
+
+    def test_new_post_invalidates_affected_pages_only(self):
+        """Новый пост сбрасывает главную, страницу своей группы
+        и профайл автора, не трогая остальные страницы."""
+        urls = (
+            self.index_url, self.group_url, self.other_group_url,
+            self.profile_url, self.other_profile_url,
+        )
+        self.warm_up(*urls)
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Новый пост', 'group': self.group.id},
+        )
+        for url in (self.index_url, self.group_url, self.profile_url):
+            with self.subTest(url=url):
+                response = self.assertCacheResult(url, 'miss')
+                self.assertContains(response, 'Новый пост')
+        for url in (self.other_group_url, self.other_profile_url):
+            with self.subTest(url=url):
+                self.assertCacheResult(url, 'hit')
+
+    def test_moved_post_invalidates_previous_pages(self):
+        """Перенос поста сбрасывает страницы прежней группы и автора."""
+        self.warm_up(self.group_url, self.profile_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.author = self.other_user
+        post.save()
+        self.assertCacheResult(self.group_url, 'miss')
+        self.assertCacheResult(self.profile_url, 'miss')
+
+    def test_deleted_post_invalidates_pages(self):
+        """Удаление поста сбрасывает страницы, где он выводился."""
+        self.warm_up(self.index_url, self.group_url, self.profile_url)
+        Post.objects.get(pk=self.post.pk).delete()
+        for url in (self.index_url, self.group_url, self.profile_url):
+            with self.subTest(url=url):
+                response = self.assertCacheResult(url, 'miss')
+                self.assertNotContains(response, 'Тестовый пост')
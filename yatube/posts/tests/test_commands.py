@@ -0,0 +1,339 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from posts.columnar import read_columnar
+from posts.models import AuthorStats, Group, Post
+
+User = get_user_model()
+
+
+class ExplainFeedsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def test_feed_queries_use_feed_indexes(self):
+        """Запросы лент читают составные индексы и не сортируют
+        строки во временном B-дереве."""
+        out = StringIO()
+        call_command(
+            'explain_feeds', '--check', '--group', 'test-slug',
+            '--author', 'auth', stdout=out,
+        )
+        plan = out.getvalue()
+        self.assertNotIn('TEMP B-TREE', plan)
+        for index in (
+            'post_feed_idx', 'post_group_feed_idx', 'post_author_feed_idx'
+        ):
+            with self.subTest(index=index):
+                self.assertIn(f'USING INDEX {index}', plan)
+
+
+class ImportPostsCommandTests(TestCase):
+    ROWS = [
+        {'type': 'user', 'username': 'auth', 'first_name': 'Имя'},
+        {'type': 'group', 'slug': 'test-slug', 'title': 'Группа'},
+        {'author': 'auth', 'group': 'test-slug', 'text': 'Пост 1',
+         'pub_date': '2020-01-01T10:00:00+00:00'},
+        {'author': 'auth', 'text': 'Пост 2'},
+        {'author': 'nobody', 'text': 'Пост 3'},
+        {'author': 'auth', 'group': 'test-slug', 'text': 'Пост 4'},
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        return path
+
+    def jsonl(self, rows):
+        return '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows)
+
+    def import_posts(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_posts', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_jsonl(self):
+        """Пользователи, группы и посты загружаются пачками,
+        счётчики и даты постов заполняются."""
+        path = self.write_file('posts.jsonl', self.jsonl(self.ROWS))
+        out, err = self.import_posts(path, '--batch-size', '2')
+        self.assertIn('постов — 3', out)
+        self.assertIn('Строка 5: автор nobody не найден', err)
+        author = User.objects.get(username='auth')
+        self.assertEqual(author.first_name, 'Имя')
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(
+            AuthorStats.objects.get(author=author).posts_count, 3
+        )
+        group = Group.objects.get(slug='test-slug')
+        self.assertEqual(group.posts_count, 2)
+        post = Post.objects.get(text='Пост 1')
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.group, group)
+
+    def test_import_csv_from_stdin(self):
+        """CSV читается из стандартного ввода."""
+        User.objects.create_user(username='auth')
+        content = 'author,text,group\nauth,Пост 1,\nauth,"Пост, 2",\n'
+        with mock.patch('sys.stdin', StringIO(content)):
+            out, _ = self.import_posts('--format', 'csv')
+        self.assertIn('постов — 2', out)
+        self.assertTrue(Post.objects.filter(text='Пост, 2').exists())
+
+    def test_resume_from_checkpoint(self):
+        """Импорт продолжается со строки после сохранённой
+        в контрольной точке."""
+        path = self.write_file('posts.jsonl', self.jsonl(self.ROWS))
+        checkpoint = os.path.join(self.tmpdir.name, 'checkpoint')
+        with open(checkpoint, 'w') as stream:
+            stream.write('3')
+        User.objects.create_user(username='auth')
+        Group.objects.create(title='Группа', slug='test-slug')
+        self.import_posts(path, '--checkpoint', checkpoint)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост 2', 'Пост 4'],
+        )
+        with open(checkpoint) as stream:
+            self.assertEqual(stream.read(), '6')
+
+    def test_invalid_rows_reported(self):
+        """Некорректные строки пропускаются с сообщением об ошибке."""
+        path = self.write_file(
+            'posts.jsonl', '{"type": "user"}\nnot json\n[]\n\n'
+        )
+        out, err = self.import_posts(path)
+        self.assertIn('ошибок — 3', out)
+        self.assertIn('Строка 2: некорректный JSON', err)
+
+
+class ExportPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for num in range(7):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Пост {num}\nвторая строка',
+                group=cls.group if num % 2 else None,
+            )
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def export_posts(self, name, *args):
+        path = os.path.join(self.tmpdir.name, name)
+        out = StringIO()
+        call_command(
+            'export_posts', path, '--chunk-size', '3', *args, stdout=out
+        )
+        return path, out.getvalue()
+
+    def read_jsonl(self, path):
+        with open(path, encoding='utf-8') as stream:
+            return [json.loads(line) for line in stream]
+
+    def test_export_jsonl(self):
+        """Выгрузка JSONL содержит все посты с автором и группой."""
+        path, out = self.export_posts('posts.jsonl')
+        rows = self.read_jsonl(path)
+        self.assertIn('Выгружено постов: 7', out)
+        self.assertEqual(
+            [row['id'] for row in rows],
+            sorted(Post.objects.values_list('id', flat=True)),
+        )
+        self.assertEqual(rows[1]['group'], 'test-slug')
+        self.assertEqual(rows[1]['author'], 'auth')
+        self.assertIsNone(rows[0]['group'])
+
+    def test_export_csv(self):
+        """Выгрузка CSV начинается с заголовка."""
+        path, _ = self.export_posts('posts.csv', '--format', 'csv')
+        with open(path, encoding='utf-8', newline='') as stream:
+            rows = list(csv.DictReader(stream))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['text'], 'Пост 0\nвторая строка')
+
+    def test_export_columnar_round_trip(self):
+        """Колоночный файл читается обратно без потерь."""
+        path, _ = self.export_posts('posts.bin', '--format', 'columnar')
+        with open(path, 'rb') as stream:
+            rows = list(read_columnar(stream))
+        expected = Post.objects.order_by('id').values_list(
+            'id', 'pub_date', 'author__username', 'group__slug', 'text'
+        )
+        self.assertEqual(
+            [tuple(row.values()) for row in rows], list(expected)
+        )
+
+    def test_incremental_export(self):
+        """--since выгружает только посты позже ключа предыдущей
+        выгрузки."""
+        _, out = self.export_posts('first.jsonl')
+        since = out.split('--since ')[1].strip()
+        new_post = Post.objects.create(author=self.user, text='Новый пост')
+        path, out = self.export_posts('second.jsonl', '--since', since)
+        self.assertEqual(
+            [row['id'] for row in self.read_jsonl(path)], [new_post.id]
+        )
+
+    def test_sharded_export(self):
+        """Части выгрузки покрывают все посты без повторов."""
+        self.export_posts('posts.jsonl', '--shards', '3')
+        ids = []
+        for shard in range(3):
+            ids += [
+                row['id'] for row in self.read_jsonl(
+                    os.path.join(self.tmpdir.name, f'posts.{shard}.jsonl')
+                )
+            ]
+        self.assertEqual(
+            ids, sorted(Post.objects.values_list('id', flat=True))
+        )
+
+
+class SeedLoadCommandTests(TestCase):
+    def test_seed_load(self):
+        """seed_load создаёт заданное число объектов и счётчики постов;
+        посты распределены по авторам неравномерно."""
+        call_command(
+            'seed_load', '--users', '5', '--groups', '2', '--posts', '60',
+            '--skew', '2', '--seed', '1', '--batch-size', '25',
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 60)
+        counts = sorted(
+            AuthorStats.objects.values_list('posts_count', flat=True)
+        )
+        self.assertEqual(sum(counts), 60)
+        self.assertGreater(counts[-1], 60 // 5)
+        self.assertEqual(
+            sum(Group.objects.values_list('posts_count', flat=True)),
+            Post.objects.exclude(group=None).count(),
+        )
+
+
+class BenchmarkUrlsCommandTests(TestCase):
+    def test_benchmark_urls(self):
+        """benchmark_urls измеряет все маршруты сайта, сохраняет
+        результаты в JSON и не меняет данные."""
+        call_command(
+            'seed_load', '--users', '3', '--groups', '2', '--posts', '30',
+            '--seed', '1', stdout=StringIO(),
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'benchmark.json')
+            call_command(
+                'benchmark_urls', '--repeat', '2', '--output', path,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+            with open(path, encoding='utf-8') as stream:
+                report = json.load(stream)
+            out = StringIO()
+            call_command(
+                'benchmark_urls', '--repeat', '1', '--filter', 'posts:index',
+                '--compare', path, stdout=out, stderr=StringIO(),
+            )
+        self.assertIn('Сравнение с', out.getvalue())
+        self.assertIn('p95', out.getvalue().split('Сравнение с')[1])
+        results = {
+            (result['method'], result['name']): result
+            for result in report['results']
+        }
+        for key in (
+            ('GET', 'posts:index'),
+            ('GET', 'posts:post_edit'),
+            ('GET', 'users:login'),
+            ('GET', 'api:post_list'),
+            ('POST', 'posts:post_create'),
+            ('POST', 'api:post_batch'),
+        ):
+            with self.subTest(route=key):
+                self.assertIn(key, results)
+                self.assertLess(results[key]['status'], 400)
+                self.assertLessEqual(
+                    results[key]['p50_ms'], results[key]['p99_ms']
+                )
+        self.assertFalse(any(name.startswith('admin:') for _, name in results))
+        self.assertEqual(report['dataset']['posts'], 30)
+        self.assertEqual(Post.objects.count(), 30)
+
+
+class BenchmarkWritesCommandTests(TestCase):
+    def test_requires_file_database(self):
+        """benchmark_writes отказывается работать с базой в памяти:
+        потоки замера не увидели бы её."""
+        with self.assertRaisesMessage(CommandError, 'Нужна база в файле'):
+            call_command('benchmark_writes', stdout=StringIO())
+
+
+class BenchmarkRowsCommandTests(TestCase):
+    def test_benchmark_rows(self):
+        """benchmark_rows измеряет ленты в обоих режимах на страницах
+        заданного размера."""
+        call_command(
+            'seed_load', '--users', '3', '--groups', '2', '--posts', '30',
+            '--seed', '1', stdout=StringIO(),
+        )
+        out = StringIO()
+        call_command(
+            'benchmark_rows', '--page-size', '20', '--repeat', '1',
+            stdout=out, stderr=StringIO(),
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 8)
+        for line in lines:
+            with self.subTest(line=line):
+                self.assertTrue(line.startswith(('models', 'rows')))
+                self.assertNotIn(' 500 ', line)
+        self.assertIn('постов    20', lines[0])
+
+
+class RenderPostsCommandTests(TestCase):
+    def test_render_posts(self):
+        """render_posts отрисовывает посты, изменённые в обход
+        Post.save."""
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=user, text='Пост')
+        Post.objects.filter(pk=post.pk).update(
+            text='Строка 1\nСтрока 2', text_html='', excerpt=''
+        )
+        out = StringIO()
+        call_command('render_posts', '--batch-size', '1', stdout=out)
+        self.assertIn('Отрисовано постов: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'Строка 1<br>Строка 2')
+        self.assertEqual(post.excerpt, 'Строка 1\nСтрока 2')
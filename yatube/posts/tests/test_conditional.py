@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('test-slug',)),
+            reverse('posts:profile', args=('auth',)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def get_etag(self, url, client=None):
+        response = (client or self.guest_client).get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        return response['ETag']
+
+    def assertStatusWithETag(self, url, etag, status_code):
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status_code, url)
+
+    def test_unchanged_pages_not_modified(self):
+        """Неизменённые страницы отдаются ответом 304 без шаблонов."""
+        url_detail = reverse('posts:post_detail', args=(self.post.pk,))
+        for url in self.urls + (url_detail,):
+            with self.subTest(url=url):
+                etag = self.get_etag(url)
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+
+    def test_post_edit_changes_etag(self):
+        """Редактирование поста меняет ETag страниц, где он выводится."""
+        etags = {url: self.get_etag(url) for url in self.urls}
+        self.author_client.post(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            data={'text': 'Отредактированный пост', 'group': self.group.id},
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertStatusWithETag(url, etag, 200)
+
+    def test_author_rename_changes_etag(self):
+        """Переименование автора меняет ETag страниц с его постами."""
+        etags = {url: self.get_etag(url) for url in self.urls}
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Имя'
+        user.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertStatusWithETag(url, etag, 200)
+
+    def test_group_description_changes_etag(self):
+        """Изменение описания группы меняет ETag её страницы."""
+        url = reverse('posts:group_list', args=('test-slug',))
+        etag = self.get_etag(url)
+        Group.objects.filter(pk=self.group.pk).update(
+            description='Новое описание'
+        )
+        self.assertStatusWithETag(url, etag, 200)
+
+    def test_post_delete_changes_page(self):
+        """Удаление поста меняет ETag; If-Modified-Since не даёт ответа
+        304: Last-Modified страниц не отдаётся."""
+        other = Post.objects.create(
+            author=self.user, text='Другой пост', group=self.group
+        )
+        etags = {url: self.get_etag(url) for url in self.urls}
+        other.delete()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertStatusWithETag(url, etag, 200)
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date()
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Страница авторизованного пользователя имеет свой ETag."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(
+                    self.get_etag(url),
+                    self.get_etag(url, self.author_client),
+                )
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+    def test_cached_page_not_modified(self):
+        """Попадание в кэш страниц тоже завершается ответом 304."""
+        url = reverse('posts:index')
+        etag = self.get_etag(url)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(response['ETag'], etag)
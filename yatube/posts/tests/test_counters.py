@@ -0,0 +1,115 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import AuthorStats, Group, Post
+
+User = get_user_model()
+
+
+class PostCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other_user = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+
+    def assertCounts(self, user, group, other_user, other_group):
+        counts = {
+            'user': AuthorStats.objects.get(author=self.user).posts_count,
+            'group': Group.objects.get(pk=self.group.pk).posts_count,
+            'other_user': AuthorStats.objects.get(
+                author=self.other_user
+            ).posts_count,
+            'other_group': Group.objects.get(
+                pk=self.other_group.pk
+            ).posts_count,
+        }
+        self.assertEqual(counts, {
+            'user': user,
+            'group': group,
+            'other_user': other_user,
+            'other_group': other_group,
+        })
+
+    def test_create_increments_counters(self):
+        """Создание поста увеличивает счётчики автора и группы."""
+        self.assertCounts(1, 1, 0, 0)
+        Post.objects.create(author=self.user, text='Ещё пост')
+        self.assertCounts(2, 1, 0, 0)
+
+    def test_reassign_moves_post_between_counters(self):
+        """Смена автора и группы переносит пост между счётчиками."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.author = self.other_user
+        post.group = self.other_group
+        post.save()
+        self.assertCounts(0, 0, 1, 1)
+        post.group = None
+        post.save()
+        self.assertCounts(0, 0, 1, 0)
+
+    def test_reassign_instance_not_loaded_from_db(self):
+        """Перенос учитывается и для поста, созданного не из базы."""
+        post = Post(
+            pk=self.post.pk,
+            author=self.other_user,
+            text='Тестовый пост',
+            pub_date=self.post.pub_date,
+        )
+        post.save()
+        self.assertCounts(0, 0, 1, 0)
+
+    def test_delete_decrements_counters(self):
+        """Удаление поста уменьшает счётчики автора и группы."""
+        self.post.delete()
+        self.assertCounts(0, 0, 0, 0)
+
+    def test_edit_via_form_moves_post(self):
+        """Смена группы в форме редактирования обновляет счётчики."""
+        client = Client()
+        client.force_login(self.user)
+        client.post(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            data={'text': 'Новый текст', 'group': self.other_group.id},
+        )
+        self.assertCounts(1, 0, 0, 1)
+
+    def test_recount_command_repairs_counters(self):
+        """Команда recount_posts восстанавливает счётчики."""
+        Post.objects.update(author=self.other_user, group=self.other_group)
+        AuthorStats.objects.filter(author=self.user).delete()
+        call_command('recount_posts', stdout=StringIO())
+        self.assertCounts(0, 0, 1, 1)
+
+    def test_views_read_counters(self):
+        """Страницы профайла и поста выводят значение счётчика."""
+        AuthorStats.objects.filter(author=self.user).update(posts_count=42)
+        client = Client()
+        response = client.get(
+            reverse('posts:profile', kwargs={'username': 'auth'})
+        )
+        self.assertEqual(response.context['posts_qty'], 42)
+        response = client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
+        self.assertEqual(response.context['posts_qty'], 42)
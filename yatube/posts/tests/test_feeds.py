@@ -0,0 +1,137 @@
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for num in range(5):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {num}',
+                group=cls.group if num % 2 else None,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_feed(self, url, **params):
+        response = self.guest_client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        root = ElementTree.fromstring(b''.join(response.streaming_content))
+        return response, root
+
+    def test_feeds_available(self):
+        """Ленты Atom и RSS доступны для главной, группы и автора."""
+        feeds = {
+            reverse('posts:index_feed', args=('atom',)): 5,
+            reverse('posts:group_feed', args=('test-slug', 'rss')): 2,
+            reverse('posts:profile_feed', args=('auth', 'atom')): 5,
+        }
+        for url, count in feeds.items():
+            with self.subTest(url=url):
+                response, root = self.get_feed(url)
+                entries = root.findall(f'{ATOM}entry') or root.findall(
+                    'channel/item'
+                )
+                self.assertEqual(len(entries), count)
+                self.assertIn('ETag', response)
+                self.assertNotIn('Last-Modified', response)
+
+    def test_unknown_feed_type_not_found(self):
+        """Неизвестный формат ленты возвращает 404."""
+        response = self.guest_client.get(
+            reverse('posts:index_feed', args=('json',))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_atom_entry_content(self):
+        """Запись ленты содержит текст, автора и ссылку на пост."""
+        post = Post.objects.first()
+        _, root = self.get_feed(
+            reverse('posts:index_feed', args=('atom',)), limit=1
+        )
+        entry = root.find(f'{ATOM}entry')
+        self.assertEqual(entry.find(f'{ATOM}summary').text, post.text)
+        self.assertEqual(
+            entry.find(f'{ATOM}author/{ATOM}name').text, 'Имя Фамилия'
+        )
+        self.assertTrue(entry.find(f'{ATOM}link').get('href').endswith(
+            reverse('posts:post_detail', args=(post.pk,))
+        ))
+
+    def test_entry_shows_excerpt(self):
+        """Запись ленты длинного поста содержит отрывок; текст поста
+        лента не читает."""
+        post = Post.objects.create(author=self.user, text='Слово ' * 100)
+        _, root = self.get_feed(
+            reverse('posts:index_feed', args=('atom',)), limit=1
+        )
+        entry = root.find(f'{ATOM}entry')
+        self.assertEqual(entry.find(f'{ATOM}summary').text, post.excerpt)
+        self.assertLess(len(post.excerpt), len(post.text))
+        self.assertLessEqual(
+            {'text', 'text_html'},
+            Post.objects.feed(excerpt=True).first().get_deferred_fields(),
+        )
+
+    def test_limit_and_cursor_continuation(self):
+        """?limit= ограничивает ленту, ссылка rel=next продолжает её
+        со следующей записи."""
+        url = reverse('posts:index_feed', args=('atom',))
+        texts = []
+        params = {'limit': 2}
+        while True:
+            _, root = self.get_feed(url, **params)
+            texts += [
+                entry.find(f'{ATOM}summary').text
+                for entry in root.findall(f'{ATOM}entry')
+            ]
+            next_link = root.find(f"{ATOM}link[@rel='next']")
+            if next_link is None:
+                break
+            url = next_link.get('href')
+            params = {}
+        self.assertEqual(
+            texts, list(Post.objects.values_list('text', flat=True))
+        )
+
+    def test_feed_not_modified(self):
+        """Неизменённая лента отдаётся ответом 304, новая запись
+        меняет ETag."""
+        url = reverse('posts:profile_feed', args=('auth', 'rss'))
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_feed_ignores_session(self):
+        """Лента не зависит от пользователя: для авторизованного
+        клиента сессия не читается и ETag тот же."""
+        url = reverse('posts:index_feed', args=('atom',))
+        etag = self.guest_client.get(url)['ETag']
+        author_client = Client()
+        author_client.force_login(self.user)
+        with self.assertNumQueries(1):
+            response = author_client.get(url)
+        self.assertEqual(response['ETag'], etag)
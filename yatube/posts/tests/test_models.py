@@ -1,7 +1,15 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
 
+from ..bulk import bulk_create_posts, insert_posts
 from ..models import Group, Post
+from ..rendering import EXCERPT_LENGTH
+from ..search import search_posts
 
 User = get_user_model()
 
@@ -27,6 +35,47 @@ class PostModelTest(TestCase):
         expected_object_name = post.text[:15]
         self.assertEqual(expected_object_name, str(post))
 
+    def test_text_rendered_on_save(self):
+        """При сохранении поста отрисовываются его HTML и отрывок."""
+        post = Post.objects.create(
+            author=self.user, text='<b>Строка</b>\n' + 'слово ' * 100
+        )
+        post = Post.objects.get(pk=post.pk)
+        self.assertTrue(post.text_html.startswith(
+            '&lt;b&gt;Строка&lt;/b&gt;<br>слово '
+        ))
+        self.assertEqual(len(post.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(post.excerpt.endswith('…'))
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.text_html, post.excerpt), ('Новый текст', 'Новый текст')
+        )
+
+    def test_insert_posts_keeps_dates(self):
+        """insert_posts сохраняет даты постов как заданы, а посты,
+        сохраняемые обычным образом, получают текущие даты."""
+        date = timezone.now() - timedelta(days=400)
+        posts = [
+            Post(author=self.user, text=f'Пост {num}', pub_date=date,
+                 updated_at=date)
+            for num in range(3)
+        ]
+        insert_posts(posts)
+        self.assertEqual(
+            set(Post.objects.filter(text__startswith='Пост ').values_list(
+                'pub_date', 'updated_at'
+            )),
+            {(date, date)},
+        )
+        post = Post.objects.create(
+            author=self.user, text='Новый пост', pub_date=date,
+            updated_at=date,
+        )
+        self.assertGreater(post.pub_date, date)
+        self.assertGreater(post.updated_at, date)
+
 
 class GroupModelTest(TestCase):
     @classmethod
@@ -48,3 +97,101 @@ class GroupModelTest(TestCase):
         group = GroupModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class CompressedTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='auth', email='auth@example.com', password='pass'
+        )
+        cls.long_text = 'Очень длинный пост про кота. ' * 200
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def stored_type(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT typeof(text) FROM posts_post WHERE id = %s',
+                [post.pk],
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, query):
+        return list(
+            search_posts(Post.objects.all(), query).values_list(
+                'pk', flat=True
+            )
+        )
+
+    def test_long_text_stored_compressed(self):
+        """Длинный текст хранится сжатым, короткий — как есть;
+        читаются оба без изменений."""
+        long_post = Post.objects.create(author=self.user, text=self.long_text)
+        short_post = Post.objects.create(author=self.user, text='Кот')
+        self.assertEqual(self.stored_type(long_post), 'blob')
+        self.assertEqual(self.stored_type(short_post), 'text')
+        self.assertEqual(
+            Post.objects.get(pk=long_post.pk).text, self.long_text
+        )
+        self.assertEqual(
+            Post.objects.filter(pk=long_post.pk).values_list(
+                'text', flat=True
+            ).get(),
+            self.long_text,
+        )
+
+    def test_bulk_created_text_stored_compressed(self):
+        """Посты, созданные пачкой, тоже хранят длинный текст сжатым."""
+        post, = bulk_create_posts(
+            [Post(author=self.user, text=self.long_text)]
+        )
+        self.assertEqual(self.stored_type(post), 'blob')
+        self.assertEqual(
+            Post.objects.filter(pk=post.pk).values_list(
+                'text', flat=True
+            ).get(),
+            self.long_text,
+        )
+
+    def test_updated_text_stored_compressed(self):
+        """QuerySet.update тоже записывает длинный текст сжатым."""
+        post = Post.objects.create(author=self.user, text='Кот')
+        Post.objects.filter(pk=post.pk).update(text=self.long_text)
+        self.assertEqual(self.stored_type(post), 'blob')
+        post.refresh_from_db()
+        self.assertEqual(post.text, self.long_text)
+
+    def test_search_indexes_compressed_text(self):
+        """Полнотекстовый индекс получает распакованный текст при
+        создании, изменении и удалении поста."""
+        post = Post.objects.create(author=self.user, text=self.long_text)
+        self.assertEqual(self.search('кота'), [post.pk])
+        Post.objects.filter(pk=post.pk).update(
+            text=self.long_text.replace('кота', 'пса')
+        )
+        self.assertEqual(self.search('кота'), [])
+        self.assertEqual(self.search('пса'), [post.pk])
+        post.delete()
+        self.assertEqual(self.search('пса'), [])
+
+    def test_form_and_admin(self):
+        """Длинный пост создаётся формой, редактируется в админке."""
+        self.client.post(
+            reverse('posts:post_create'), {'text': self.long_text}
+        )
+        post = Post.objects.get(author=self.user)
+        self.assertEqual(self.stored_type(post), 'blob')
+        url = reverse('admin:posts_post_change', args=(post.pk,))
+        response = self.client.get(url)
+        self.assertContains(response, 'Очень длинный пост про кота.')
+        self.client.post(url, {
+            'text': self.long_text + 'Конец.',
+            'author': self.user.pk,
+            'group': '',
+        })
+        post.refresh_from_db()
+        self.assertEqual(post.text, self.long_text + 'Конец.')
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Group, Post
+from posts.paginators import CursorPaginator, OffsetPaginator, paginate
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for num in range(13):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {num}',
+                group=cls.group,
+            )
+        # Половина постов с одинаковой датой: порядок задаёт id.
+        same_date_ids = Post.objects.all()[:6].values('pk')
+        Post.objects.filter(pk__in=same_date_ids).update(
+            pub_date=timezone.now()
+        )
+        cls.factory = RequestFactory()
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_paginator(self):
+        return CursorPaginator(Post.objects.all(), 5)
+
+    def walk_forward(self):
+        paginator = self.get_paginator()
+        page = paginator.get_page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_pages_cover_feed_in_order(self):
+        """Курсорные страницы покрывают ленту без пропусков и повторов."""
+        pages = self.walk_forward()
+        ids = [post.id for page in pages for post in page]
+        expected = list(
+            Post.objects.order_by('-pub_date', 'id').values_list(
+                'id', flat=True
+            )
+        )
+        self.assertEqual([len(page) for page in pages], [5, 5, 3])
+        self.assertEqual(ids, expected)
+
+    def test_before_cursor_returns_previous_page(self):
+        """Курсор before возвращает предыдущую страницу."""
+        paginator = self.get_paginator()
+        first, second, third = self.walk_forward()
+        page = paginator.get_page(before=third.previous_cursor)
+        self.assertEqual(list(page), list(second))
+        page = paginator.get_page(before=page.previous_cursor)
+        self.assertEqual(list(page), list(first))
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор приводит к первой странице."""
+        paginator = self.get_paginator()
+        for cursor in ('', 'garbage', 'WzFd'):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(after=cursor)
+                self.assertEqual(list(page), list(paginator.get_page()))
+                self.assertFalse(page.has_previous())
+
+    def test_cursor_page_skips_count(self):
+        """Курсорная страница строится одним запросом без COUNT(*)."""
+        paginator = self.get_paginator()
+        cursor = paginator.get_page().next_cursor
+        with self.assertNumQueries(1):
+            page = paginator.get_page(after=cursor)
+            page.has_next()
+            page.next_query
+
+    def test_feeds_follow_next_cursor(self):
+        """Ссылка «Следующая» на страницах лент ведёт на вторую
+        страницу с тремя постами."""
+        reverse_names = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'})
+        )
+        for reverse_name in reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                response = self.guest_client.get(reverse_name)
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), 10)
+                response = self.guest_client.get(
+                    f'{reverse_name}?{page_obj.next_query}'
+                )
+                self.assertEqual(len(response.context['page_obj']), 3)
+
+    @override_settings(POSTS_PAGINATION='offset')
+    def test_offset_mode_switch(self):
+        """В режиме 'offset' используется постраничный пагинатор."""
+        request = self.factory.get('/')
+        page = paginate(request, Post.objects.all())
+        self.assertIsInstance(page.paginator, OffsetPaginator)
+
+    def test_legacy_page_param_keeps_working(self):
+        """Параметр ?page=N обслуживается постраничным пагинатором."""
+        request = self.factory.get('/', {'page': 2})
+        page = paginate(request, Post.objects.all())
+        self.assertIsInstance(page.paginator, OffsetPaginator)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 3)
+
+
+class OffsetPaginatorTests(TestCase):
+    @override_settings(POSTS_PAGE_WINDOW=2)
+    def test_page_links_are_windowed(self):
+        """Ссылки на страницы выводятся окном вокруг текущей."""
+        paginator = OffsetPaginator(
+            list(range(1000)), 10, query=RequestFactory().get('/').GET
+        )
+        page = paginator.page(50)
+        numbers = [number for number, _ in page.page_links]
+        self.assertEqual(numbers, [1, None, 48, 49, 50, 51, 52, None, 100])
+        self.assertEqual(page.page_links[0][1], 'page=1')
+
+    def test_page_links_keep_other_params(self):
+        """Строки запроса сохраняют параметры, не связанные
+        с пагинацией."""
+        query = RequestFactory().get('/', {'q': 'test', 'page': 1}).GET
+        page = OffsetPaginator(list(range(30)), 10, query=query).page(1)
+        self.assertEqual(page.next_query, 'q=test&page=2')
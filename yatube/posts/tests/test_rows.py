@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Group, Post
+from posts.rows import AuthorRow, GroupRow, PostRow
+
+User = get_user_model()
+
+
+class PostRowsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост\nс группой', group=cls.group
+        )
+        cls.post_without_group = Post.objects.create(
+            author=cls.user, text='Пост без группы'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_rows(self):
+        """Строки содержат поля, которые выводят карточки ленты."""
+        with self.assertNumQueries(1):
+            rows = {row.pk: row for row in Post.objects.rows()}
+            row = rows[self.post.pk]
+            self.assertIsInstance(row, PostRow)
+            self.assertIsInstance(row.author, AuthorRow)
+            self.assertIsInstance(row.group, GroupRow)
+            self.assertEqual(row.pub_date, self.post.pub_date)
+            self.assertEqual(row.text_html, self.post.text_html)
+            self.assertEqual(row.author.get_full_name(), 'Лев Толстой')
+            self.assertEqual(row.author_id, self.user.pk)
+            self.assertEqual(row.group.slug, 'test-slug')
+            self.assertIsNone(rows[self.post_without_group.pk].group)
+            self.assertIsNone(rows[self.post_without_group.pk].group_id)
+            # Посты одного автора делят строку автора.
+            self.assertIs(row.author, rows[self.post_without_group.pk].author)
+
+    def test_lazy_fields(self):
+        """Прочие поля модели читаются при обращении, остальные
+        атрибуты базу не читают."""
+        row = Post.objects.rows().get(pk=self.post.pk)
+        with self.assertNumQueries(2):
+            self.assertEqual(row.text, self.post.text)
+            self.assertEqual(row.group.description, 'Тестовое описание')
+        with self.assertNumQueries(0):
+            self.assertFalse(hasattr(row, 'get_absolute_url'))
+            self.assertFalse(hasattr(row.author, 'missing'))
+
+    def test_pages_same_as_models(self):
+        """Ленты на строках выводят то же, что на экземплярах моделей."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('test-slug',)),
+            reverse('posts:profile', args=('auth',)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIsInstance(response.context['page_obj'][0], PostRow)
+                cache.clear()
+                with override_settings(POSTS_FEED_ROWS=False):
+                    expected = self.client.get(url)
+                self.assertIsInstance(expected.context['page_obj'][0], Post)
+                self.assertEqual(response.content, expected.content)
@@ -0,0 +1,103 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post
+from posts.search import match_expression, search_posts
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.user, text='Кот спит на диване'),
+            Post(author=cls.user, text='Кот кот кот и собака'),
+            Post(author=cls.user, text='Собака гуляет во дворе'),
+        ])
+        cls.url = reverse('posts:search')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query):
+        return list(
+            search_posts(Post.objects.order_by('rank', 'id'), query)
+            .values_list('text', flat=True)
+        )
+
+    def test_match_expression_quotes_words(self):
+        """Синтаксис FTS5 во вводе пользователя не интерпретируется."""
+        self.assertEqual(match_expression('кот OR "дом*'), '"кот" "OR" "дом"')
+        self.assertEqual(match_expression(' :* '), '')
+
+    def test_results_ranked_by_relevance(self):
+        """Все слова запроса обязательны; чаще упоминающие их записи
+        выводятся выше."""
+        self.assertEqual(
+            self.search('кот'),
+            ['Кот кот кот и собака', 'Кот спит на диване'],
+        )
+        self.assertEqual(self.search('КОТ собака'), ['Кот кот кот и собака'])
+        self.assertEqual(self.search('   '), [])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении записей."""
+        post = Post.objects.create(author=self.user, text='Попугай')
+        self.assertEqual(self.search('попугай'), ['Попугай'])
+        Post.objects.filter(pk=post.pk).update(text='Хомяк')
+        self.assertEqual(self.search('попугай'), [])
+        self.assertEqual(self.search('хомяк'), ['Хомяк'])
+        post.delete()
+        self.assertEqual(self.search('хомяк'), [])
+
+    def test_rebuild_command_restores_index(self):
+        """Команда rebuild_search_index восстанавливает индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO posts_post_fts(posts_post_fts) "
+                "VALUES ('delete-all')"
+            )
+        self.assertEqual(self.search('собака'), [])
+        call_command('rebuild_search_index', '--optimize', stdout=StringIO())
+        self.assertEqual(len(self.search('собака')), 2)
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_search_page_cursor_pagination(self):
+        """Страницы поиска переключаются курсором, сохраняя запрос."""
+        response = self.guest_client.get(self.url, {'q': 'кот'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            page_obj.object_list[0].text, 'Кот кот кот и собака'
+        )
+        self.assertIn('q=', page_obj.next_query)
+        response = self.guest_client.get(f'{self.url}?{page_obj.next_query}')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.object_list[0].text, 'Кот спит на диване')
+        self.assertFalse(page_obj.has_next())
+
+    def test_search_page_empty_query(self):
+        """Пустой запрос выводит форму поиска без результатов."""
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['post_cards'], [])
+
+    def test_admin_changelist_uses_index(self):
+        """Поиск в админке использует полнотекстовый индекс."""
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'дворе'}
+        )
+        changelist = response.context['cl']
+        self.assertEqual(changelist.result_count, 1)
+        self.assertIn('posts_post_fts', str(changelist.queryset.query))
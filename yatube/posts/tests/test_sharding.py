@@ -0,0 +1,301 @@
+import datetime as dt
+import tempfile
+import unittest
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count, Max, Sum
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts.archive import archive_posts, restore_posts
+from posts.counters import author_posts_count
+from posts.management.commands.rebalance_shards import move_author
+from posts.models import (ArchivedPost, AuthorShard, AuthorStats, Group, Post,
+                          PostRoute)
+from posts.sharding import (MergedQuerySet, across_shards, author_shard,
+                            hash_shard, is_sharded)
+
+User = get_user_model()
+
+SHARDED = len(settings.POST_SHARDS) > 1
+
+
+class HashShardTests(SimpleTestCase):
+    @override_settings(POST_SHARDS=['default', 'shard1', 'shard2'])
+    def test_hash_shard(self):
+        """Автор закрепляется за одной из баз, всегда за одной
+        и той же."""
+        aliases = {hash_shard(author_id) for author_id in range(100)}
+        self.assertEqual(aliases, {'default', 'shard1', 'shard2'})
+        self.assertEqual(hash_shard(42), hash_shard(42))
+
+    def test_single_database(self):
+        """С одной базой шардирование отключено."""
+        with override_settings(POST_SHARDS=['default']):
+            self.assertFalse(is_sharded())
+            self.assertEqual(author_shard(1), 'default')
+
+
+@override_settings(POST_SHARDS=['default'])
+class MergedQuerySetTests(TestCase):
+    """Слияние проверяется на запросах к одной базе, разделённых
+    по авторам, как посты разделены по базам."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [
+            User.objects.create_user(username=f'auth{i}') for i in range(3)
+        ]
+        start = timezone.now()
+        for i in range(30):
+            post = Post.objects.create(
+                author=cls.authors[i % 3], text=f'Пост {i}'
+            )
+            # Одинаковые даты у пар постов проверяют порядок по id.
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=start - dt.timedelta(minutes=(i * 7) % 30 // 2)
+            )
+
+    def setUp(self):
+        self.queryset = Post.objects.order_by('-pub_date', 'id')
+        self.merged = MergedQuerySet([
+            self.queryset.filter(author=author) for author in self.authors
+        ])
+
+    def test_slices(self):
+        """Срезы совпадают со срезами запроса к одной базе, в том числе
+        глубокие."""
+        for start, stop in ((0, 10), (5, 15), (20, 30), (25, None)):
+            with self.subTest(start=start, stop=stop):
+                self.assertEqual(
+                    list(self.merged[start:stop]),
+                    list(self.queryset[start:stop]),
+                )
+        self.assertEqual(self.merged[3], self.queryset[3])
+        self.assertEqual(self.merged.first(), self.queryset.first())
+
+    def test_iterator(self):
+        """iterator() сливает потоки баз без кэша результата."""
+        for start, stop in ((0, None), (5, 15)):
+            with self.subTest(start=start, stop=stop):
+                merged = self.merged[start:stop]
+                self.assertEqual(
+                    list(merged.iterator(chunk_size=4)),
+                    list(self.queryset[start:stop]),
+                )
+                self.assertIsNone(merged._result_cache)
+        rows = self.merged.iterator()
+        with self.assertNumQueries(3):
+            next(rows)
+
+    def test_values(self):
+        """Слияние строк values() и values_list() с полями сортировки."""
+        self.assertEqual(
+            list(self.merged.values('id', 'pub_date', 'text')[8:12]),
+            list(self.queryset.values('id', 'pub_date', 'text')[8:12]),
+        )
+        self.assertEqual(
+            list(self.merged.values_list('pk', 'pub_date')[:10]),
+            list(self.queryset.values_list('pk', 'pub_date')[:10]),
+        )
+
+    def test_count_and_aggregate(self):
+        """Число строк и агрегаты по всем базам."""
+        self.assertEqual(self.merged.count(), 30)
+        self.assertEqual(self.merged.filter(text='Пост 1').count(), 1)
+        self.assertTrue(self.merged.exists())
+        aggregates = {
+            'count': Count('pk'),
+            'ids': Sum('pk'),
+            'last': Max('pub_date'),
+        }
+        self.assertEqual(
+            self.merged.aggregate(**aggregates),
+            self.queryset.aggregate(**aggregates),
+        )
+
+    def test_filter_after_slice(self):
+        """Как и QuerySet, срез нельзя фильтровать."""
+        with self.assertRaises(TypeError):
+            self.merged[:10].filter(text='Пост 1')
+
+
+@unittest.skipUnless(
+    SHARDED, 'нужен профиль с несколькими базами: yatube.settings.sharded'
+)
+class ShardedPostsTests(TestCase):
+    databases = set(settings.POST_SHARDS)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.authors = [
+            User.objects.create_user(username=f'auth{i}') for i in range(8)
+        ]
+        self.author = next(
+            author for author in self.authors
+            if author_shard(author.pk) != 'default'
+        )
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def create_post(self, author=None, text='Тестовый пост'):
+        return Post.objects.create(
+            author=author or self.author, text=text, group=self.group
+        )
+
+    def test_new_post_saved_to_author_shard(self):
+        """Пост сохраняется в базу автора с id из общей
+        последовательности; пользователь и группа скопированы в неё."""
+        alias = author_shard(self.author.pk)
+        self.assertEqual(alias, hash_shard(self.author.pk))
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Тестовый пост', 'group': self.group.pk},
+        )
+        post = Post.objects.using(alias).get(author=self.author)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertTrue(PostRoute.objects.filter(pk=post.pk).exists())
+        self.assertTrue(
+            User.objects.using(alias).filter(pk=self.author.pk).exists()
+        )
+        self.assertEqual(
+            Group.objects.using(alias).get(pk=self.group.pk).slug,
+            'test-slug',
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 1
+        )
+
+    def test_pages_read_every_shard(self):
+        """Ленты и страница поста находят посты во всех базах."""
+        posts = [
+            self.create_post(author, f'Пост {author.username}')
+            for author in self.authors
+        ]
+        self.assertGreater(
+            len({post._state.db for post in posts}), 1
+        )
+        self.assertEqual(len({post.pk for post in posts}), len(posts))
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in reversed(posts)],
+        )
+        response = self.client.get(
+            reverse('posts:group_list', args=('test-slug',))
+        )
+        self.assertEqual(len(response.context['page_obj']), len(posts))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(posts[1].pk,))
+        )
+        self.assertEqual(response.context['post'], posts[1])
+        self.assertEqual(response.context['posts_qty'], 1)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertEqual(response.context['posts_qty'], 1)
+
+    def test_edit_and_delete(self):
+        """Пост редактируется в своей базе; удаление автора удаляет его
+        посты из базы постов."""
+        post = self.create_post()
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Новый текст'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertIsNone(post.group)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        alias, author_id = post._state.db, self.author.pk
+        self.author.delete()
+        self.assertFalse(Post.objects.using(alias).exists())
+        self.assertFalse(
+            User.objects.using(alias).filter(pk=author_id).exists()
+        )
+
+    def test_seed_load_places_authors(self):
+        """Пользователи и группы, созданные bulk_create, закрепляются
+        за базами и копируются в базы постов."""
+        call_command(
+            'seed_load', users=8, groups=2, posts=16, seed=1,
+            stdout=StringIO(),
+        )
+        users = User.objects.exclude(
+            pk__in=[author.pk for author in self.authors]
+        )
+        for user in users:
+            alias = AuthorShard.objects.get(author=user).alias
+            self.assertEqual(alias, hash_shard(user.pk))
+            self.assertEqual(
+                Post.objects.using(alias).filter(author=user).count(),
+                author_posts_count(user),
+            )
+        for alias in settings.POST_SHARDS:
+            self.assertEqual(
+                User.objects.using(alias).count(), User.objects.count()
+            )
+            self.assertEqual(
+                Group.objects.using(alias).count(), Group.objects.count()
+            )
+
+    def test_move_author(self):
+        """Перенос автора переносит его посты с id и датами."""
+        post = self.create_post()
+        source = post._state.db
+        target = next(
+            alias for alias in settings.POST_SHARDS if alias != source
+        )
+        self.assertEqual(move_author(self.author.pk, target), 1)
+        self.assertFalse(Post.objects.using(source).exists())
+        moved = Post.objects.using(target).get(pk=post.pk)
+        self.assertEqual(moved.pub_date, post.pub_date)
+        self.assertEqual(
+            AuthorShard.objects.get(author=self.author).alias, target
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertEqual(response.context['post'].text, 'Тестовый пост')
+        self.assertEqual(
+            list(across_shards(Post.objects.all())), [moved]
+        )
+
+    def test_archive(self):
+        """Посты архивируются из всех баз и возвращаются в базу
+        автора."""
+        posts = [self.create_post(author) for author in self.authors]
+        with tempfile.TemporaryDirectory() as tmpdir, override_settings(
+            POSTS_ARCHIVE_AFTER_DAYS=0, POSTS_ARCHIVE_DIR=tmpdir
+        ):
+            self.assertEqual(archive_posts(timezone.now()), len(posts))
+            self.assertFalse(list(across_shards(Post.objects.all())))
+            response = self.client.get(
+                reverse('posts:post_detail', args=(posts[1].pk,))
+            )
+            self.assertEqual(response.context['post'].text, 'Тестовый пост')
+            response = self.client.get(reverse('posts:index'))
+            self.assertEqual(
+                [post.pk for post in response.context['page_obj']],
+                [post.pk for post in reversed(posts)],
+            )
+            restore_posts(ArchivedPost.objects.all())
+        for post in posts:
+            self.assertTrue(
+                Post.objects.using(post._state.db).filter(
+                    pk=post.pk
+                ).exists()
+            )
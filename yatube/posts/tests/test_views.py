@@ -1,8 +1,13 @@
+from core.query_budget import (QueryBudgetExceeded, QueryBudgetTestMixin,
+                               query_budget)
 from django import forms
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from posts import urls, views
 from posts.models import Group, Post
+from posts.rows import PostRow
 
 User = get_user_model()
 
@@ -81,6 +86,9 @@ class PostsPagesTests(TestCase):
         self.assertEqual(len(response.context['page_obj']), 2)
         self.assertContains(response, self.post.text)
         self.assertContains(response, self.post_with_group.text)
+        # Посты ленты — строки с отрисованным HTML, без текста поста.
+        self.assertIsInstance(response.context['page_obj'][0], PostRow)
+        self.assertNotIn('text', PostRow.FIELDS)
 
     def test_group_list_show_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом."""
@@ -238,3 +246,76 @@ class PaginatorViewsTests(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.guest_client.get(reverse_name)
                 self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class QueryBudgetViewsTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for num in range(12):
+            author = User.objects.create_user(
+                username=f'author{num}', first_name='Имя', last_name='Фамилия'
+            )
+            group = Group.objects.create(
+                title=f'Группа {num}',
+                slug=f'group-{num}',
+                description='Тестовое описание',
+            )
+            cls.post = Post.objects.create(
+                author=author,
+                text=f'Тестовый пост {num}',
+                group=group,
+            )
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.post.author)
+
+    def test_every_posts_view_declares_budget(self):
+        """Для каждой view-функции posts.urls объявлен бюджет запросов."""
+        for pattern in urls.urlpatterns:
+            with self.subTest(name=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_views_within_query_budget(self):
+        """Число запросов не зависит от количества постов на странице."""
+        reverse_names = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': 'group-11'}),
+            reverse('posts:profile', kwargs={'username': 'author11'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_create'),
+            reverse('posts:index_feed', args=('atom',)),
+            reverse('posts:group_feed', args=('group-11', 'rss')),
+            reverse('posts:profile_feed', args=('author11', 'atom')),
+        )
+        for reverse_name in reverse_names:
+            with self.subTest(reverse_name=reverse_name):
+                self.assertWithinQueryBudget(self.author_client, reverse_name)
+
+    def test_post_create_within_query_budget(self):
+        """Создание поста укладывается в бюджет запросов."""
+        self.assertWithinQueryBudget(
+            self.author_client,
+            reverse('posts:post_create'),
+            method='post',
+            data={'text': 'Новый текст', 'group': self.post.group_id},
+        )
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_budget_exceeded_raises(self):
+        """Превышение бюджета в строгом режиме приводит к исключению."""
+        view = query_budget(0)(views.index)
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        with self.assertRaises(QueryBudgetExceeded):
+            view(request)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_streamed_queries_counted(self):
+        """Запросы, выполняемые при отправке потокового ответа,
+        учитываются в бюджете."""
+        view = query_budget(1)(views.index_feed)
+        response = view(RequestFactory().get('/'), 'atom')
+        with self.assertRaises(QueryBudgetExceeded):
+            b''.join(response.streaming_content)
@@ -6,9 +6,21 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('feeds/<str:feed_type>/', views.index_feed, name='index_feed'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/feeds/<str:feed_type>/',
+        views.group_feed,
+        name='group_feed',
+    ),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/feeds/<str:feed_type>/',
+        views.profile_feed,
+        name='profile_feed',
+    ),
 ]
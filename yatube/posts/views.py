@@ -1,66 +1,225 @@
+from core.query_budget import query_budget
+from core.routers import pins_primary, reads_from_replica
+from core.write_queue import run_write
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import F
+from django.forms.models import construct_instance
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 
+from .archive import get_post_or_404, restore_post, with_archive
+from .cache import anonymous_page_cache, post_cards
+from .conditional import feed_validators, post_validators
+from .counters import author_posts_count
+from .feeds import feed_response
 from .forms import PostForm
-from .models import Group, Post, User
+from .models import ArchivedPost, Group, Post, User
+from .paginators import (AFTER_PARAM, BEFORE_PARAM, CursorPaginator,
+                         FeedPagination)
+from .search import SEARCH_ORDERING, search_posts
+from .sharding import across_shards, for_post, on_author_shard
 
 
+def feed_posts(queryset):
+    """Посты страницы ленты: строки rows() или, если POSTS_FEED_ROWS
+    выключен, экземпляры моделей feed()."""
+    if settings.POSTS_FEED_ROWS:
+        return queryset.rows()
+    return queryset.feed()
+
+
+@reads_from_replica
+@anonymous_page_cache('index')
+@query_budget(5, per_shard=4, archive=8)
 def index(request):
     """Главная страница."""
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    pagination = FeedPagination(request, with_archive(
+        across_shards(feed_posts(Post.objects.all())),
+        feed_posts(ArchivedPost.objects.all()),
+    ))
+    validators = feed_validators(request, pagination.page_queryset())
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    page_obj = pagination.page()
     context = {
         'page_obj': page_obj,
+        'post_cards': post_cards(page_obj, 'posts/includes/post_card.html'),
     }
-    return render(request, 'posts/index.html', context)
+    return validators.apply(render(request, 'posts/index.html', context))
 
 
+@reads_from_replica
+@anonymous_page_cache('group:{slug}')
+@query_budget(5, per_shard=3, archive=7)
 def group_posts(request, slug):
     """Обработка страниц сообществ отфильтрованных по группам."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    pagination = FeedPagination(
+        request,
+        with_archive(
+            across_shards(feed_posts(group.posts.all())),
+            feed_posts(group.archived_posts.all()),
+        ),
+        count=group.posts_count,
+    )
+    validators = feed_validators(
+        request,
+        pagination.page_queryset(),
+        group.title,
+        group.description,
+        group.posts_count,
+    )
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    page_obj = pagination.page()
     context = {
         'group': group,
         'page_obj': page_obj,
+        'post_cards': post_cards(
+            page_obj, 'posts/includes/group_post_card.html'
+        ),
     }
-    return render(request, 'posts/group_list.html', context)
+    return validators.apply(
+        render(request, 'posts/group_list.html', context)
+    )
 
 
+@reads_from_replica
+@anonymous_page_cache('profile:{username}')
+@query_budget(5, archive=7)
 def profile(request, username):
     """Обработка профайла пользователя."""
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.all().filter(author__username=username)
-    posts_qty = len(post_list)
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('post_stats', 'shard'), username=username
+    )
+    posts_qty = author_posts_count(author)
+    pagination = FeedPagination(
+        request,
+        with_archive(
+            on_author_shard(feed_posts(author.posts.all()), author),
+            feed_posts(author.archived_posts.all()),
+        ),
+        count=posts_qty,
+    )
+    validators = feed_validators(
+        request,
+        pagination.page_queryset(),
+        author.get_full_name(),
+        posts_qty,
+    )
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
+    page_obj = pagination.page()
     context = {
         'author': author,
         'posts_qty': posts_qty,
         'page_obj': page_obj,
+        'post_cards': post_cards(
+            page_obj, 'posts/includes/profile_post_card.html'
+        ),
+    }
+    return validators.apply(render(request, 'posts/profile.html', context))
+
+
+@query_budget(2, per_shard=2)
+def index_feed(request, feed_type):
+    """Лента последних записей в формате Atom или RSS."""
+    return feed_response(
+        request,
+        feed_type,
+        across_shards(Post.objects.feed(excerpt=True)),
+        'Последние обновления на сайте',
+        reverse('posts:index'),
+    )
+
+
+@query_budget(3, per_shard=2)
+def group_feed(request, slug, feed_type):
+    """Лента записей сообщества в формате Atom или RSS."""
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request,
+        feed_type,
+        across_shards(group.posts.feed(excerpt=True)),
+        f'Записи сообщества {group.title}',
+        reverse('posts:group_list', args=(slug,)),
+        group.title,
+    )
+
+
+@query_budget(3)
+def profile_feed(request, username, feed_type):
+    """Лента записей автора в формате Atom или RSS."""
+    author = get_object_or_404(
+        User.objects.select_related('shard'), username=username
+    )
+    return feed_response(
+        request,
+        feed_type,
+        on_author_shard(author.posts.feed(excerpt=True), author),
+        f'Записи пользователя {author.get_full_name() or username}',
+        reverse('posts:profile', args=(username,)),
+        author.get_full_name(),
+    )
+
+
+@query_budget(2, per_shard=2)
+def search(request):
+    """Полнотекстовый поиск по записям."""
+    query = request.GET.get('q', '').strip()
+    paginator = CursorPaginator(
+        search_posts(across_shards(Post.objects.feed()), query),
+        settings.POSTS_PER_PAGE,
+        ordering=SEARCH_ORDERING,
+        query=request.GET,
+    )
+    page_obj = paginator.get_page(
+        after=request.GET.get(AFTER_PARAM),
+        before=request.GET.get(BEFORE_PARAM),
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'post_cards': post_cards(page_obj, 'posts/includes/post_card.html'),
     }
-    return render(request, 'posts/profile.html', context)
+    return render(request, 'posts/search.html', context)
 
 
+@reads_from_replica
+@query_budget(3, per_shard=2, archive=1)
 def post_detail(request, post_id):
     """Обработка страницы отдельного поста."""
-    post = get_object_or_404(Post, pk=post_id)
-    posts_qty = Post.objects.filter(author_id=post.author.id).count()
+    post = get_post_or_404(
+        for_post(
+            Post.objects.select_related(
+                'author__post_stats', 'group'
+            ).defer('text'),
+            post_id,
+        ),
+        ArchivedPost.objects.select_related('author__post_stats', 'group'),
+        post_id,
+    )
+    posts_qty = author_posts_count(post.author)
+    validators = post_validators(request, post, posts_qty)
+    not_modified = validators.not_modified(request)
+    if not_modified:
+        return not_modified
     context = {
         'post': post,
         'posts_qty': posts_qty,
     }
-    return render(request, 'posts/post_detail.html', context)
+    return validators.apply(
+        render(request, 'posts/post_detail.html', context)
+    )
 
 
 @login_required
+@pins_primary
+@query_budget(8, per_shard=3)
 def post_create(request):
     """Создание новой записи."""
     form = PostForm()
@@ -70,7 +229,7 @@ def post_create(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            post.save()
+            run_write(post.save)
             return redirect(
                 'posts:profile',
                 username=request.user.get_username()
@@ -80,10 +239,15 @@ def post_create(request):
 
 
 @login_required
+@pins_primary
+@query_budget(7, per_shard=1, archive=7)
 def post_edit(request, post_id):
     """Редактирование поста."""
-    post = get_object_or_404(Post, pk=post_id)
-    form = PostForm(request.POST or None, instance=post)
+    post = get_post_or_404(
+        for_post(Post.objects.all(), post_id),
+        ArchivedPost.objects.all(),
+        post_id,
+    )
 
     if request.user != post.author:
         return redirect(
@@ -91,8 +255,24 @@ def post_edit(request, post_id):
             post_id=post_id
         )
 
+    if isinstance(post, ArchivedPost):
+        # Архивный пост возвращается из архива, только когда правка
+        # сохраняется; до этого форма заполняется его полями.
+        form = PostForm(
+            request.POST or None,
+            initial={'text': post.text, 'group': post.group_id},
+        )
+        if form.is_valid():
+            post = restore_post(post)
+            form.instance = construct_instance(
+                form, post, PostForm.Meta.fields
+            )
+    else:
+        form = PostForm(request.POST or None, instance=post)
+
     if form.is_valid():
-        post.save()
+        post.version = F('version') + 1
+        run_write(post.save)
         return redirect(
             'posts:post_detail',
             post_id=post_id
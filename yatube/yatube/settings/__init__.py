@@ -0,0 +1,3 @@
+# Профиль по умолчанию — разработка; в production задаётся
+# DJANGO_SETTINGS_MODULE=yatube.settings.production.
+from .dev import *  # noqa: F401,F403
@@ -0,0 +1,249 @@
+"""
+Django settings for yatube project: общие для всех профилей.
+
+Профили: yatube.settings.dev (по умолчанию, yatube.settings)
+и yatube.settings.production.
+
+Generated by 'django-admin startproject' using Django 2.2.19.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+import tempfile
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'core.apps.CoreConfig',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+# LOGOUT_REDIRECT_URL = 'posts:index'
+
+MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    },
+    # Копия для чтения; обновляется командой replicate_db.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+# Чтение лент и постов с копии (core.routers): копия используется, пока
+# отстаёт не больше чем на REPLICA_MAX_LAG секунд. После записи через
+# post_create и post_edit пользователь REPLICA_PIN_SECONDS секунд читает
+# с основной базы; не меньше REPLICA_MAX_LAG, иначе он может не увидеть
+# свою запись.
+DATABASE_ROUTERS = [
+    'posts.sharding.ShardRouter',
+    'core.routers.ReplicaRouter',
+]
+REPLICA_MAX_LAG = 5
+REPLICA_PIN_SECONDS = REPLICA_MAX_LAG
+# Базы, по которым распределяются посты авторов (posts.sharding), первой —
+# основная; одна база отключает шардирование. Каждую базу нужно
+# создать командой migrate --database, а авторов распределить командой
+# rebalance_shards. Админка, import_posts/export_posts и explain_feeds
+# работают только с постами основной базы.
+POST_SHARDS = ['default']
+# Архив постов (posts.archive): команда archive_posts переносит посты,
+# не менявшиеся дольше POSTS_ARCHIVE_AFTER_DAYS дней, в помесячные
+# сжатые базы SQLite в каталоге POSTS_ARCHIVE_DIR; страница поста,
+# профайл и ленты сайта читают их оттуда. None отключает архив —
+# перед отключением посты возвращают командой restore_posts --all.
+POSTS_ARCHIVE_AFTER_DAYS = None
+POSTS_ARCHIVE_DIR = os.path.join(BASE_DIR, 'archive')
+# PRAGMA каждого нового соединения с SQLite (core.sqlite): WAL позволяет
+# читать во время записи, busy_timeout — ждать блокировку записи, а не
+# сразу получать «database is locked»; cache_size в КиБ, если меньше нуля.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+# Сохранение постов из post_create и post_edit через очередь записи
+# процесса (core.write_queue): записи, накопившиеся за время предыдущей
+# транзакции, фиксируются одной транзакцией, не больше
+# SQLITE_WRITE_QUEUE_MAX_BATCH за раз. SQLITE_WRITE_QUEUE_MAX_DELAY,
+# секунды, — сколько ещё ждать записей для пачки (замер benchmark_writes:
+# ожидание только удлиняет ответ).
+SQLITE_WRITE_QUEUE = False
+SQLITE_WRITE_QUEUE_MAX_BATCH = 50
+SQLITE_WRITE_QUEUE_MAX_DELAY = 0
+
+POSTS_PER_PAGE = 10
+# 'cursor' — пагинация по ключу (pub_date, id), 'offset' — по номерам
+# страниц. Адреса вида ?page=N работают в обоих режимах.
+POSTS_PAGINATION = 'cursor'
+# Сколько номеров страниц показывать по обе стороны от текущей.
+POSTS_PAGE_WINDOW = 2
+# Страницы лент (главная, группа, профайл) читают посты легковесными
+# строками (posts.rows), False — экземплярами моделей.
+POSTS_FEED_ROWS = True
+# Число записей в лентах Atom/RSS по умолчанию и наибольшее
+# значение параметра ?limit=.
+POSTS_FEED_LIMIT = 20
+POSTS_FEED_MAX_LIMIT = 200
+# Размер страницы JSON API по умолчанию и наибольшее значение ?limit=.
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+# Наибольшее число записей в одном запросе пакетного создания.
+API_MAX_BATCH_SIZE = 500
+# Метрики Prometheus (core.metrics): рабочие процессы раз
+# в METRICS_FLUSH_INTERVAL секунд сбрасывают их в общий файл SQLite
+# METRICS_DB, /metrics отдаёт сумму по всем процессам. Доступ к /metrics —
+# сотрудникам или с заголовком «Authorization: Bearer METRICS_TOKEN».
+METRICS_ENABLED = True
+METRICS_DB = os.path.join(tempfile.gettempdir(), 'yatube-metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Запросы дольше порога, мс, пишутся с планом выполнения в лог
+# core.slow_queries (файл SLOW_QUERY_LOG); None отключает журнал.
+# Сводка по журналу — команда slow_query_report.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG = os.path.join(
+    tempfile.gettempdir(), 'yatube-slow-queries.jsonl'
+)
+# При превышении бюджета SQL-запросов view-функцией (core.query_budget)
+# выбрасывать исключение, а не только писать ошибку в лог. Включается
+# только при запуске тестов (core.test_runner): на сайте превышение
+# не должно превращать страницу в ошибку 500.
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'core.test_runner.QueryBudgetTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'core.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+        },
+    },
+}
+
+
+# Время жизни отрисованных карточек постов, секунды.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+# STATIC_ROOT = os.path.join(BASE_DIR, "static")
+STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
+
+
+# Email
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
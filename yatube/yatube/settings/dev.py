@@ -0,0 +1,36 @@
+"""Профиль разработки: отладка, кэш в памяти процесса и измерение
+каждого запроса."""
+
+from .base import *  # noqa: F401,F403
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'pt@ny!0gups1qhs(#*2l1t4)n9jidff@)gvli9db@v+#e)e70)'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]  # type: ignore
+
+# Доля запросов, для которых core.timing.ServerTimingMiddleware измеряет
+# SQL, шаблоны и кэш и пишет строку в лог core.timing (уровень INFO);
+# 0 отключает измерения.
+SERVER_TIMING_SAMPLE_RATE = 1.0
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Время жизни страниц лент, закэшированных для анонимных пользователей,
+# секунды; 0 отключает кэш страниц.
+POSTS_PAGE_CACHE_TIMEOUT = 0
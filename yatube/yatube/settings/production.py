@@ -0,0 +1,90 @@
+"""Профиль production.
+
+Параметры окружения: DJANGO_SECRET_KEY (обязателен),
+DJANGO_ALLOWED_HOSTS (через запятую), DJANGO_DB_PATH,
+DJANGO_REPLICA_DB_PATH (копия для чтения), DJANGO_CACHE_DIR,
+DJANGO_STATE_DIR (файлы метрик и журнала медленных запросов),
+METRICS_TOKEN. Настройки, от которых зависит производительность,
+проверяет core.checks при запуске рабочего процесса (yatube.wsgi)
+и командой check --deploy.
+"""
+
+import copy
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, LOGGING, TEMPLATES
+
+try:
+    SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+except KeyError:
+    raise ImproperlyConfigured('Не задана переменная DJANGO_SECRET_KEY')
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host.strip()
+]
+
+# Шаблоны разбираются один раз на процесс, а не при каждой отрисовке.
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            'DJANGO_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        # Соединение живёт между запросами рабочего процесса.
+        'CONN_MAX_AGE': 600,
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            'DJANGO_REPLICA_DB_PATH',
+            os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        ),
+        'CONN_MAX_AGE': 600,
+    },
+}
+
+# Кэш общий для всех рабочих процессов: поколения страниц
+# (posts.cache) сбрасываются сразу во всех процессах.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'DJANGO_CACHE_DIR', '/var/tmp/yatube-cache'
+        ),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+POSTS_PAGE_CACHE_TIMEOUT = 60
+
+STATE_DIR = os.environ.get('DJANGO_STATE_DIR', '/var/tmp')
+SERVER_TIMING_SAMPLE_RATE = 0.01
+METRICS_DB = os.path.join(STATE_DIR, 'yatube-metrics.sqlite3')
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_LOG = os.path.join(STATE_DIR, 'yatube-slow-queries.jsonl')
+
+LOGGING = copy.deepcopy(LOGGING)
+LOGGING['handlers']['slow_queries']['filename'] = SLOW_QUERY_LOG
+LOGGING['handlers']['console'] = {'class': 'logging.StreamHandler'}
+LOGGING['loggers']['core.timing'] = {
+    'handlers': ['console'],
+    'level': 'INFO',
+}
+
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_root')
@@ -0,0 +1,21 @@
+"""Профиль разработки с постами, распределёнными по четырём базам
+SQLite (posts.sharding). Базы создаются командами
+migrate --database=shard1 … shard3, авторы распределяются командой
+rebalance_shards. Тесты шардирования:
+manage.py test posts.tests.test_sharding с этим профилем; остальные
+тесты рассчитаны на одну базу."""
+
+import copy
+import os
+
+from .dev import *  # noqa: F401,F403
+from .dev import BASE_DIR, DATABASES
+
+DATABASES = copy.deepcopy(DATABASES)
+SHARD_ALIASES = ['shard1', 'shard2', 'shard3']
+for alias in SHARD_ALIASES:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+    }
+POST_SHARDS = ['default', *SHARD_ALIASES]
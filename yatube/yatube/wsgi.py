@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if not settings.DEBUG:
+    # Рабочий процесс не запускается с настройками, при которых сайт
+    # заметно медленнее (core.checks.performance_settings).
+    from core.checks import check_performance_settings
+    check_performance_settings()